@@ -0,0 +1,334 @@
+# api.py
+"""
+Service HTTP/JSON local du modèle de coûts, sans Streamlit (bibliothèque standard + NumPy).
+
+Points d'accès (POST, corps JSON : un objet ou une liste d'objets) :
+- /velo        : champs de `VeloParams`            -> champs de `CoutResultats`
+- /voiture     : champs de `VoitureParams`         -> `cout_annuel`, `cout_km`, `details`
+- /comparaison : champs d'un profil de `profils.json` et, sous la clé "voiture",
+                 ceux de `VoitureParams`           -> résultats de `calculer_profils_batch`
+GET /stats renvoie les latences par point d'accès (JSON), GET /metrics au format Prometheus.
+
+Les requêtes qui arrivent pendant une courte fenêtre (`--fenetre-ms`) sont
+regroupées en un seul calcul vectorisé (batch.py), exécuté dans un pool de
+workers (threads, ou processus avec `--processus`).
+
+Usage :
+    python api.py --port 8765
+    curl -d '{"prix_achat": 2500, "aide": 300, "entretien_total": 1000, "duree": 5, "fmd": 600, "km_an": 3000}' localhost:8765/velo
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import fields
+
+from instrumentation import Registre
+from utils import CoutResultats, VeloParams, VoitureParams
+
+# Fenêtre de regroupement des requêtes et taille maximale d'un lot
+FENETRE_MS = 2.0
+TAILLE_LOT_MAX = 4096
+# Taille maximale acceptée pour un corps de requête
+TAILLE_CORPS_MAX = 1 << 20
+
+_CHAMPS_VELO = {f.name: f.default for f in fields(VeloParams)}
+_CHAMPS_VOITURE = {f.name: f.default for f in fields(VoitureParams)}
+_CHAMPS_PROFIL = {
+    "prix_achat": None, "aide": None, "entretien_annuel": None, "duree": None, "fmd": None,
+    "km_jour": 0, "nb_trajets_jour": 2, "jours_semaine_min": 0, "jours_semaine_max": 0,
+}
+_CHAMPS_ENTIERS_VELO = {f.name for f in fields(CoutResultats) if f.type in (int, "int")}
+
+
+class RequeteInvalide(ValueError):
+    """Corps de requête invalide (réponse 400)."""
+
+
+def _valider(objet, champs: dict) -> dict:
+    """Vérifie un objet JSON : champs connus, valeurs numériques, champs obligatoires présents."""
+    if not isinstance(objet, dict):
+        raise RequeteInvalide("Chaque élément doit être un objet JSON.")
+    inconnus = set(objet) - set(champs)
+    if inconnus:
+        raise RequeteInvalide(f"Champs inconnus : {', '.join(sorted(inconnus))}")
+    ligne = {}
+    for nom, defaut in champs.items():
+        valeur = objet.get(nom, defaut)
+        if valeur is None:
+            raise RequeteInvalide(f"Champ obligatoire manquant : {nom}")
+        if isinstance(valeur, bool) or not isinstance(valeur, (int, float)):
+            raise RequeteInvalide(f"Le champ {nom} doit être un nombre.")
+        ligne[nom] = valeur
+    return ligne
+
+
+def _valider_comparaison(objet) -> dict:
+    if not isinstance(objet, dict):
+        raise RequeteInvalide("Chaque élément doit être un objet JSON.")
+    voiture = objet.get("voiture", {})
+    ligne = _valider({k: v for k, v in objet.items() if k != "voiture"}, _CHAMPS_PROFIL)
+    ligne.update({f"voiture_{nom}": valeur for nom, valeur in _valider(voiture, _CHAMPS_VOITURE).items()})
+    return ligne
+
+
+# Validation exécutée dans la boucle asyncio (erreurs renvoyées à la seule requête fautive)
+VALIDATEURS = {
+    "velo": lambda objet: _valider(objet, _CHAMPS_VELO),
+    "voiture": lambda objet: _valider(objet, _CHAMPS_VOITURE),
+    "comparaison": _valider_comparaison,
+}
+
+
+def _lignes(colonnes_resultat: dict) -> list:
+    """Convertit des colonnes NumPy en une liste d'objets JSON (types Python natifs)."""
+    noms = list(colonnes_resultat)
+    return [dict(zip(noms, valeurs)) for valeurs in zip(*(colonnes_resultat[n].tolist() for n in noms))]
+
+
+def evaluer_lot(point_acces: str, lignes: list) -> list:
+    """
+    Évalue un lot de lignes validées en un seul calcul vectorisé.
+
+    Fonction de niveau module pour pouvoir être exécutée dans un processus du pool.
+    """
+    import numpy as np
+
+    from batch import (COLONNES_DETAILS_VOITURE, calculer_couts_batch, calculer_couts_voiture_batch,
+                       calculer_profils_batch)
+
+    colonnes = {nom: np.array([ligne[nom] for ligne in lignes]) for nom in lignes[0]}
+    if point_acces == "velo":
+        resultats = _lignes(calculer_couts_batch(colonnes))
+        for resultat in resultats:
+            for nom in _CHAMPS_ENTIERS_VELO:
+                resultat[nom] = int(resultat[nom])
+        return resultats
+    if point_acces == "voiture":
+        resultats = calculer_couts_voiture_batch(colonnes)
+        postes = list(zip(COLONNES_DETAILS_VOITURE, (resultats[c].tolist() for c in COLONNES_DETAILS_VOITURE.values())))
+        return [
+            {"cout_annuel": cout_annuel, "cout_km": cout_km, "details": {poste: valeurs[i] for poste, valeurs in postes}}
+            for i, (cout_annuel, cout_km) in enumerate(zip(resultats["cout_annuel"].tolist(), resultats["cout_km"].tolist()))
+        ]
+    return _lignes(calculer_profils_batch(colonnes))
+
+
+class RegroupeurRequetes:
+    """
+    Regroupe les requêtes concurrentes d'un point d'accès en lots.
+
+    Le premier élément ouvre une fenêtre de `fenetre_ms` ; tout ce qui arrive
+    pendant la fenêtre (jusqu'à `taille_max` éléments) est évalué en un seul appel.
+    """
+
+    def __init__(self, point_acces: str, executeur, fenetre_ms: float = FENETRE_MS, taille_max: int = TAILLE_LOT_MAX):
+        self.point_acces = point_acces
+        self.executeur = executeur
+        self.fenetre_s = fenetre_ms / 1000
+        self.taille_max = taille_max
+        self.file = asyncio.Queue()
+        self.nb_lots = 0
+        self.nb_elements = 0
+        self._calculs = set()  # références aux calculs en cours (sinon ramassés par le GC)
+        self._tache = asyncio.get_running_loop().create_task(self._boucle())
+
+    async def evaluer(self, lignes: list) -> list:
+        """Soumet les lignes d'une requête et attend leurs résultats."""
+        futur = asyncio.get_running_loop().create_future()
+        await self.file.put((lignes, futur))
+        return await futur
+
+    async def _boucle(self):
+        boucle = asyncio.get_running_loop()
+        while True:
+            en_attente = [await self.file.get()]
+            taille = len(en_attente[0][0])
+            echeance = boucle.time() + self.fenetre_s
+            while taille < self.taille_max:
+                delai = echeance - boucle.time()
+                if delai <= 0:
+                    break
+                try:
+                    element = await asyncio.wait_for(self.file.get(), delai)
+                except asyncio.TimeoutError:
+                    break
+                en_attente.append(element)
+                taille += len(element[0])
+            # Le calcul se fait pendant que la fenêtre suivante se remplit
+            calcul = boucle.create_task(self._executer(en_attente))
+            self._calculs.add(calcul)
+            calcul.add_done_callback(self._calculs.discard)
+
+    async def _executer(self, en_attente: list):
+        lot = [ligne for lignes, _ in en_attente for ligne in lignes]
+        self.nb_lots += 1
+        self.nb_elements += len(lot)
+        try:
+            resultats = await asyncio.get_running_loop().run_in_executor(
+                self.executeur, evaluer_lot, self.point_acces, lot)
+        except Exception as e:
+            for _, futur in en_attente:
+                if not futur.done():
+                    futur.set_exception(e)
+            return
+        debut = 0
+        for lignes, futur in en_attente:
+            if not futur.done():
+                futur.set_result(resultats[debut:debut + len(lignes)])
+            debut += len(lignes)
+
+    def fermer(self):
+        self._tache.cancel()
+
+
+class ServiceCouts:
+    """Serveur HTTP/1.1 minimal (keep-alive) au-dessus d'asyncio."""
+
+    def __init__(self, fenetre_ms: float = FENETRE_MS, nb_processus: int = 0, nb_threads: int = None):
+        self.fenetre_ms = fenetre_ms
+        if nb_processus > 0:
+            self.executeur = ProcessPoolExecutor(max_workers=nb_processus)
+        else:
+            self.executeur = ThreadPoolExecutor(max_workers=nb_threads or min(4, os.cpu_count() or 1))
+        self.latences = Registre()
+        self.regroupeurs = {}
+        self.serveur = None
+
+    async def demarrer(self, hote: str = "127.0.0.1", port: int = 8765):
+        self.regroupeurs = {nom: RegroupeurRequetes(nom, self.executeur, self.fenetre_ms) for nom in VALIDATEURS}
+        self.serveur = await asyncio.start_server(self._connexion, hote, port)
+        return self.serveur
+
+    async def arreter(self):
+        if self.serveur is not None:
+            self.serveur.close()
+            await self.serveur.wait_closed()
+        for regroupeur in self.regroupeurs.values():
+            regroupeur.fermer()
+        self.executeur.shutdown(wait=False, cancel_futures=True)
+
+    def statistiques(self) -> dict:
+        return {
+            "latences": self.latences.resume(),
+            "lots": {nom: {"lots": r.nb_lots, "elements": r.nb_elements} for nom, r in self.regroupeurs.items()},
+        }
+
+    async def _connexion(self, lecteur: asyncio.StreamReader, ecrivain: asyncio.StreamWriter):
+        try:
+            while True:
+                ligne = await lecteur.readline()
+                if not ligne:
+                    break
+                try:
+                    methode, chemin, version = ligne.decode("latin-1").split()
+                except ValueError:
+                    await self._repondre(ecrivain, 400, {"erreur": "Requête HTTP invalide."}, fermer=True)
+                    break
+                entetes = {}
+                while True:
+                    entete = await lecteur.readline()
+                    if entete in (b"\r\n", b"\n", b""):
+                        break
+                    nom, _, valeur = entete.decode("latin-1").partition(":")
+                    entetes[nom.strip().lower()] = valeur.strip()
+                longueur = entetes.get("content-length", "0") or "0"
+                if not (longueur.isascii() and longueur.isdigit()):
+                    await self._repondre(ecrivain, 400, {"erreur": "En-tête Content-Length invalide."}, fermer=True)
+                    break
+                longueur = int(longueur)
+                if longueur > TAILLE_CORPS_MAX:
+                    await self._repondre(ecrivain, 413, {"erreur": "Corps de requête trop volumineux."}, fermer=True)
+                    break
+                corps = await lecteur.readexactly(longueur) if longueur else b""
+                fermer = (entetes.get("connection", "").lower() == "close"
+                          or (version == "HTTP/1.0" and entetes.get("connection", "").lower() != "keep-alive"))
+                statut, reponse = await self._traiter(methode, chemin.split("?", 1)[0], corps)
+                await self._repondre(ecrivain, statut, reponse, fermer=fermer)
+                if fermer:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        except asyncio.CancelledError:
+            # Arrêt du serveur pendant qu'une connexion attend une requête
+            pass
+        finally:
+            ecrivain.close()
+
+    async def _traiter(self, methode: str, chemin: str, corps: bytes):
+        if methode == "GET" and chemin == "/stats":
+            return 200, self.statistiques()
+        if methode == "GET" and chemin == "/metrics":
+            return 200, self.latences.vers_prometheus("ridecost_api_latence_secondes")
+        point_acces = chemin.strip("/")
+        if point_acces not in VALIDATEURS:
+            return 404, {"erreur": f"Point d'accès inconnu : {chemin}"}
+        if methode != "POST":
+            return 405, {"erreur": "Méthode non autorisée (POST attendu)."}
+
+        debut = time.perf_counter()
+        try:
+            donnees = json.loads(corps or b"null")
+            unitaire = not isinstance(donnees, list)
+            objets = [donnees] if unitaire else donnees
+            if not objets:
+                return 200, []
+            lignes = [VALIDATEURS[point_acces](objet) for objet in objets]
+        except json.JSONDecodeError as e:
+            return 400, {"erreur": f"JSON invalide : {e}"}
+        except RequeteInvalide as e:
+            return 400, {"erreur": str(e)}
+        try:
+            resultats = await self.regroupeurs[point_acces].evaluer(lignes)
+        except Exception as e:
+            return 500, {"erreur": f"Erreur de calcul : {e}"}
+        self.latences.observer(point_acces, time.perf_counter() - debut)
+        return 200, resultats[0] if unitaire else resultats
+
+    @staticmethod
+    async def _repondre(ecrivain: asyncio.StreamWriter, statut: int, contenu, fermer: bool = False):
+        if isinstance(contenu, str):
+            corps, type_contenu = contenu.encode("utf-8"), "text/plain; version=0.0.4"
+        else:
+            corps, type_contenu = json.dumps(contenu, ensure_ascii=False).encode("utf-8"), "application/json"
+        raisons = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+                   413: "Payload Too Large", 500: "Internal Server Error"}
+        entetes = (f"HTTP/1.1 {statut} {raisons.get(statut, '')}\r\n"
+                   f"Content-Type: {type_contenu}\r\nContent-Length: {len(corps)}\r\n"
+                   f"Connection: {'close' if fermer else 'keep-alive'}\r\n\r\n")
+        ecrivain.write(entetes.encode("latin-1") + corps)
+        await ecrivain.drain()
+
+
+async def _servir(args):
+    service = ServiceCouts(fenetre_ms=args.fenetre_ms, nb_processus=args.processus)
+    serveur = await service.demarrer(args.hote, args.port)
+    print(f"Service de coûts à l'écoute sur http://{args.hote}:{args.port}", file=sys.stderr)
+    try:
+        async with serveur:
+            await serveur.serve_forever()
+    finally:
+        await service.arreter()
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Service HTTP/JSON du modèle de coûts RideCostCompare.")
+    parser.add_argument("--hote", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--fenetre-ms", type=float, default=FENETRE_MS,
+                        help="Fenêtre de regroupement des requêtes concurrentes (ms).")
+    parser.add_argument("--processus", type=int, default=0,
+                        help="Nombre de processus de calcul (0 : pool de threads dans le processus du serveur).")
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(_servir(args))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,11 +1,15 @@
 # app.py
+import time
+
 import streamlit as st
-import json
-from dataclasses import asdict
 
 # Import des fonctions locales et de la configuration
-from utils import calculer_couts, calculer_couts_voiture, VoitureParams
+from utils import VoitureParams, TRAJETS_PERSO_DEFAUT, estimer_km_autres
+from graphe import creer_graphe_simulation
+from classement import CRITERES, ProfilsEnColonnes, classer_profils
 from config import AppConfig
+from storage import CatalogueProfils, ProfilStore, ProfilStoreError, VueProfils, ouvrir_store
+from instrumentation import REGISTRE, est_active, span
 
 # Import des modules pour chaque onglet
 from tabs.velo_tab import display_velo_tab
@@ -20,51 +24,152 @@ st.set_page_config(
 )
 
 # --- Fonctions de gestion de données ---
-def load_data(filepath=AppConfig.DEFAULT_PROFIL_VELO_FILE):
-    """Charge les profils de vélo depuis un fichier JSON."""
-    try:
-        with open(filepath, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    except (FileNotFoundError, json.JSONDecodeError):
-        return {}
+@st.cache_resource
+def get_profil_store() -> ProfilStore:
+    """Ouvre le stockage des profils une seule fois pour tout le processus (partagé entre sessions)."""
+    return ouvrir_store()
+
+@st.cache_resource
+def get_catalogue_profils() -> CatalogueProfils:
+    """Catalogue des profils en lecture seule, chargé une fois et partagé par toutes les sessions."""
+    return CatalogueProfils(get_profil_store())
+
+def get_vue_profils() -> VueProfils:
+    """Vue de la session : le catalogue partagé plus les profils modifiés par cette session."""
+    if 'profils_session' not in st.session_state:
+        st.session_state['profils_session'] = VueProfils(get_catalogue_profils())
+    return st.session_state.profils_session
+
+def load_profil(nom):
+    """Charge un profil de vélo (lecture seule) depuis la vue de la session."""
+    with span("chargement.profil"):
+        return get_vue_profils().get(nom) if nom else None
 
-def save_data(data, filepath=AppConfig.DEFAULT_PROFIL_VELO_FILE):
-    """Sauvegarde les profils de vélo dans un fichier JSON."""
+def save_profil(nom, data):
+    """Sauvegarde un seul profil de vélo, sans réécrire les autres."""
     try:
-        with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
+        get_profil_store().upsert(nom, data)
+        # Visible tout de suite dans cette session, sans attendre le rechargement du catalogue
+        get_vue_profils().modifier(nom, data)
         return True
-    except Exception as e:
+    except ProfilStoreError as e:
         st.error(f"Erreur lors de la sauvegarde : {e}")
         return False
 
+@st.cache_resource(max_entries=2)
+def _profils_en_colonnes(version_catalogue):
+    """Champs vélo de tout le catalogue en colonnes, refaits seulement quand le catalogue est rechargé."""
+    return ProfilsEnColonnes.depuis_profils(get_catalogue_profils().items(), cle=version_catalogue)
+
+def _choisir_profil(nom):
+    """Callback : le profil choisi dans le classement devient le profil actif (page et liste réaffichées)."""
+    st.session_state.profil_velo_actif = nom
+    st.session_state.pop('profil_selector', None)
+    st.session_state.pop('profil_page', None)
+
+def afficher_meilleurs_profils(conteneur, profil_data, params_voiture):
+    """Classement de tous les profils pour le trajet du profil actif et la voiture saisie."""
+    with conteneur.expander("🏆 Meilleurs profils pour ce trajet"):
+        if not profil_data:
+            st.caption("Choisissez d'abord un profil : son trajet sert de référence.")
+            return
+        critere = st.radio("Classer par", list(CRITERES), format_func=CRITERES.get, key='classement_critere')
+        k = st.number_input("Nombre de profils affichés", min_value=1, max_value=AppConfig.CLASSEMENT_K_MAX,
+                            value=AppConfig.CLASSEMENT_K, key='classement_k')
+        vue = get_vue_profils()
+        profils = _profils_en_colonnes(vue.catalogue.version).avec_modifications(*vue.modifications())
+        with span("calcul.classement"):
+            classement = classer_profils(profils, profil_data, params_voiture, critere, k)
+        st.caption(f"{len(profils)} profils évalués, trajet de {profil_data.get('km_jour', 0)} km "
+                   f"sur {profil_data.get('jours_semaine_min', 0)} à {profil_data.get('jours_semaine_max', 0)} jours.")
+        st.dataframe(classement[["rang", "profil", "economie_min", "economie_max", "cout_km_min", "cout_km_max"]],
+                     hide_index=True, column_config={
+                         "economie_min": st.column_config.NumberColumn("Économie min (€)", format="%.0f"),
+                         "economie_max": st.column_config.NumberColumn("Économie max (€)", format="%.0f"),
+                         "cout_km_min": st.column_config.NumberColumn("€/km min", format="%.3f"),
+                         "cout_km_max": st.column_config.NumberColumn("€/km max", format="%.3f"),
+                     })
+        choix = st.selectbox("Profil à utiliser", classement["profil"].tolist(), key='classement_choix')
+        st.button("Utiliser ce profil", on_click=_choisir_profil, args=(choix,),
+                  disabled=choix == st.session_state.profil_velo_actif)
+
+def afficher_panneau_debug(conteneur):
+    """Panneau de debug (si l'instrumentation est active) : temps par étape, toutes sessions confondues."""
+    with conteneur.expander("⏱️ Debug : temps par étape"):
+        resume = REGISTRE.resume()
+        if not resume:
+            st.caption("Aucune mesure pour l'instant.")
+            return
+        st.dataframe(resume, hide_index=True, column_config={
+            col: st.column_config.NumberColumn(format="%.2f")
+            for col in ("total_ms", "moyenne_ms", "p50_ms", "p95_ms", "max_ms")
+        })
+        col_json, col_prom = st.columns(2)
+        col_json.download_button("JSON", data=REGISTRE.vers_json, file_name="metriques.json",
+                                 mime="application/json", on_click="ignore")
+        col_prom.download_button("Prometheus", data=REGISTRE.vers_prometheus, file_name="metriques.prom",
+                                 mime="text/plain", on_click="ignore")
+        if st.button(f"Écrire dans {AppConfig.FICHIER_METRIQUES}"):
+            REGISTRE.ecrire(AppConfig.FICHIER_METRIQUES)
+            st.success("Métriques écrites.")
+
 # --- Initialisation de l'état de la session ---
-if 'profils_velo' not in st.session_state:
-    st.session_state['profils_velo'] = load_data()
-    st.session_state['profil_velo_actif'] = list(st.session_state.profils_velo.keys())[0] if st.session_state.profils_velo else None
+debut_execution = time.perf_counter()
+try:
+    # Rechargement du catalogue partagé seulement si le stockage a changé (vérifié au plus une fois par intervalle)
+    get_catalogue_profils().actualiser()
+    vue_profils = get_vue_profils()
+except ProfilStoreError as e:
+    st.error(f"Impossible de charger les profils : {e}")
+    st.stop()
+
+if 'profil_velo_actif' not in st.session_state:
+    premiers_profils = vue_profils.list_noms(0, 1)
+    st.session_state['profil_velo_actif'] = premiers_profils[0] if premiers_profils else None
 
 if 'voiture_params' not in st.session_state:
-    st.session_state['voiture_params'] = VoitureParams()
+    st.session_state['voiture_params'] = VoitureParams(km_autres=estimer_km_autres(TRAJETS_PERSO_DEFAUT))
+
+if 'trajets_perso' not in st.session_state:
+    st.session_state['trajets_perso'] = dict(TRAJETS_PERSO_DEFAUT)
 
-if 'resultats_voiture' not in st.session_state:
-    st.session_state['resultats_voiture'] = calculer_couts_voiture(st.session_state.voiture_params)
+# Graphe de calcul de la session : seuls les résultats dont une entrée a changé sont recalculés
+if 'graphe' not in st.session_state:
+    st.session_state['graphe'] = creer_graphe_simulation()
+graphe = st.session_state.graphe
 
 # --- SIDEBAR (Contrôles du vélo) ---
 with st.sidebar:
     st.title("RideCostCompare 🚲")
     st.header("Profil Vélo")
-    if st.session_state.profils_velo:
+    nb_profils = vue_profils.count()
+    if nb_profils:
+        # Les profils sont listés par pages pour garder la liste déroulante légère
+        nb_pages = -(-nb_profils // AppConfig.PROFILS_PAR_PAGE)
+        page = 1
+        if nb_pages > 1:
+            # Page initiale : celle du profil actif (ex. choisi dans le classement)
+            noms = vue_profils.list_noms()
+            actif = st.session_state.profil_velo_actif
+            page_active = noms.index(actif) // AppConfig.PROFILS_PAR_PAGE + 1 if actif in noms else 1
+            page = st.number_input("Page de profils", min_value=1, max_value=nb_pages, value=page_active, key='profil_page')
+        noms_profils = vue_profils.list_noms((page - 1) * AppConfig.PROFILS_PAR_PAGE, AppConfig.PROFILS_PAR_PAGE)
+        if st.session_state.profil_velo_actif in noms_profils:
+            index_actif = noms_profils.index(st.session_state.profil_velo_actif)
+        else:
+            index_actif = 0
+
         profil_selectionne = st.selectbox(
             "Choisir un profil vélo",
-            list(st.session_state.profils_velo.keys()),
+            noms_profils,
+            index=index_actif,
             key='profil_selector'
         )
 
-        if profil_selectionne != st.session_state.profil_velo_actif:
-            st.session_state.profil_velo_actif = profil_selectionne
-            st.rerun()
+        # Pas de st.rerun() : la suite du script lit déjà le profil sélectionné
+        st.session_state.profil_velo_actif = profil_selectionne
 
-        profil_data_sidebar = st.session_state.profils_velo.get(st.session_state.profil_velo_actif, {})
+        profil_data_sidebar = load_profil(st.session_state.profil_velo_actif) or {}
 
         with st.form(key='velo_form'):
             st.subheader("Paramètres du Vélo")
@@ -102,45 +207,54 @@ with st.sidebar:
                     "jours_semaine_min": p_jours_semaine[0],
                     "jours_semaine_max": p_jours_semaine[1]
                 }
-                st.session_state.profils_velo[st.session_state.profil_velo_actif] = updated_data
-                if save_data(st.session_state.profils_velo):
+                # Les calculs principaux, exécutés après la barre latérale, relisent le profil
+                # sauvegardé : une seule exécution du script suffit.
+                if save_profil(st.session_state.profil_velo_actif, updated_data):
                     st.success("Profil sauvegardé !")
-                st.rerun()
+
+    # Remplis en fin de script : le classement utilise la voiture du graphe, le panneau de debug
+    # les mesures de cette exécution
+    panneau_classement = st.container()
+    panneau_debug = st.container() if est_active() else None
 
 # --- Calculs principaux ---
-resultats_velo_min, resultats_velo_max = None, None
-profil_data = None
-if st.session_state.profil_velo_actif:
-    profil_data = st.session_state.profils_velo[st.session_state.profil_velo_actif]
-    
-    # Le kilométrage quotidien est maintenant basé sur le nombre de trajets
-    nb_trajets = profil_data.get('nb_trajets_jour', 2)
-    distance_journaliere = profil_data.get('km_jour', 0) * nb_trajets
-    
-    entretien_total_velo = profil_data['entretien_annuel'] * profil_data['duree']
-
-    km_an_velo_min = distance_journaliere * profil_data.get('jours_semaine_min', 0) * AppConfig.SEMAINES_TRAVAILLEES_PAR_AN
-    resultats_velo_min = calculer_couts(
-        profil_data['prix_achat'], profil_data['aide'],
-        entretien_total_velo, profil_data['duree'],
-        profil_data['fmd'], int(km_an_velo_min)
-    )
-
-    km_an_velo_max = distance_journaliere * profil_data.get('jours_semaine_max', 0) * AppConfig.SEMAINES_TRAVAILLEES_PAR_AN
-    resultats_velo_max = calculer_couts(
-        profil_data['prix_achat'], profil_data['aide'],
-        entretien_total_velo, profil_data['duree'],
-        profil_data['fmd'], int(km_an_velo_max)
-    )
+profil_data = load_profil(st.session_state.profil_velo_actif)
+graphe.definir(
+    profil_velo=profil_data, voiture_saisie=st.session_state.voiture_params,
+    trajets_perso=st.session_state.trajets_perso
+)
+# Le kilométrage annuel est basé sur le nombre de trajets et la fourchette de jours
+with span("calcul.velo"):
+    resultats_velo_min = graphe.valeur("velo_min")
+    resultats_velo_max = graphe.valeur("velo_max")
 
 # --- Définition et affichage des onglets ---
-tab_velo, tab_voiture, tab_comparaison = st.tabs(["🚲 Simulateur Vélo", "🚗 Simulateur Voiture", "📊 Tableau de Comparaison"])
+# Avec `on_change="rerun"`, seul l'onglet ouvert est exécuté : les calculs et graphiques
+# des autres onglets ne sont faits que lorsque l'utilisateur les affiche.
+tab_velo, tab_voiture, tab_comparaison = st.tabs(
+    ["🚲 Simulateur Vélo", "🚗 Simulateur Voiture", "📊 Tableau de Comparaison"],
+    key='onglet_actif', on_change="rerun"
+)
 
 with tab_velo:
-    display_velo_tab(resultats_velo_min, resultats_velo_max, st.session_state.get('profil_velo_actif', ''))
+    if tab_velo.open:
+        with span("affichage.onglet_velo"):
+            display_velo_tab(resultats_velo_min, resultats_velo_max, st.session_state.get('profil_velo_actif', ''), profil_data)
 
 with tab_voiture:
-    display_voiture_tab()
+    if tab_voiture.open:
+        with span("affichage.onglet_voiture"):
+            display_voiture_tab()
 
 with tab_comparaison:
-    display_comparaison_tab(resultats_velo_min, resultats_velo_max, profil_data)
\ No newline at end of file
+    if tab_comparaison.open:
+        with span("affichage.onglet_comparaison"):
+            display_comparaison_tab(resultats_velo_min, resultats_velo_max, profil_data)
+
+with span("affichage.classement"):
+    afficher_meilleurs_profils(panneau_classement, profil_data, graphe.valeur("params_voiture"))
+
+if est_active():
+    REGISTRE.observer("execution.script", time.perf_counter() - debut_execution)
+    if panneau_debug is not None:
+        afficher_panneau_debug(panneau_debug)
@@ -0,0 +1,187 @@
+# batch.py
+"""
+Versions vectorisées de `calculer_couts` et `calculer_couts_voiture`.
+
+Chaque fonction reçoit des colonnes (dictionnaire de tableaux NumPy, de listes
+ou DataFrame pandas) et calcule toutes les lignes en une seule passe, avec
+exactement les mêmes règles que les fonctions scalaires de `utils.py`.
+"""
+from dataclasses import fields
+from typing import Dict, Mapping
+
+import numpy as np
+
+from config import AppConfig
+from utils import POSTES_VOITURE, VoitureParams
+
+# Dictionnaire de colonnes ou DataFrame pandas
+Colonnes = Mapping[str, object]
+
+# Colonnes attendues par `calculer_couts_batch` (mêmes noms que les arguments scalaires)
+COLONNES_VELO = ("prix_achat", "aide", "entretien_total", "duree", "fmd", "km_an")
+
+# Correspondance entre les clés de `CoutVoitureResultats.details` et les colonnes batch
+COLONNES_DETAILS_VOITURE = POSTES_VOITURE
+
+# Préfixe des champs de `VoitureParams` dans une ligne de profil complète
+PREFIXE_VOITURE = "voiture_"
+
+_DEFAUTS_VOITURE = {f.name: f.default for f in fields(VoitureParams)}
+
+
+def _est_dataframe(colonnes) -> bool:
+    return hasattr(colonnes, "columns") and hasattr(colonnes, "index")
+
+
+def _colonne(colonnes: Colonnes, nom: str, defaut=None) -> np.ndarray:
+    """Extrait une colonne sous forme de tableau NumPy (valeur par défaut si absente ou vide)."""
+    if nom in colonnes:
+        valeurs = np.asarray(colonnes[nom])
+        if defaut is not None and valeurs.dtype.kind == "f" and np.isnan(valeurs).any():
+            valeurs = np.where(np.isnan(valeurs), defaut, valeurs)
+        return valeurs
+    if defaut is None:
+        raise KeyError(f"Colonne manquante : '{nom}'")
+    return np.asarray(defaut)
+
+
+def _diviser(numerateur: np.ndarray, denominateur: np.ndarray) -> np.ndarray:
+    """Division élément par élément qui renvoie 0 lorsque le dénominateur n'est pas > 0."""
+    numerateur, denominateur = np.broadcast_arrays(
+        np.asarray(numerateur, dtype=np.float64), np.asarray(denominateur, dtype=np.float64)
+    )
+    resultat = np.zeros(numerateur.shape, dtype=np.float64)
+    np.divide(numerateur, denominateur, out=resultat, where=denominateur > 0)
+    return resultat
+
+
+def _sortie(colonnes: Colonnes, resultats: Dict[str, np.ndarray]):
+    """Renvoie un DataFrame si l'entrée en était un, sinon un dictionnaire de tableaux."""
+    if _est_dataframe(colonnes):
+        import pandas as pd
+        return pd.DataFrame(resultats, index=colonnes.index)
+    return resultats
+
+
+def calculer_couts_batch(colonnes: Colonnes):
+    """
+    Calcule les coûts vélo pour toutes les lignes de `colonnes`.
+
+    Les colonnes attendues sont celles de `COLONNES_VELO`. Le résultat contient
+    une colonne par champ de `CoutResultats`.
+    """
+    prix_achat, aide, entretien_total, duree, fmd, km_an = (
+        _colonne(colonnes, nom) for nom in COLONNES_VELO
+    )
+    duree = np.asarray(duree)
+    km_an = np.asarray(km_an)
+
+    cout_total = np.asarray(prix_achat - aide + entretien_total, dtype=np.float64)
+    cout_total_fmd = np.maximum(cout_total - (fmd * duree), 0)
+
+    cout_annuel = _diviser(cout_total, duree)
+    cout_annuel_fmd = np.maximum(cout_annuel - fmd, 0)
+
+    cout_km = _diviser(cout_annuel, km_an)
+    cout_km_fmd = _diviser(cout_annuel_fmd, km_an)
+
+    forme = np.broadcast_shapes(*(np.shape(v) for v in (prix_achat, aide, entretien_total, duree, fmd, km_an)))
+    return _sortie(colonnes, {
+        "cout_total": np.broadcast_to(cout_total, forme).astype(np.float64),
+        "cout_total_fmd": np.broadcast_to(cout_total_fmd, forme).astype(np.float64),
+        "cout_annuel": np.broadcast_to(cout_annuel, forme).copy(),
+        "cout_annuel_fmd": np.broadcast_to(cout_annuel_fmd, forme).copy(),
+        "cout_km": cout_km,
+        "cout_km_fmd": cout_km_fmd,
+        "km_an": np.broadcast_to(km_an, forme).copy(),
+        "duree": np.broadcast_to(duree, forme).copy(),
+    })
+
+
+def calculer_couts_voiture_batch(colonnes: Colonnes):
+    """
+    Calcule le coût TCO annuel de la voiture pour toutes les lignes de `colonnes`.
+
+    Les colonnes portent les noms des champs de `VoitureParams` ; un champ absent
+    prend la valeur par défaut de `VoitureParams`. Le résultat contient
+    `cout_annuel`, `cout_km` et une colonne par poste de `COLONNES_DETAILS_VOITURE`.
+    """
+    p = {nom: _colonne(colonnes, nom, defaut) for nom, defaut in _DEFAUTS_VOITURE.items()}
+
+    km_annuels = p["km_domicile_travail"] + p["km_autres"]
+
+    amortissement = _diviser(p["prix_achat"] - p["valeur_revente"], p["duree_possession"])
+    cout_carburant = (km_annuels / 100) * p["consommation"] * p["prix_carburant"]
+    cout_fixe_annuel = p["assurance"] + p["entretien"] + p["autres_frais"]
+    cout_total_annuel = amortissement + cout_carburant + cout_fixe_annuel
+
+    cout_km = _diviser(cout_total_annuel, km_annuels)
+
+    forme = cout_total_annuel.shape
+    return _sortie(colonnes, {
+        "cout_annuel": cout_total_annuel,
+        "cout_km": cout_km,
+        "amortissement": np.broadcast_to(amortissement, forme).copy(),
+        "carburant": np.broadcast_to(np.asarray(cout_carburant, dtype=np.float64), forme).copy(),
+        "assurance": np.broadcast_to(p["assurance"], forme).copy(),
+        "entretien": np.broadcast_to(p["entretien"], forme).copy(),
+        "autres_frais": np.broadcast_to(p["autres_frais"], forme).copy(),
+    })
+
+
+def calculer_cout_voiture_pour_trajet_batch(km_velotaf, colonnes_voiture: Colonnes) -> np.ndarray:
+    """Version vectorisée de `utils.calculer_cout_voiture_pour_trajet`."""
+    km_velotaf = np.asarray(km_velotaf)
+    colonnes_trajet = {nom: _colonne(colonnes_voiture, nom, defaut) for nom, defaut in _DEFAUTS_VOITURE.items()}
+    colonnes_trajet["km_domicile_travail"] = km_velotaf
+    resultats_voiture = calculer_couts_voiture_batch(colonnes_trajet)
+
+    km_total = km_velotaf + colonnes_trajet["km_autres"]
+    proportion = _diviser(km_velotaf, km_total)
+
+    return resultats_voiture["cout_annuel"] * proportion
+
+
+def km_an_velo_batch(colonnes: Colonnes, jours_semaine) -> np.ndarray:
+    """Kilométrage annuel vélo d'un profil, tronqué à l'entier comme dans `app.py`."""
+    nb_trajets = _colonne(colonnes, "nb_trajets_jour", 2)
+    distance_journaliere = _colonne(colonnes, "km_jour", 0) * nb_trajets
+    km_an = distance_journaliere * np.asarray(jours_semaine) * AppConfig.SEMAINES_TRAVAILLEES_PAR_AN
+    return np.trunc(km_an).astype(np.int64)
+
+
+def calculer_profils_batch(colonnes: Colonnes):
+    """
+    Calcule la fourchette min/max complète pour des profils vélo et des paramètres voiture.
+
+    Chaque ligne contient les champs de `profils.json` et, éventuellement, ceux de
+    `VoitureParams` préfixés par `voiture_` (ex. `voiture_prix_achat`), les deux
+    ayant des champs homonymes. Le résultat reprend les résultats vélo préfixés `velo_min_` et
+    `velo_max_`, la part de la voiture imputable au trajet et l'économie annuelle,
+    avec les mêmes conventions que l'onglet de comparaison.
+    """
+    duree = _colonne(colonnes, "duree")
+    colonnes_velo = {
+        "prix_achat": _colonne(colonnes, "prix_achat"),
+        "aide": _colonne(colonnes, "aide"),
+        "entretien_total": _colonne(colonnes, "entretien_annuel") * duree,
+        "duree": duree,
+        "fmd": _colonne(colonnes, "fmd"),
+    }
+
+    colonnes_voiture = {
+        nom: _colonne(colonnes, PREFIXE_VOITURE + nom, defaut) for nom, defaut in _DEFAUTS_VOITURE.items()
+    }
+
+    resultats = {}
+    for scenario in ("min", "max"):
+        km_an = km_an_velo_batch(colonnes, _colonne(colonnes, f"jours_semaine_{scenario}", 0))
+        resultats_velo = calculer_couts_batch({**colonnes_velo, "km_an": km_an})
+        for nom, valeurs in resultats_velo.items():
+            resultats[f"velo_{scenario}_{nom}"] = valeurs
+        resultats[f"cout_voiture_{scenario}"] = calculer_cout_voiture_pour_trajet_batch(km_an, colonnes_voiture)
+
+    # Cas le plus défavorable / le plus favorable, comme dans `display_comparaison_tab`
+    resultats["economie_min"] = resultats["cout_voiture_min"] - resultats["velo_max_cout_annuel_fmd"]
+    resultats["economie_max"] = resultats["cout_voiture_max"] - resultats["velo_min_cout_annuel_fmd"]
+    return _sortie(colonnes, resultats)
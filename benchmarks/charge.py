@@ -0,0 +1,339 @@
+# benchmarks/charge.py
+"""
+Test de charge : N sessions simultanées de l'application, sans navigateur.
+
+Chaque session (`AppTest`) joue en boucle un scénario d'utilisation :
+changement de profil, envoi du formulaire vélo (`velo_form`), ouverture de
+l'onglet voiture et envoi de son formulaire (`car_form`), ouverture de l'onglet
+de comparaison. Mesures :
+- latence de chaque réexécution, attente comprise (p50/p95/p99, globale et par étape) ;
+- mémoire résidente (RSS) par session, une fois les sessions initialisées ;
+- débit total (réexécutions par seconde).
+
+`AppTest` n'accepte qu'une exécution à la fois par processus : les sessions
+d'un même processus se partagent le script comme les sessions d'un serveur se
+partagent le GIL, et la latence inclut l'attente de leur tour. Avec
+`--processus P`, les sessions sont réparties sur P processus (P réplicas).
+
+Les profils sont copiés dans un dossier temporaire : les formulaires envoyés
+ne modifient pas `profils.db`.
+
+Usage :
+    python benchmarks/charge.py --sessions 20 --iterations 5 --sortie avant.json
+    python benchmarks/charge.py --sessions 20 --iterations 5 --sortie apres.json --comparer avant.json --rapport charge.md
+    python benchmarks/charge.py --sans-mesure --comparer avant.json apres.json
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from multiprocessing import get_context
+
+RACINE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if RACINE not in sys.path:
+    sys.path.insert(0, RACINE)
+
+ONGLET_VOITURE = "🚗 Simulateur Voiture"
+ONGLET_COMPARAISON = "📊 Tableau de Comparaison"
+ETAPES = ("changer_profil", "formulaire_velo", "onglet_voiture", "formulaire_voiture", "onglet_comparaison")
+
+
+def rss_octets() -> int:
+    """Mémoire résidente actuelle du processus (pic depuis le démarrage hors Linux)."""
+    try:
+        with open("/proc/self/status", encoding="ascii") as f:
+            for ligne in f:
+                if ligne.startswith("VmRSS:"):
+                    return int(ligne.split()[1]) * 1024
+    except OSError:
+        pass
+    import resource
+
+    pic = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return pic if sys.platform == "darwin" else pic * 1024
+
+
+def resumer(durees) -> dict:
+    """Nombre, moyenne, centiles (rang le plus proche) et maximum d'une liste de durées (secondes)."""
+    if not durees:
+        return {"n": 0}
+    triees = sorted(durees)
+
+    def centile(q):
+        return triees[min(len(triees) - 1, max(0, int(round(q * len(triees) + 0.5)) - 1))]
+
+    return {"n": len(triees), "moyenne_s": sum(triees) / len(triees), "p50_s": centile(0.50),
+            "p95_s": centile(0.95), "p99_s": centile(0.99), "max_s": triees[-1]}
+
+
+# --- Scénario d'une session ---
+def _bouton(elements, libelle):
+    return next(b for b in elements if b.label == libelle)
+
+
+def _changer_profil(at, iteration):
+    selecteur = at.selectbox(key="profil_selector")
+    options = list(selecteur.options)
+    selecteur.set_value(options[(options.index(selecteur.value) + 1) % len(options)])
+
+
+def _formulaire_velo(at, iteration):
+    prix = next(n for n in at.sidebar.number_input if n.label == "Prix d'achat (€)")
+    prix.set_value(prix.value + (1 if iteration % 2 == 0 else -1))
+    _bouton(at.sidebar.button, "🔄 Appliquer les modifications").click()
+
+
+def _onglet(libelle):
+    def ouvrir(at, iteration):
+        at.session_state["onglet_actif"] = libelle
+    return ouvrir
+
+
+def _formulaire_voiture(at, iteration):
+    at.number_input(key="voiture_consommation").set_value(6.5 + 0.5 * (iteration % 2))
+    _bouton(at.button, "🔄 Recalculer").click()
+
+
+ACTIONS = {
+    "changer_profil": _changer_profil,
+    "formulaire_velo": _formulaire_velo,
+    "onglet_voiture": _onglet(ONGLET_VOITURE),
+    "formulaire_voiture": _formulaire_voiture,
+    "onglet_comparaison": _onglet(ONGLET_COMPARAISON),
+}
+
+
+class _Session:
+    """Une session `AppTest` ; ses réexécutions passent par le verrou du processus."""
+
+    def __init__(self, verrou: threading.Lock):
+        from streamlit.testing.v1 import AppTest
+
+        self.at = AppTest.from_file(os.path.join(RACINE, "app.py"), default_timeout=300)
+        self.verrou = verrou
+        self.erreurs = []
+
+    def executer(self, etape: str, iteration: int):
+        """Applique l'action puis réexécute ; renvoie (latence avec attente, durée d'exécution)."""
+        debut = time.perf_counter()
+        with self.verrou:
+            debut_execution = time.perf_counter()
+            try:
+                if etape is not None:
+                    ACTIONS[etape](self.at, iteration)
+                self.at.run()
+                if self.at.exception:
+                    self.erreurs.append(f"{etape} : {self.at.exception[0].message}")
+            except Exception as e:  # une session en échec ne doit pas arrêter les autres
+                self.erreurs.append(f"{etape} : {e!r}")
+            fin = time.perf_counter()
+        return fin - debut, fin - debut_execution
+
+
+def _executer_processus(nb_sessions: int, iterations: int, pause_s: float, graine: int, dossier: str) -> dict:
+    """Joue le scénario avec `nb_sessions` sessions dans ce processus et renvoie les mesures brutes."""
+    os.chdir(dossier)  # les fichiers de profils sont relatifs au dossier courant
+    from streamlit.logger import set_log_level
+
+    set_log_level("error")  # avertissements répétés à chaque réexécution
+    verrou = threading.Lock()
+
+    # Session d'échauffement : imports et caches partagés ne sont pas comptés par session
+    echauffement = _Session(verrou)
+    echauffement.executer(None, 0)
+    for etape in ETAPES:
+        echauffement.executer(etape, 0)
+    erreurs = list(echauffement.erreurs)
+    del echauffement
+    gc.collect()
+    rss_base = rss_octets()
+
+    sessions = [_Session(verrou) for _ in range(nb_sessions)]
+    latences = {etape: [] for etape in ETAPES}
+    executions = {etape: [] for etape in ETAPES}
+    pret = threading.Barrier(nb_sessions + 1)
+    depart = threading.Barrier(nb_sessions + 1)
+    mesures_verrou = threading.Lock()
+
+    def jouer(session: _Session, numero: int):
+        alea = random.Random(graine + numero)
+        # Premier passage complet hors mesure : l'état de la session est construit
+        session.executer(None, 0)
+        for etape in ETAPES:
+            session.executer(etape, 0)
+        pret.wait()
+        depart.wait()
+        for iteration in range(1, iterations + 1):
+            for etape in ETAPES:
+                if pause_s:
+                    time.sleep(pause_s * alea.uniform(0.5, 1.5))
+                latence, execution = session.executer(etape, iteration)
+                with mesures_verrou:
+                    latences[etape].append(latence)
+                    executions[etape].append(execution)
+
+    fils = [threading.Thread(target=jouer, args=(s, i), daemon=True) for i, s in enumerate(sessions)]
+    for f in fils:
+        f.start()
+    pret.wait()
+    gc.collect()
+    rss_sessions = rss_octets()
+    debut = time.perf_counter()
+    depart.wait()
+    for f in fils:
+        f.join()
+    duree = time.perf_counter() - debut
+    for session in sessions:
+        erreurs.extend(session.erreurs)
+    return {"sessions": nb_sessions, "duree_s": duree, "latences": latences, "executions": executions,
+            "rss_base": rss_base, "rss_sessions": rss_sessions, "rss_fin": rss_octets(), "erreurs": erreurs}
+
+
+def _dossier_de_travail() -> str:
+    """Dossier temporaire avec une copie de profils.json (la base y est recréée à partir du JSON)."""
+    from config import AppConfig
+
+    dossier = tempfile.mkdtemp(prefix="ridecost_charge_")
+    shutil.copy(os.path.join(RACINE, AppConfig.DEFAULT_PROFIL_VELO_FILE), dossier)
+    return dossier
+
+
+def executer(sessions: int, iterations: int, processus: int = 1, pause_s: float = 0.0, graine: int = 0,
+             nom: str = None) -> dict:
+    """Lance le test de charge et renvoie un rapport sérialisable en JSON."""
+    processus = max(1, min(processus, sessions))
+    repartition = [sessions // processus + (1 if i < sessions % processus else 0) for i in range(processus)]
+    dossier = _dossier_de_travail()
+    try:
+        with ProcessPoolExecutor(processus, mp_context=get_context("spawn")) as pool:
+            futures = [pool.submit(_executer_processus, n, iterations, pause_s, graine + 1000 * i, dossier)
+                       for i, n in enumerate(repartition)]
+            resultats = [f.result() for f in futures]
+    finally:
+        shutil.rmtree(dossier, ignore_errors=True)
+
+    latences = {etape: [d for r in resultats for d in r["latences"][etape]] for etape in ETAPES}
+    executions = {etape: [d for r in resultats for d in r["executions"][etape]] for etape in ETAPES}
+    toutes = [d for valeurs in latences.values() for d in valeurs]
+    duree = max(r["duree_s"] for r in resultats)
+    mo = 1024 * 1024
+    return {
+        "nom": nom or datetime.now().strftime("%Y-%m-%d %H:%M"),
+        "date": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "cpu": os.cpu_count(),
+        "parametres": {"sessions": sessions, "iterations": iterations, "processus": processus, "pause_s": pause_s},
+        "duree_s": duree,
+        "reexecutions": len(toutes),
+        "debit_reexecutions_s": len(toutes) / duree if duree else 0.0,
+        "latence": {"globale": resumer(toutes), **{etape: resumer(v) for etape, v in latences.items()}},
+        "execution": {"globale": resumer([d for v in executions.values() for d in v])},
+        "memoire_mo": {
+            "base_par_processus": sum(r["rss_base"] for r in resultats) / len(resultats) / mo,
+            "par_session": sum(r["rss_sessions"] - r["rss_base"] for r in resultats) / sessions / mo,
+            "fin_totale": sum(r["rss_fin"] for r in resultats) / mo,
+        },
+        "erreurs": [e for r in resultats for e in r["erreurs"]],
+    }
+
+
+# --- Comparaison de rapports ---
+_LIGNES_RAPPORT = (
+    ("Débit (réexécutions/s)", lambda r: r["debit_reexecutions_s"], "{:.1f}", True),
+    ("Latence p50 (ms)", lambda r: r["latence"]["globale"]["p50_s"] * 1e3, "{:.0f}", False),
+    ("Latence p95 (ms)", lambda r: r["latence"]["globale"]["p95_s"] * 1e3, "{:.0f}", False),
+    ("Latence p99 (ms)", lambda r: r["latence"]["globale"]["p99_s"] * 1e3, "{:.0f}", False),
+    ("Exécution seule p50 (ms)", lambda r: r["execution"]["globale"]["p50_s"] * 1e3, "{:.0f}", False),
+    *((f"p95 {etape} (ms)", lambda r, etape=etape: r["latence"][etape]["p95_s"] * 1e3, "{:.0f}", False)
+      for etape in ETAPES),
+    ("Mémoire par session (Mo)", lambda r: r["memoire_mo"]["par_session"], "{:.1f}", False),
+    ("Mémoire de base par processus (Mo)", lambda r: r["memoire_mo"]["base_par_processus"], "{:.0f}", False),
+    ("Erreurs", lambda r: len(r["erreurs"]), "{:d}", False),
+)
+
+
+def comparer(rapports: list) -> str:
+    """Tableau Markdown des rapports, avec l'écart de chacun par rapport au premier (la référence)."""
+    entete = ["Mesure"] + [r["nom"] for r in rapports]
+    lignes = [
+        "| Paramètres | " + " | ".join(
+            "{sessions} sessions × {iterations} itérations, {processus} proc., pause {pause_s} s".format(**r["parametres"])
+            for r in rapports) + " |",
+    ]
+    for libelle, extraire, format_valeur, plus_grand_meilleur in _LIGNES_RAPPORT:
+        cellules = []
+        reference = None
+        for i, rapport in enumerate(rapports):
+            try:
+                valeur = extraire(rapport)
+            except KeyError:
+                cellules.append("—")
+                continue
+            texte = format_valeur.format(valeur)
+            if i == 0:
+                reference = valeur
+            elif reference:
+                ecart = valeur / reference - 1
+                meilleur = ecart > 0 if plus_grand_meilleur else ecart < 0
+                texte += f" ({ecart:+.0%}{' ✓' if meilleur and abs(ecart) >= 0.05 else ''})"
+            cellules.append(texte)
+        lignes.append(f"| {libelle} | " + " | ".join(cellules) + " |")
+    return "\n".join([
+        "| " + " | ".join(entete) + " |",
+        "|" + "---|" * len(entete),
+        *lignes,
+    ]) + "\n"
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Test de charge de l'application (sessions simultanées).")
+    parser.add_argument("--sessions", type=int, default=10)
+    parser.add_argument("--iterations", type=int, default=3, help="Passages du scénario par session.")
+    parser.add_argument("--processus", type=int, default=1, help="Nombre de processus (réplicas) simulés.")
+    parser.add_argument("--pause", type=float, default=0.0, help="Temps de réflexion moyen entre deux actions (s).")
+    parser.add_argument("--graine", type=int, default=0)
+    parser.add_argument("--nom", help="Nom du run dans les rapports (date par défaut).")
+    parser.add_argument("--sortie", help="Fichier JSON du rapport de ce run.")
+    parser.add_argument("--comparer", nargs="+", default=[], help="Rapports JSON précédents à comparer.")
+    parser.add_argument("--rapport", help="Fichier Markdown de comparaison (sinon affiché).")
+    parser.add_argument("--sans-mesure", action="store_true", help="Compare seulement les rapports de --comparer.")
+    args = parser.parse_args(argv)
+
+    rapports = []
+    for chemin in args.comparer:
+        with open(chemin, encoding="utf-8") as f:
+            rapports.append(json.load(f))
+    if not args.sans_mesure:
+        if args.sessions <= 0 or args.iterations <= 0:
+            parser.error("--sessions et --iterations doivent être strictement positifs.")
+        rapport = executer(args.sessions, args.iterations, args.processus, args.pause, args.graine, args.nom)
+        if args.sortie:
+            with open(args.sortie, "w", encoding="utf-8") as f:
+                json.dump(rapport, f, indent=2, ensure_ascii=False)
+                f.write("\n")
+        rapports.append(rapport)
+        for erreur in rapport["erreurs"][:10]:
+            print(f"ERREUR {erreur}", file=sys.stderr)
+    if not rapports:
+        parser.error("Aucun rapport à afficher (--comparer est requis avec --sans-mesure).")
+
+    tableau = comparer(rapports)
+    if args.rapport:
+        with open(args.rapport, "w", encoding="utf-8") as f:
+            f.write(f"# Test de charge\n\n{tableau}")
+    print(tableau)
+    return 1 if rapports[-1]["erreurs"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
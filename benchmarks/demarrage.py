@@ -0,0 +1,81 @@
+# benchmarks/demarrage.py
+"""
+Mesure du démarrage à froid de l'application.
+
+Chaque mesure est faite dans un interpréteur Python neuf (aucun module déjà en
+cache) :
+- le temps d'import des modules de l'application, une fois Streamlit importé ;
+- les modules lourds (plotly, pandas, fpdf, numpy) chargés par ces imports ;
+- la durée de la première exécution complète du script via `AppTest`.
+
+Usage :
+    python benchmarks/demarrage.py [--repetitions 5]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+RACINE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MODULES_APPLICATION = ("utils", "charts", "export", "tabs.velo_tab", "tabs.voiture_tab", "tabs.comparaison_tab")
+MODULES_LOURDS = ("plotly", "pandas", "fpdf", "numpy")
+
+_SCRIPT_IMPORTS = """
+import json, sys, time
+import streamlit
+debut = time.perf_counter()
+for module in {modules!r}:
+    __import__(module)
+duree = time.perf_counter() - debut
+print(json.dumps({{"duree_s": duree, "lourds": [m for m in {lourds!r} if m in sys.modules]}}))
+"""
+
+_SCRIPT_PREMIERE_EXECUTION = """
+import json, time
+from streamlit.testing.v1 import AppTest
+debut = time.perf_counter()
+at = AppTest.from_file({app!r}, default_timeout=120).run()
+duree = time.perf_counter() - debut
+print(json.dumps({{"duree_s": duree, "erreurs": len(at.exception)}}))
+"""
+
+
+def _executer(script: str) -> dict:
+    sortie = subprocess.run(
+        [sys.executable, "-c", script], cwd=RACINE, capture_output=True, text=True, check=True
+    )
+    return json.loads(sortie.stdout.strip().splitlines()[-1])
+
+
+def mesurer(repetitions: int = 5) -> dict:
+    """Renvoie les médianes des mesures de démarrage sur `repetitions` interpréteurs neufs."""
+    imports = [
+        _executer(_SCRIPT_IMPORTS.format(modules=MODULES_APPLICATION, lourds=MODULES_LOURDS))
+        for _ in range(repetitions)
+    ]
+    executions = [
+        _executer(_SCRIPT_PREMIERE_EXECUTION.format(app=os.path.join(RACINE, "app.py")))
+        for _ in range(repetitions)
+    ]
+    return {
+        "import_modules_s": statistics.median(m["duree_s"] for m in imports),
+        "modules_lourds_au_demarrage": imports[0]["lourds"],
+        "premiere_execution_s": statistics.median(m["duree_s"] for m in executions),
+        "erreurs": max(m["erreurs"] for m in executions),
+        "repetitions": repetitions,
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Mesure le temps de démarrage à froid de RideCostCompare.")
+    parser.add_argument("--repetitions", type=int, default=5)
+    args = parser.parse_args(argv)
+    print(json.dumps(mesurer(args.repetitions), indent=2, ensure_ascii=False))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,72 @@
+# benchmarks/memoire_resultats.py
+"""
+Mémoire occupée par un grand nombre de résultats vélo, selon leur représentation :
+- dataclass classique (avec `__dict__` par instance, comme avant le passage aux slots) ;
+- `CoutResultats` à slots ;
+- `TableauResultats` (une colonne NumPy par champ).
+
+Usage :
+    python benchmarks/memoire_resultats.py [--nombre 1000000]
+"""
+import argparse
+import gc
+import json
+import os
+import sys
+import tracemalloc
+from dataclasses import fields, make_dataclass
+
+RACINE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if RACINE not in sys.path:
+    sys.path.insert(0, RACINE)
+
+
+def _mesurer(construire) -> int:
+    """Octets alloués (et toujours vivants) par `construire()`."""
+    gc.collect()
+    tracemalloc.start()
+    objet = construire()
+    taille, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del objet
+    return taille
+
+
+def mesurer(nombre: int) -> dict:
+    import numpy as np
+
+    from batch import calculer_couts_batch
+    from tableaux import TableauResultats
+    from utils import CoutResultats
+
+    colonnes = calculer_couts_batch({
+        "prix_achat": 2500, "aide": 300, "entretien_total": 1000.0, "duree": 5, "fmd": 600,
+        "km_an": np.arange(nombre, dtype=np.int64) % 10_000,
+    })
+    noms = [f.name for f in fields(CoutResultats)]
+    DataclassClassique = make_dataclass("DataclassClassique", [(f.name, f.type, f.default) for f in fields(CoutResultats)],
+                                        frozen=True)
+
+    def enregistrements(type_enregistrement):
+        valeurs = [colonnes[nom].tolist() for nom in noms]
+        return [type_enregistrement(*ligne) for ligne in zip(*valeurs)]
+
+    mesures = {
+        "dataclass_classique_o": _mesurer(lambda: enregistrements(DataclassClassique)),
+        "dataclass_slots_o": _mesurer(lambda: enregistrements(CoutResultats)),
+        "tableau_colonnes_o": _mesurer(lambda: TableauResultats.velo({nom: colonnes[nom].copy() for nom in noms})),
+    }
+    return {"nombre": nombre, **mesures,
+            "octets_par_resultat": {cle: valeur / nombre for cle, valeur in mesures.items()}}
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Mémoire de stockage des résultats selon leur représentation.")
+    parser.add_argument("--nombre", type=int, default=1_000_000)
+    args = parser.parse_args(argv)
+    print(json.dumps(mesurer(args.nombre), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,223 @@
+# benchmarks/suite.py
+"""
+Suite de benchmarks du moteur de coûts, des graphiques, des exports et de l'application.
+
+Mesures (médiane de plusieurs répétitions, en secondes par opération) :
+- calcul scalaire : `calculer_couts` et `calculer_couts_voiture` (sans cache) ;
+- construction de chaque figure de `figures.py` (cache des figures vidé) ;
+- exports : PDF en mémoire, Excel via pandas, Excel en flux ;
+- réexécution complète de `app.py` via `AppTest`, pour chaque onglet ouvert.
+
+Les résultats peuvent être enregistrés comme référence (`baseline.json`) puis
+comparés : toute mesure plus lente que la référence au-delà du seuil est signalée
+et le code de sortie vaut 1.
+
+Usage :
+    python benchmarks/suite.py --enregistrer          # met à jour la référence
+    python benchmarks/suite.py --seuil 0.25           # compare à la référence
+    python benchmarks/suite.py --groupes calcul figures
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+from datetime import datetime
+
+RACINE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if RACINE not in sys.path:
+    sys.path.insert(0, RACINE)
+
+FICHIER_REFERENCE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+# Ralentissement relatif toléré avant de signaler une régression (0.20 = +20 %)
+SEUIL_REGRESSION = 0.20
+
+
+def chronometrer(operation, nb_appels: int = 1, repetitions: int = 5) -> float:
+    """Médiane, sur `repetitions` séries, du temps moyen d'un appel à `operation` (secondes)."""
+    durees = []
+    for _ in range(repetitions):
+        debut = time.perf_counter()
+        for _ in range(nb_appels):
+            operation()
+        durees.append((time.perf_counter() - debut) / nb_appels)
+    return statistics.median(durees)
+
+
+def _profil_exemple() -> dict:
+    with open(os.path.join(RACINE, "profils.json"), encoding="utf-8") as f:
+        return next(iter(json.load(f).values()))
+
+
+def mesurer_calcul(repetitions: int) -> dict:
+    """Débit scalaire des fonctions de calcul, sans le cache de `calculer_couts_*_cache`."""
+    from utils import calculer_couts, calculer_couts_voiture, VeloParams, VoitureParams
+
+    velo = VeloParams.depuis_profil(_profil_exemple(), 3)
+    voiture = VoitureParams()
+    nb_appels = 20_000
+    return {
+        "calcul.calculer_couts": chronometrer(
+            lambda: calculer_couts(velo.prix_achat, velo.aide, velo.entretien_total, velo.duree, velo.fmd, velo.km_an),
+            nb_appels, repetitions),
+        "calcul.calculer_couts_voiture": chronometrer(lambda: calculer_couts_voiture(voiture), nb_appels, repetitions),
+    }
+
+
+def mesurer_figures(repetitions: int) -> dict:
+    """Temps de construction de chaque figure, cache vidé avant chaque appel."""
+    import figures
+
+    details = {"Amortissement": 1500.0, "Carburant": 900.0, "Assurance": 600.0, "Entretien": 800.0, "Autres frais": 300.0}
+    constructions = {
+        "figure_barres_cout_annuel": lambda: figures.figure_barres_cout_annuel(188.3, 0.0),
+        "figure_camembert_comparatif": lambda: figures.figure_camembert_comparatif(188.3, 2160, 0.35, "Voiture"),
+        "figure_camembert_repartition": lambda: figures.figure_camembert_repartition(details, "Répartition"),
+        "figure_projection_economies": lambda: figures.figure_projection_economies(
+            list(range(1, 11)), {"Min": [120.0 * a for a in range(1, 11)], "Max": [180.0 * a for a in range(1, 11)]}),
+    }
+    mesures = {}
+    for nom, construire in constructions.items():
+        construire()  # premier appel hors mesure : imports de plotly et pandas
+
+        def sans_cache(construire=construire):
+            figures.cache_figures.vider()
+            construire()
+
+        mesures[f"figures.{nom}"] = chronometrer(sans_cache, 5, repetitions)
+    return mesures
+
+
+def mesurer_exports(repetitions: int) -> dict:
+    """Temps d'un export PDF en mémoire et d'un export Excel (pandas et en flux)."""
+    from dataclasses import asdict
+
+    import pandas as pd
+
+    from export import export_excel, exporter_xlsx, generer_pdf, schema_velo
+    from utils import calculer_couts_velo_cache, VeloParams
+
+    resultats = asdict(calculer_couts_velo_cache(VeloParams.depuis_profil(_profil_exemple(), 3)))
+    tableau = pd.DataFrame([resultats] * 1000)
+    blocs = [{nom: tableau[nom].to_numpy() for nom in tableau.columns}]
+    generer_pdf(resultats)
+    return {
+        "exports.generer_pdf": chronometrer(lambda: generer_pdf(resultats), 10, repetitions),
+        "exports.export_excel_1000_lignes": chronometrer(lambda: export_excel(tableau, io.BytesIO()), 1, repetitions),
+        "exports.exporter_xlsx_1000_lignes": chronometrer(
+            lambda: exporter_xlsx(blocs, io.BytesIO(), schema=schema_velo()), 1, repetitions),
+    }
+
+
+def mesurer_application(repetitions: int) -> dict:
+    """Latence d'une réexécution complète de `app.py` pour chaque onglet ouvert."""
+    from streamlit.testing.v1 import AppTest
+
+    mesures = {}
+    dossier_initial = os.getcwd()
+    os.chdir(RACINE)  # les fichiers de profils sont relatifs au dossier courant
+    try:
+        at = AppTest.from_file(os.path.join(RACINE, "app.py"), default_timeout=120).run()
+        if at.exception:
+            raise RuntimeError(f"Erreur à l'exécution de app.py : {at.exception[0].message}")
+        for onglet in ("🚲 Simulateur Vélo", "🚗 Simulateur Voiture", "📊 Tableau de Comparaison"):
+            at.session_state["onglet_actif"] = onglet
+            at.run()
+            cle = onglet.split(" ", 1)[1].lower().replace(" ", "_")
+            mesures[f"application.rerun_{cle}"] = chronometrer(at.run, 3, repetitions)
+    finally:
+        os.chdir(dossier_initial)
+    return mesures
+
+
+GROUPES = {
+    "calcul": mesurer_calcul,
+    "figures": mesurer_figures,
+    "exports": mesurer_exports,
+    "application": mesurer_application,
+}
+
+
+def executer(groupes=tuple(GROUPES), repetitions: int = 5) -> dict:
+    """Exécute les groupes de mesures demandés et renvoie un rapport sérialisable en JSON."""
+    mesures = {}
+    for groupe in groupes:
+        mesures.update(GROUPES[groupe](repetitions))
+    return {
+        "date": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "repetitions": repetitions,
+        "mesures_s": mesures,
+    }
+
+
+def comparer(rapport: dict, reference: dict, seuil: float = SEUIL_REGRESSION) -> list:
+    """
+    Compare un rapport à la référence.
+
+    Renvoie la liste des régressions : mesures présentes des deux côtés dont le
+    rapport actuel / référence dépasse 1 + `seuil`.
+    """
+    regressions = []
+    for nom, duree in rapport["mesures_s"].items():
+        duree_reference = reference.get("mesures_s", {}).get(nom)
+        if duree_reference and duree > duree_reference * (1 + seuil):
+            regressions.append({"mesure": nom, "reference_s": duree_reference, "actuel_s": duree,
+                                "ratio": duree / duree_reference})
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmarks de RideCostCompare.")
+    parser.add_argument("--groupes", nargs="+", choices=list(GROUPES), default=list(GROUPES))
+    parser.add_argument("--repetitions", type=int, default=5)
+    parser.add_argument("--reference", default=FICHIER_REFERENCE, help="Fichier JSON de référence.")
+    parser.add_argument("--seuil", type=float, default=SEUIL_REGRESSION,
+                        help="Ralentissement relatif toléré (0.2 = +20 %%).")
+    parser.add_argument("--enregistrer", action="store_true", help="Enregistre les mesures comme nouvelle référence.")
+    parser.add_argument("--sortie", help="Écrit aussi le rapport JSON dans ce fichier.")
+    args = parser.parse_args(argv)
+
+    rapport = executer(args.groupes, args.repetitions)
+    if args.sortie:
+        with open(args.sortie, "w", encoding="utf-8") as f:
+            json.dump(rapport, f, indent=2, ensure_ascii=False)
+
+    if args.enregistrer:
+        reference = {}
+        if os.path.exists(args.reference):
+            with open(args.reference, encoding="utf-8") as f:
+                reference = json.load(f)
+        # Les groupes non exécutés gardent leur référence précédente
+        rapport_reference = dict(rapport, mesures_s={**reference.get("mesures_s", {}), **rapport["mesures_s"]})
+        with open(args.reference, "w", encoding="utf-8") as f:
+            json.dump(rapport_reference, f, indent=2, ensure_ascii=False)
+            f.write("\n")
+        print(json.dumps(rapport, indent=2, ensure_ascii=False))
+        return 0
+
+    if not os.path.exists(args.reference):
+        print(json.dumps(rapport, indent=2, ensure_ascii=False))
+        print(f"Aucune référence ({args.reference}) : relancer avec --enregistrer.", file=sys.stderr)
+        return 0
+
+    with open(args.reference, encoding="utf-8") as f:
+        reference = json.load(f)
+    for nom, duree in rapport["mesures_s"].items():
+        duree_reference = reference.get("mesures_s", {}).get(nom)
+        ecart = f"{duree / duree_reference - 1:+.0%}" if duree_reference else "nouveau"
+        print(f"{nom:<45} {duree * 1e3:10.3f} ms  ({ecart})")
+
+    regressions = comparer(rapport, reference, args.seuil)
+    for r in regressions:
+        print(f"RÉGRESSION {r['mesure']} : {r['reference_s'] * 1e3:.3f} ms -> {r['actuel_s'] * 1e3:.3f} ms "
+              f"(x{r['ratio']:.2f})", file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
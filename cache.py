@@ -0,0 +1,89 @@
+# cache.py
+"""
+Cache LRU borné, partagé entre les sessions du processus.
+
+Les clés doivent être hachables : on y place des paramètres immuables
+(`VeloParams`, `VoitureParams`...) et on y lit des résultats qui ne doivent
+pas être modifiés par l'appelant.
+"""
+import threading
+from collections import OrderedDict
+from functools import wraps
+from typing import Any, Callable, Dict, Hashable
+
+
+class LRUCache:
+    """Dictionnaire borné qui évince l'entrée la moins récemment utilisée."""
+
+    def __init__(self, taille_max: int = 128):
+        if taille_max < 0:
+            raise ValueError("taille_max doit être positive ou nulle.")
+        self.taille_max = taille_max
+        self.hits = 0
+        self.misses = 0
+        self._donnees: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._verrou = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._donnees)
+
+    def __contains__(self, cle: Hashable) -> bool:
+        return cle in self._donnees
+
+    def get_or_compute(self, cle: Hashable, calculer: Callable[[], Any]) -> Any:
+        """Renvoie la valeur associée à `cle`, en la calculant et la stockant si besoin."""
+        with self._verrou:
+            if cle in self._donnees:
+                self._donnees.move_to_end(cle)
+                self.hits += 1
+                return self._donnees[cle]
+            self.misses += 1
+        # Le calcul se fait hors verrou : deux sessions peuvent calculer la même clé, sans conséquence
+        valeur = calculer()
+        self.set(cle, valeur)
+        return valeur
+
+    def set(self, cle: Hashable, valeur: Any) -> None:
+        with self._verrou:
+            if self.taille_max == 0:
+                return
+            self._donnees[cle] = valeur
+            self._donnees.move_to_end(cle)
+            while len(self._donnees) > self.taille_max:
+                self._donnees.popitem(last=False)
+
+    def redimensionner(self, taille_max: int) -> None:
+        """Change la taille maximale, en évinçant les entrées les plus anciennes si besoin."""
+        with self._verrou:
+            self.taille_max = taille_max
+            while len(self._donnees) > taille_max:
+                self._donnees.popitem(last=False)
+
+    def vider(self) -> None:
+        with self._verrou:
+            self._donnees.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "taille": len(self._donnees), "taille_max": self.taille_max}
+
+
+def memoize(taille_max: int = 128):
+    """
+    Décorateur de mémoïsation à éviction LRU.
+
+    La fonction décorée expose son cache via l'attribut `cache` (statistiques,
+    vidage, redimensionnement). Les arguments doivent être hachables.
+    """
+    def decorateur(fonction):
+        cache = LRUCache(taille_max)
+
+        @wraps(fonction)
+        def enveloppe(*args, **kwargs):
+            cle = (args, tuple(sorted(kwargs.items()))) if kwargs else args
+            return cache.get_or_compute(cle, lambda: fonction(*args, **kwargs))
+
+        enveloppe.cache = cache
+        return enveloppe
+    return decorateur
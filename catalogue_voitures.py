@@ -0,0 +1,193 @@
+# catalogue_voitures.py
+"""
+Catalogue local de modèles de voitures, pour préremplir le simulateur voiture.
+
+Le catalogue est un dossier de colonnes binaires construit une fois à partir
+d'un CSV (`python catalogue_voitures.py modeles.csv voitures.catalogue`) :
+- `meta.json` : nombre de modèles, types de carburant, nombre d'années de la courbe de revente ;
+- `libelles.bin` / `libelles_offsets.npy` : libellés UTF-8 bout à bout ;
+- `prix.npy`, `consommation.npy`, `carburant.npy`, `revente.npy` : colonnes par modèle
+  (la courbe de revente donne la valeur résiduelle, en fraction du prix, après 1, 2... ans) ;
+- `index_cles.npy` / `index_lignes.npy` : index trié des débuts de mots des libellés normalisés.
+
+À l'ouverture, les colonnes sont projetées en mémoire (`mmap`) sans être lues ;
+seul l'index de recherche est chargé. La recherche par préfixe est une double
+recherche dichotomique dans l'index, et `params()` lit une seule ligne des colonnes.
+
+CSV source : colonnes `modele` (libellé complet), `prix`, `consommation`
+(L/100 km, ou kWh/100 km en électrique), `carburant` et, au choix, `revente_1`...
+`revente_N` (fractions du prix) ou `decote_annuelle`.
+"""
+import json
+import os
+import re
+import sys
+import unicodedata
+from dataclasses import replace
+from typing import List, Optional
+
+import numpy as np
+
+from config import AppConfig
+from utils import VoitureParams
+
+VERSION_FORMAT = 1
+_LONGUEUR_CLE = 48  # octets gardés par clé d'index (les requêtes plus longues sont tronquées)
+
+
+class CatalogueVoituresError(Exception):
+    """Catalogue absent, incomplet ou d'un format inconnu."""
+
+
+def normaliser(texte: str) -> str:
+    """Minuscules sans accents, mots séparés par une espace (forme des clés de recherche)."""
+    texte = unicodedata.normalize("NFKD", texte)
+    texte = "".join(c for c in texte if not unicodedata.combining(c)).lower()
+    return " ".join(re.findall(r"[a-z0-9]+", texte))
+
+
+def _cles_index(libelle_normalise: str) -> List[bytes]:
+    """Clés d'un libellé : le libellé à partir de chacun de ses mots ("renault clio", "clio")."""
+    cles = []
+    debut = 0
+    for mot in libelle_normalise.split(" "):
+        cles.append(libelle_normalise[debut:].encode("ascii")[:_LONGUEUR_CLE])
+        debut += len(mot) + 1
+    return cles
+
+
+class CatalogueVoitures:
+    """Catalogue ouvert en lecture seule (colonnes projetées en mémoire)."""
+
+    def __init__(self, chemin: str = AppConfig.CATALOGUE_VOITURES):
+        self.chemin = chemin
+        try:
+            with open(os.path.join(chemin, "meta.json"), encoding="utf-8") as f:
+                meta = json.load(f)
+            if meta.get("version") != VERSION_FORMAT:
+                raise CatalogueVoituresError(f"Version de catalogue non prise en charge : {meta.get('version')}")
+            charger = lambda nom, **kwargs: np.load(os.path.join(chemin, f"{nom}.npy"), **kwargs)
+            self.carburants = tuple(meta["carburants"])
+            self.prix = charger("prix", mmap_mode="r")
+            self.consommation = charger("consommation", mmap_mode="r")
+            self.carburant = charger("carburant", mmap_mode="r")
+            self.revente = charger("revente", mmap_mode="r")
+            self._offsets = charger("libelles_offsets", mmap_mode="r")
+            self._libelles = np.memmap(os.path.join(chemin, "libelles.bin"), dtype=np.uint8, mode="r") \
+                if meta["nb_modeles"] else np.zeros(0, dtype=np.uint8)
+            # L'index est lu en entier : c'est lui que parcourent les recherches
+            self._cles = charger("index_cles")
+            self._lignes = charger("index_lignes")
+        except FileNotFoundError as e:
+            raise CatalogueVoituresError(f"Catalogue de voitures introuvable ou incomplet ({chemin}) : {e}") from e
+        self._nb_modeles = meta["nb_modeles"]
+
+    def __len__(self) -> int:
+        return self._nb_modeles
+
+    def libelle(self, ligne: int) -> str:
+        return bytes(self._libelles[self._offsets[ligne]:self._offsets[ligne + 1]]).decode("utf-8")
+
+    def rechercher(self, texte: str, limite: int = 20) -> List[int]:
+        """Lignes des modèles dont un mot du libellé commence par `texte` (ordre alphabétique)."""
+        requete = normaliser(texte).encode("ascii")[:_LONGUEUR_CLE]
+        if not requete:
+            return []
+        debut = np.searchsorted(self._cles, requete, side="left")
+        fin = np.searchsorted(self._cles, requete + b"\xff", side="left")
+        return np.unique(self._lignes[debut:fin])[:limite].tolist()
+
+    def modele(self, ligne: int) -> dict:
+        """Fiche d'un modèle : libellé, prix, consommation, carburant et courbe de revente."""
+        return {
+            "modele": self.libelle(ligne),
+            "prix": int(self.prix[ligne]),
+            "consommation": round(float(self.consommation[ligne]), 2),
+            "carburant": self.carburants[self.carburant[ligne]],
+            "revente": [round(v, 4) for v in self.revente[ligne].tolist()],
+        }
+
+    def params(self, ligne: int, base: Optional[VoitureParams] = None,
+               duree_possession: Optional[int] = None) -> VoitureParams:
+        """
+        `VoitureParams` préremplis avec un modèle du catalogue.
+
+        Les champs absents du catalogue (assurance, entretien, kilométrage...)
+        sont repris de `base`. La valeur de revente est lue sur la courbe du
+        modèle à la durée de possession (bornée au nombre d'années de la courbe).
+        """
+        base = base if base is not None else VoitureParams()
+        duree = duree_possession or base.duree_possession
+        prix = int(self.prix[ligne])
+        courbe = self.revente[ligne]
+        fraction = float(courbe[min(max(duree, 1), len(courbe)) - 1])
+        carburant = self.carburants[self.carburant[ligne]]
+        return replace(
+            base, prix_achat=prix, valeur_revente=int(round(prix * fraction)), duree_possession=duree,
+            consommation=round(float(self.consommation[ligne]), 2),
+            prix_carburant=AppConfig.PRIX_CARBURANT_PAR_TYPE.get(carburant, base.prix_carburant),
+        )
+
+
+def construire_catalogue(source: str, destination: str, annees_revente: int = AppConfig.CATALOGUE_ANNEES_REVENTE) -> int:
+    """Construit le dossier du catalogue à partir d'un CSV de modèles ; renvoie le nombre de modèles."""
+    import pandas as pd
+
+    modeles = pd.read_csv(source)
+    manquantes = [c for c in ("modele", "prix", "consommation", "carburant") if c not in modeles.columns]
+    if manquantes:
+        raise CatalogueVoituresError(f"Colonnes manquantes dans {source} : {', '.join(manquantes)}")
+    modeles = modeles.dropna(subset=["modele", "prix", "consommation", "carburant"])
+    modeles["modele"] = modeles["modele"].astype(str).str.strip()
+    modeles["_cle"] = modeles["modele"].map(normaliser)
+    modeles = modeles.sort_values("_cle", kind="stable").reset_index(drop=True)
+
+    colonnes_revente = [f"revente_{a}" for a in range(1, annees_revente + 1)]
+    if all(c in modeles.columns for c in colonnes_revente):
+        revente = modeles[colonnes_revente].to_numpy(dtype=np.float32)
+    else:
+        decote = modeles["decote_annuelle"] if "decote_annuelle" in modeles.columns else AppConfig.CATALOGUE_DECOTE_ANNUELLE
+        decote = np.asarray(decote, dtype=np.float64).reshape(-1, 1)
+        revente = ((1 - decote) ** np.arange(1, annees_revente + 1)).astype(np.float32)
+        revente = np.broadcast_to(revente, (len(modeles), annees_revente))
+
+    types_carburant = modeles["carburant"].astype(str).map(normaliser)
+    carburants = sorted(types_carburant.unique())
+    codes = types_carburant.map({c: i for i, c in enumerate(carburants)})
+
+    libelles = [m.encode("utf-8") for m in modeles["modele"]]
+    offsets = np.zeros(len(libelles) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(b) for b in libelles])
+
+    cles, lignes = [], []
+    for ligne, cle in enumerate(modeles["_cle"]):
+        for sous_cle in _cles_index(cle):
+            cles.append(sous_cle)
+            lignes.append(ligne)
+    ordre = sorted(range(len(cles)), key=cles.__getitem__)
+
+    os.makedirs(destination, exist_ok=True)
+    if os.path.exists(os.path.join(destination, "meta.json")):
+        os.remove(os.path.join(destination, "meta.json"))
+    sauver = lambda nom, valeurs: np.save(os.path.join(destination, f"{nom}.npy"), valeurs)
+    sauver("prix", modeles["prix"].to_numpy(dtype=np.int32))
+    sauver("consommation", modeles["consommation"].to_numpy(dtype=np.float32))
+    sauver("carburant", codes.to_numpy(dtype=np.uint8))
+    sauver("revente", np.ascontiguousarray(revente, dtype=np.float32))
+    sauver("libelles_offsets", offsets)
+    sauver("index_cles", np.array([cles[i] for i in ordre], dtype=f"S{_LONGUEUR_CLE}"))
+    sauver("index_lignes", np.array([lignes[i] for i in ordre], dtype=np.int32))
+    with open(os.path.join(destination, "libelles.bin"), "wb") as f:
+        f.write(b"".join(libelles))
+    # meta.json en dernier : un catalogue sans meta.json est considéré comme absent
+    with open(os.path.join(destination, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump({"version": VERSION_FORMAT, "nb_modeles": len(modeles), "carburants": carburants,
+                   "annees_revente": annees_revente}, f)
+    return len(modeles)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        print("Usage : python catalogue_voitures.py <modeles.csv> <dossier du catalogue>", file=sys.stderr)
+        sys.exit(2)
+    print(f"{construire_catalogue(sys.argv[1], sys.argv[2])} modèles dans {sys.argv[2]}.")
@@ -1,14 +1,15 @@
 # charts.py
-import plotly.graph_objects as go
-import plotly.express as px
-import pandas as pd
+# Affichage Streamlit des figures. La construction (pure et mise en cache) est dans
+# figures.py ; plotly et pandas n'y sont importés qu'au premier graphique affiché.
 import streamlit as st
+from figures import (
+    figure_barres_cout_annuel, figure_camembert_comparatif,
+    figure_camembert_repartition, figure_heatmap_economies,
+    figure_projection_economies
+)
 
 def afficher_graphiques(resultats):
-    labels = ['Coût annuel sans FMD', 'Coût annuel avec FMD']
-    values = [resultats['cout_annuel'], resultats['cout_annuel_fmd']]
-    fig = go.Figure(data=[go.Bar(x=labels, y=values, marker_color=['#636EFA', '#00CC96'])])
-    fig.update_layout(title="Comparaison du coût annuel du vélo (avec/sans Forfait Mobilités Durables)", yaxis_title="€ / an")
+    fig = figure_barres_cout_annuel(resultats['cout_annuel'], resultats['cout_annuel_fmd'])
     st.plotly_chart(fig, use_container_width=True)
 
 def afficher_comparaison(resultats, mode_comparaison, config):
@@ -18,34 +19,21 @@ def afficher_camembert(prix_achat, aide, entretien_total, fmd, duree):
     pass
 
 def afficher_camembert_comparatif(resultats, mode_comparaison, config, return_fig=False):
-    if mode_comparaison == "Aucun":
-        return go.Figure() if return_fig else None
-
-    labels = ["Vélo (après FMD)"]
-    values = [resultats['cout_annuel_fmd']]
-    label_comparatif = ""
-
-    if "Voiture" in mode_comparaison:
-        label_comparatif = "Voiture"
-        cout_voiture_km = config.get('COUT_VOITURE_KM', 0)
-        km_an = resultats.get('km_an', 0)
-        values.append(km_an * cout_voiture_km)
-    
-    fig = None
-    if label_comparatif:
-        labels.append(label_comparatif)
-        data = pd.DataFrame({"Mode": labels, "Coût Annuel": values})
-        fig = px.pie(data, values='Coût Annuel', names='Mode', title="Répartition des coûts annuels par mode",
-                     color_discrete_map={"Vélo (après FMD)": "#00CC96", "Transports": "#AB63FA", "Voiture": "#FFA15A"})
-        fig.update_traces(textinfo='percent+value+label', hole=0.4)
+    fig = figure_camembert_comparatif(
+        resultats['cout_annuel_fmd'], resultats.get('km_an', 0),
+        config.get('COUT_VOITURE_KM', 0), mode_comparaison
+    )
 
     if return_fig:
+        import plotly.graph_objects as go
         return fig if fig else go.Figure()
 
     if fig:
         st.plotly_chart(fig, use_container_width=True)
 
 def afficher_tableau_details(resultats):
+    import pandas as pd
+
     st.markdown("### 📊 Détail des coûts du vélo")
     data = {
         "Poste": ["Coût total", "Coût annuel", "Coût mensuel", "Coût par km"],
@@ -71,30 +59,28 @@ def afficher_camembert_repartition(details: dict, title: str):
         st.warning("Données de répartition non disponibles.")
         return
     
-    valid_details = {k: v for k, v in details.items() if v > 0}
-    if not valid_details:
+    fig = figure_camembert_repartition(details, title)
+    if fig is None:
         st.info("Aucun coût à afficher dans la répartition.")
         return
 
-    data = pd.DataFrame(list(valid_details.items()), columns=['Poste', 'Coût'])
-    fig = px.pie(data, values='Coût', names='Poste', title=title, hole=0.4)
-    fig.update_traces(textinfo='percent+label', textposition='inside')
     st.plotly_chart(fig, use_container_width=True)
 
-def afficher_graphique_economies_cumulees(economie_annuelle: float, duree_annees: int = 10):
-    """Affiche un graphique linéaire des économies cumulées sur plusieurs années."""
-    if economie_annuelle <= 0:
-        st.info("Le graphique des économies cumulées n'est pas affiché car il n'y a pas d'économie annuelle.")
+def afficher_heatmap_economies(grille, distances_rentabilite=None):
+    """Affiche la carte de chaleur d'une `rentabilite.GrilleEconomies`."""
+    fig = figure_heatmap_economies(
+        grille.jours.tolist(), grille.distances.tolist(), grille.economies.tolist(), distances_rentabilite
+    )
+    st.plotly_chart(fig, use_container_width=True)
+
+def afficher_projection_economies(resultats, noms_scenarios):
+    """Affiche les économies cumulées (brutes et actualisées) d'une `projection.ResultatsProjection`."""
+    series = {}
+    for i, nom in enumerate(noms_scenarios):
+        series[nom] = resultats.economies_cumulees[i].tolist()
+        series[f"{nom} (actualisé)"] = resultats.economies_actualisees_cumulees[i].tolist()
+    fig = figure_projection_economies(resultats.annees.tolist(), series)
+    if fig is None:
+        st.info("Aucune projection à afficher.")
         return
-        
-    annees = list(range(1, duree_annees + 1))
-    economies = [economie_annuelle * annee for annee in annees]
-    
-    df = pd.DataFrame({
-        "Année": annees,
-        "Économies cumulées (€)": economies
-    })
-    
-    fig = px.line(df, x="Année", y="Économies cumulées (€)", title="Projection des économies sur 10 ans", markers=True)
-    fig.update_layout(yaxis_title="Économies cumulées (€)")
-    st.plotly_chart(fig, use_container_width=True)
\ No newline at end of file
+    st.plotly_chart(fig, use_container_width=True)
@@ -0,0 +1,138 @@
+# classement.py
+"""
+Classement de tous les profils vélo pour un même trajet et une même voiture.
+
+Les champs vélo des profils (prix, aide, entretien, durée, FMD) sont mis en
+colonnes une seule fois (`ProfilsEnColonnes`) ; le trajet de l'utilisateur et
+les paramètres voiture sont ensuite appliqués à toutes les lignes en un seul
+appel à `calculer_profils_batch`, pour les scénarios min et max de jours.
+"""
+from dataclasses import asdict
+from typing import Dict, Hashable, Iterable, List, Mapping, Tuple
+
+import numpy as np
+
+from batch import PREFIXE_VOITURE, calculer_profils_batch
+from cache import memoize
+from config import AppConfig
+from utils import VoitureParams
+
+# Champs propres au vélo (le trajet vient de l'utilisateur)
+CHAMPS_VELO = ("prix_achat", "aide", "entretien_annuel", "duree", "fmd")
+# Champs du trajet et valeurs par défaut (mêmes que `batch.km_an_velo_batch`)
+TRAJET_DEFAUT = {"km_jour": 0, "nb_trajets_jour": 2, "jours_semaine_min": 0, "jours_semaine_max": 0}
+
+# Critères de classement (économie : la plus grande d'abord ; coût par km : le plus petit d'abord)
+CRITERES = {
+    "economie": "Économie annuelle",
+    "cout_km": "Coût par km (FMD déduit)",
+}
+
+
+class ProfilsEnColonnes:
+    """
+    Champs vélo de profils, une colonne NumPy par champ (profils incomplets écartés).
+
+    `cle` identifie le contenu (ex. version du catalogue) : deux objets de même
+    clé sont égaux, ce qui permet au cache de `_classer` de servir les copies
+    refaites à chaque réexécution. Sans clé, l'égalité est l'identité.
+    """
+
+    __slots__ = ("noms", "colonnes", "cle")
+
+    def __init__(self, noms: List[str], colonnes: Dict[str, np.ndarray], cle: Hashable = None):
+        self.noms = noms
+        self.colonnes = colonnes
+        self.cle = cle
+
+    @classmethod
+    def depuis_profils(cls, profils: Iterable[Tuple[str, Mapping]], cle: Hashable = None) -> "ProfilsEnColonnes":
+        noms, lignes = [], []
+        for nom, data in profils:
+            if data and all(isinstance(data.get(champ), (int, float)) for champ in CHAMPS_VELO):
+                noms.append(nom)
+                lignes.append([data[champ] for champ in CHAMPS_VELO])
+        valeurs = np.array(lignes, dtype=np.float64).reshape(len(lignes), len(CHAMPS_VELO))
+        return cls(noms, {champ: valeurs[:, i].copy() for i, champ in enumerate(CHAMPS_VELO)}, cle)
+
+    def avec_modifications(self, modifies: Mapping[str, Mapping], supprimes=()) -> "ProfilsEnColonnes":
+        """Copie avec des profils remplacés, ajoutés ou retirés (ex. modifications d'une session)."""
+        if not modifies and not supprimes:
+            return self
+        cle = None
+        if self.cle is not None:
+            # Seuls les champs vélo des profils modifiés changent les colonnes
+            cle = (self.cle, frozenset((nom, tuple(data.get(champ) for champ in CHAMPS_VELO) if data else None)
+                                       for nom, data in modifies.items()), frozenset(supprimes))
+        retires = set(modifies) | set(supprimes)
+        garder = np.array([nom not in retires for nom in self.noms], dtype=bool)
+        ajouts = ProfilsEnColonnes.depuis_profils(modifies.items())
+        return ProfilsEnColonnes(
+            [nom for nom, garde in zip(self.noms, garder) if garde] + ajouts.noms,
+            {champ: np.concatenate([valeurs[garder], ajouts.colonnes[champ]]) for champ, valeurs in self.colonnes.items()},
+            cle,
+        )
+
+    def __len__(self) -> int:
+        return len(self.noms)
+
+    def __eq__(self, autre) -> bool:
+        if self.cle is None or not isinstance(autre, ProfilsEnColonnes):
+            return self is autre
+        return self.cle == autre.cle
+
+    def __hash__(self) -> int:
+        return id(self) if self.cle is None else hash(self.cle)
+
+
+@memoize(AppConfig.CLASSEMENT_TAILLE_CACHE)
+def _classer(profils: ProfilsEnColonnes, trajet: tuple, voiture_params: VoitureParams, critere: str, k: int):
+    import pandas as pd
+
+    colonnes = dict(profils.colonnes)
+    colonnes.update(trajet)
+    colonnes.update({PREFIXE_VOITURE + nom: valeur for nom, valeur in asdict(voiture_params).items()})
+    resultats = calculer_profils_batch(colonnes)
+
+    economie_min = np.broadcast_to(resultats["economie_min"], (len(profils),))
+    economie_max = np.broadcast_to(resultats["economie_max"], (len(profils),))
+    cout_km_min = resultats["velo_min_cout_km_fmd"]
+    cout_km_max = resultats["velo_max_cout_km_fmd"]
+    economie = (economie_min + economie_max) / 2
+    cout_km = (cout_km_min + cout_km_max) / 2
+    # Quand le FMD couvre tout le coût du vélo, les deux critères sont à égalité :
+    # le coût annuel avant FMD (le plus faible d'abord) départage
+    cout_brut = (resultats["velo_min_cout_annuel"] + resultats["velo_max_cout_annuel"]) / 2
+
+    # np.lexsort trie sur la dernière clé d'abord ; il est stable (ordre des profils en dernier recours)
+    if critere == "economie":
+        ordre = np.lexsort((cout_brut, cout_km, -economie))
+    else:
+        ordre = np.lexsort((cout_brut, -economie, cout_km))
+    ordre = ordre[:k]
+    return pd.DataFrame({
+        "rang": np.arange(1, len(ordre) + 1),
+        "profil": [profils.noms[i] for i in ordre],
+        "economie_min": economie_min[ordre],
+        "economie_max": economie_max[ordre],
+        "cout_annuel_min": resultats["velo_min_cout_annuel_fmd"][ordre],
+        "cout_annuel_max": resultats["velo_max_cout_annuel_fmd"][ordre],
+        "cout_km_min": cout_km_min[ordre],
+        "cout_km_max": cout_km_max[ordre],
+    })
+
+
+def classer_profils(profils: ProfilsEnColonnes, trajet: Mapping, voiture_params: VoitureParams,
+                    critere: str = "economie", k: int = 10):
+    """
+    Les `k` meilleurs profils pour le trajet (`km_jour`, `nb_trajets_jour`,
+    `jours_semaine_min/max`, ex. ceux du profil actif) et la voiture donnés.
+
+    Renvoie un DataFrame trié (rang, profil, fourchette d'économie, coût annuel
+    vélo et coût par km des scénarios min et max) ; les économies suivent les
+    conventions de l'onglet de comparaison.
+    """
+    if critere not in CRITERES:
+        raise ValueError(f"Critère de classement inconnu : '{critere}'")
+    trajet = tuple((champ, trajet.get(champ, defaut)) for champ, defaut in TRAJET_DEFAUT.items())
+    return _classer(profils, trajet, voiture_params, critere, int(k)).copy()
@@ -0,0 +1,143 @@
+# cli.py
+"""
+Point d'entrée en ligne de commande, sans Streamlit.
+
+Lit un fichier CSV ou JSONL de profils (une ligne par salarié, avec les champs de
+`profils.json` et éventuellement ceux de `VoitureParams`) par blocs, calcule la
+fourchette vélo/voiture de chaque ligne et écrit les résultats au fil de l'eau
+(CSV, JSONL, Excel ou Parquet). La mémoire utilisée ne dépend que de la taille des blocs.
+
+Exemple :
+    python cli.py salaries.csv -o resultats.csv --taille-bloc 50000
+    python cli.py salaries.csv -o resultats.parquet
+"""
+import argparse
+import sys
+from dataclasses import fields
+
+import pandas as pd
+
+from batch import PREFIXE_VOITURE, calculer_profils_batch
+from utils import VoitureParams
+
+FORMATS = ("csv", "jsonl")
+# Formats binaires écrits par les exportateurs en colonnes d'export.py
+FORMATS_EXPORT = ("xlsx", "parquet")
+# Champs numériques d'une ligne de profil (voir `calculer_profils_batch`)
+CHAMPS_PROFIL = ("prix_achat", "aide", "entretien_annuel", "duree", "fmd",
+                 "km_jour", "nb_trajets_jour", "jours_semaine_min", "jours_semaine_max")
+
+
+def _deviner_format(chemin: str, defaut: str = "csv") -> str:
+    """Déduit le format d'un fichier à partir de son extension."""
+    if chemin.endswith((".jsonl", ".ndjson")):
+        return "jsonl"
+    if chemin.endswith(".csv"):
+        return "csv"
+    if chemin.endswith(".xlsx"):
+        return "xlsx"
+    if chemin.endswith(".parquet"):
+        return "parquet"
+    return defaut
+
+
+def lire_blocs(source, format_entree: str, taille_bloc: int):
+    """Itère sur les profils d'entrée par DataFrames d'au plus `taille_bloc` lignes."""
+    if format_entree == "jsonl":
+        return pd.read_json(source, lines=True, chunksize=taille_bloc, precise_float=True)
+    return pd.read_csv(source, chunksize=taille_bloc, float_precision="round_trip")
+
+
+def calculer_blocs(blocs):
+    """Ajoute à chaque bloc les colonnes de résultats de `calculer_profils_batch`."""
+    for bloc in blocs:
+        yield pd.concat([bloc, calculer_profils_batch(bloc)], axis=1)
+
+
+def ecrire_blocs(blocs, destination, format_sortie: str) -> int:
+    """Écrit les blocs de résultats dans `destination` et renvoie le nombre de lignes écrites."""
+    nb_lignes = 0
+    for bloc in blocs:
+        if format_sortie == "jsonl":
+            bloc.to_json(destination, orient="records", lines=True, force_ascii=False, double_precision=15)
+        else:
+            bloc.to_csv(destination, index=False, header=(nb_lignes == 0))
+        nb_lignes += len(bloc)
+    return nb_lignes
+
+
+def schema_entree(colonnes) -> list:
+    """
+    Schéma explicite des colonnes d'entrée, indépendant des types lus dans chaque bloc.
+
+    Les champs de profil et de `VoitureParams` (préfixés `voiture_`) sont des
+    flottants ; les autres colonnes (identifiant, site...) sont exportées en texte,
+    le seul type qui accepte tout ce qu'un bloc suivant peut contenir.
+    """
+    numeriques = set(CHAMPS_PROFIL) | {PREFIXE_VOITURE + f.name for f in fields(VoitureParams)}
+    return [(nom, "float64" if nom in numeriques else "str") for nom in colonnes]
+
+
+def exporter_blocs(blocs, destination: str, format_sortie: str) -> int:
+    """
+    Écrit les blocs de résultats en Excel ou Parquet avec un schéma fixe.
+
+    Les colonnes d'entrée suivent `schema_entree` (noms lus dans le premier
+    bloc) ; les colonnes de résultats suivent `export.schema_profils()`.
+    """
+    from export import EXPORTEURS, schema_profils
+
+    blocs = iter(blocs)
+    premier = next(blocs, None)
+    if premier is None:
+        return EXPORTEURS[format_sortie]((), destination, schema=schema_profils())
+    colonnes_resultats = schema_profils()
+    noms_resultats = {nom for nom, _ in colonnes_resultats}
+    schema = schema_entree([c for c in premier.columns if c not in noms_resultats]) + colonnes_resultats
+
+    def tous_les_blocs():
+        yield premier
+        yield from blocs
+
+    return EXPORTEURS[format_sortie](tous_les_blocs(), destination, schema=schema)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Calcule en lot la comparaison vélo/voiture de profils salariés.")
+    parser.add_argument("entree", help="Fichier CSV ou JSONL de profils ('-' pour l'entrée standard).")
+    parser.add_argument("-o", "--sortie", default="-", help="Fichier de résultats ('-' pour la sortie standard).")
+    parser.add_argument("--format-entree", choices=FORMATS, help="Format d'entrée (déduit de l'extension par défaut).")
+    parser.add_argument("--format-sortie", choices=FORMATS + FORMATS_EXPORT, help="Format de sortie (déduit de l'extension par défaut).")
+    parser.add_argument("--taille-bloc", type=int, default=10000, help="Nombre de lignes traitées par bloc.")
+    args = parser.parse_args(argv)
+
+    if args.taille_bloc <= 0:
+        parser.error("--taille-bloc doit être strictement positif.")
+
+    format_entree = args.format_entree or _deviner_format(args.entree)
+    format_sortie = args.format_sortie or _deviner_format(args.sortie)
+    if format_sortie == "parquet":
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            parser.error("L'export Parquet nécessite pyarrow (dépendance optionnelle) : pip install pyarrow")
+
+    source = sys.stdin if args.entree == "-" else args.entree
+    blocs = calculer_blocs(lire_blocs(source, format_entree, args.taille_bloc))
+
+    if format_sortie in FORMATS_EXPORT:
+        if args.sortie == "-":
+            parser.error(f"Le format {format_sortie} nécessite un fichier de sortie (-o).")
+        nb_lignes = exporter_blocs(blocs, args.sortie, format_sortie)
+    elif args.sortie == "-":
+        nb_lignes = ecrire_blocs(blocs, sys.stdout, format_sortie)
+    else:
+        with open(args.sortie, "w", encoding="utf-8", newline="") as f:
+            nb_lignes = ecrire_blocs(blocs, f, format_sortie)
+
+    print(f"{nb_lignes} profils traités.", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
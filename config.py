@@ -17,8 +17,69 @@ class AppConfig:
     CO2_ABSORPTION_ARBRE_KG_PAR_AN = 22
     PRIX_MOYEN_CAFE = 3.12 # Vous pourrez ajuster ce prix
     
+    # Nombre maximal de résultats de calcul gardés en cache (par fonction, partagé entre sessions)
+    TAILLE_CACHE_RESULTATS = 1024
+
+    # Nombre maximal de figures Plotly gardées en cache (partagé entre sessions)
+    TAILLE_CACHE_FIGURES = 128
+    # Nombre maximal d'images de graphiques (PNG) gardées en cache pour les exports PDF
+    TAILLE_CACHE_IMAGES = 64
+
+    # Simulation Monte-Carlo
+    MONTE_CARLO_NB_TIRAGES = 100_000
+    MONTE_CARLO_GRAINE = 42
+
+    # Grille jours × distance du point de rentabilité (onglet de comparaison)
+    GRILLE_DISTANCE_MAX_KM = 40
+    GRILLE_PAS_KM = 0.5
+    TAILLE_CACHE_GRILLES = 32
+
+    # Projection pluriannuelle des flux (taux annuels) et horizon par défaut (ans)
+    PROJECTION_INFLATION = 0.02
+    PROJECTION_TAUX_ACTUALISATION = 0.03
+    PROJECTION_EVOLUTION_CARBURANT = 0.03
+    PROJECTION_HORIZON = 10
+
+    # Catalogue local de modèles de voitures (voir catalogue_voitures.py) : dossier, nombre
+    # d'années des courbes de revente et décote annuelle si le CSV source n'en donne pas
+    CATALOGUE_VOITURES = 'voitures.catalogue'
+    CATALOGUE_ANNEES_REVENTE = 10
+    CATALOGUE_DECOTE_ANNUELLE = 0.15
+    CATALOGUE_NB_SUGGESTIONS = 20
+    # Prix de l'énergie par type de carburant (€/L, ou €/kWh pour l'électrique)
+    PRIX_CARBURANT_PAR_TYPE = {"essence": 1.90, "diesel": 1.80, "gpl": 1.00, "hybride": 1.90, "electrique": 0.25}
+
+    # Historique des prix à la pompe (voir prix_carburants.py) : fichier d'agrégats, fenêtre
+    # de la moyenne proposée dans le simulateur voiture (jours) et taille des blocs de lecture
+    PRIX_CARBURANTS_AGREGATS = 'prix_carburants.npz'
+    PRIX_CARBURANTS_FENETRE_JOURS = 30
+    PRIX_CARBURANTS_TAILLE_BLOC = 1_000_000
+
+    # Distances domicile-travail hors ligne (voir distances.py) : facteurs de détour du réseau
+    # routier par tranche de distance à vol d'oiseau (km max, facteur), taille des cellules de
+    # l'index des sites (km) et décimales de km_jour
+    DISTANCES_FACTEURS_DETOUR = ((2, 1.45), (5, 1.35), (10, 1.3), (float("inf"), 1.25))
+    DISTANCES_TAILLE_CELLULE_KM = 25
+    DISTANCES_DECIMALES_KM = 1
+
+    # Instrumentation des temps par étape (voir instrumentation.py) et panneau de debug
+    INSTRUMENTATION_ACTIVE = False
+    FICHIER_METRIQUES = 'metriques.json'
+
     # Paramètres pour les profils par défaut (vélo et voiture)
     DEFAULT_PROFIL_VELO_FILE = 'profils.json'
+
+    # Stockage des profils : "sqlite" (base indexée) ou "json" (fichier unique)
+    PROFIL_BACKEND = "sqlite"
+    DEFAULT_PROFIL_DB_FILE = 'profils.db'
+    PROFILS_PAR_PAGE = 100
+    # Délai minimal entre deux vérifications de changement du stockage par le catalogue partagé (s)
+    CATALOGUE_INTERVALLE_VERIFICATION_S = 1.0
+    # Classement des profils pour le trajet actif (barre latérale) : nombre affiché par défaut et maximum
+    CLASSEMENT_K = 5
+    CLASSEMENT_K_MAX = 50
+    # Classements gardés en cache (chacun retient les colonnes de ses profils)
+    CLASSEMENT_TAILLE_CACHE = 32
     
     DEFAULT_VOITURE_PARAMS = {
         "prix_achat": 20000, 
@@ -0,0 +1,271 @@
+# distances.py
+"""
+Distances domicile-travail estimées hors ligne, à partir de coordonnées GPS.
+
+- `haversine_km` : distance à vol d'oiseau, vectorisée ;
+- `TableDetour` : facteur de détour du réseau routier par tranche de distance
+  (éventuellement propre à un site), appliqué à la distance à vol d'oiseau ;
+- `IndexSites` : index spatial des sites de l'entreprise, pour rattacher chaque
+  salarié au site le plus proche sans calculer toutes les paires ;
+- `completer_km_jour` : remplit la colonne `km_jour` (aller simple) d'un bloc de salariés.
+
+Colonnes attendues par salarié : `lat_domicile`, `lon_domicile` et, si le lieu
+de travail est connu, `lat_travail`, `lon_travail` (le salarié est alors rattaché
+au site le plus proche de son lieu de travail et la distance est calculée
+jusqu'à celui-ci). Fichier des sites : colonnes `site`, `lat`, `lon`.
+
+Exemple :
+    python distances.py salaries.csv --sites sites.csv -o salaries_km.csv
+    python distances.py salaries.csv --sites sites.csv --detour detour.csv --remplacer -o salaries_km.csv
+"""
+import argparse
+import math
+import sys
+from typing import Dict, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+from config import AppConfig
+
+RAYON_TERRE_KM = 6371.0088  # rayon moyen (IUGG)
+_TAILLE_LOT_REQUETES = 65_536
+_VALEURS_PAR_LOT = 4_000_000  # taille maximale des matrices cellules × sites
+
+
+def haversine_km(lat1, lon1, lat2, lon2) -> np.ndarray:
+    """Distance à vol d'oiseau (km) entre deux points ou deux séries de points (degrés)."""
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(v, dtype=np.float64)) for v in (lat1, lon1, lat2, lon2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * RAYON_TERRE_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def _vecteurs_unitaires(lat, lon) -> np.ndarray:
+    """Points de la sphère unité (N × 3) : la distance euclidienne croît avec la distance à vol d'oiseau."""
+    lat, lon = np.radians(np.asarray(lat, dtype=np.float64)), np.radians(np.asarray(lon, dtype=np.float64))
+    cos_lat = np.cos(lat)
+    return np.column_stack([cos_lat * np.cos(lon), cos_lat * np.sin(lon), np.sin(lat)])
+
+
+class TableDetour:
+    """
+    Facteurs de détour par tranche de distance à vol d'oiseau.
+
+    `tranches` est une suite de paires (distance maximale en km, facteur) ; la
+    dernière tranche s'applique aussi au-delà de sa borne. `par_site` associe à
+    certains sites leurs propres tranches (réseau local plus ou moins direct).
+    """
+
+    def __init__(self, tranches: Sequence[Tuple[float, float]] = AppConfig.DISTANCES_FACTEURS_DETOUR,
+                 par_site: Optional[Mapping[str, Sequence[Tuple[float, float]]]] = None):
+        self._tranches = self._preparer(tranches)
+        self._par_site = {site: self._preparer(t) for site, t in (par_site or {}).items()}
+
+    @staticmethod
+    def _preparer(tranches) -> Tuple[np.ndarray, np.ndarray]:
+        tranches = sorted((float(borne), float(facteur)) for borne, facteur in tranches)
+        if not tranches:
+            raise ValueError("La table de détour doit contenir au moins une tranche.")
+        if any(facteur < 1 for _, facteur in tranches):
+            raise ValueError("Un facteur de détour ne peut pas être inférieur à 1.")
+        bornes, facteurs = zip(*tranches)
+        return np.array(bornes), np.array(facteurs)
+
+    @classmethod
+    def charger(cls, chemin: str) -> "TableDetour":
+        """Lit une table CSV (`distance_max_km`, `facteur`, et `site` facultatif : vide = toutes les zones)."""
+        import pandas as pd
+
+        table = pd.read_csv(chemin)
+        if "site" not in table.columns:
+            return cls(zip(table["distance_max_km"], table["facteur"]))
+        generale = table[table["site"].isna()]
+        par_site = {site: list(zip(groupe["distance_max_km"], groupe["facteur"]))
+                    for site, groupe in table[table["site"].notna()].groupby("site")}
+        tranches = list(zip(generale["distance_max_km"], generale["facteur"])) or AppConfig.DISTANCES_FACTEURS_DETOUR
+        return cls(tranches, par_site)
+
+    @staticmethod
+    def _appliquer(tranches, distances: np.ndarray) -> np.ndarray:
+        bornes, facteurs = tranches
+        return facteurs[np.minimum(np.searchsorted(bornes, distances, side="left"), len(facteurs) - 1)]
+
+    def facteurs(self, distances_km, sites=None) -> np.ndarray:
+        """Facteur de détour de chaque distance (et, si la table en a, de chaque site)."""
+        distances_km = np.asarray(distances_km, dtype=np.float64)
+        facteurs = self._appliquer(self._tranches, distances_km)
+        if self._par_site and sites is not None:
+            sites = np.asarray(sites, dtype=object)
+            for site, tranches in self._par_site.items():
+                masque = sites == site
+                if masque.any():
+                    facteurs[masque] = self._appliquer(tranches, distances_km[masque])
+        return facteurs
+
+
+class IndexSites:
+    """
+    Index spatial des sites : recherche du site le plus proche par grille de cellules.
+
+    Les points sont placés sur la sphère unité et la grille découpe l'espace en
+    cubes de `taille_cellule_km`. Pour chaque cellule occupée par une requête,
+    seuls les sites qui peuvent être les plus proches d'un point de la cellule
+    sont gardés comme candidats ; chaque requête n'est comparée qu'à ceux-là.
+    """
+
+    def __init__(self, noms: Sequence[str], lat, lon, taille_cellule_km: float = AppConfig.DISTANCES_TAILLE_CELLULE_KM):
+        self.noms = np.asarray(noms, dtype=object)
+        self.lat = np.asarray(lat, dtype=np.float64)
+        self.lon = np.asarray(lon, dtype=np.float64)
+        if not len(self.noms):
+            raise ValueError("Au moins un site est nécessaire.")
+        if not (len(self.noms) == len(self.lat) == len(self.lon)):
+            raise ValueError("Noms, latitudes et longitudes des sites doivent avoir la même longueur.")
+        self._points = _vecteurs_unitaires(self.lat, self.lon)
+        self._pas = taille_cellule_km / RAYON_TERRE_KM
+        self._nb_cellules_axe = int(math.ceil(2 / self._pas)) + 1
+        self._demi_diagonale = self._pas * math.sqrt(3) / 2
+
+    @classmethod
+    def charger(cls, chemin: str, **kwargs) -> "IndexSites":
+        """Lit les sites d'un fichier CSV (colonnes `site`, `lat`, `lon`)."""
+        import pandas as pd
+
+        sites = pd.read_csv(chemin, float_precision="round_trip")
+        return cls(sites["site"].to_numpy(), sites["lat"].to_numpy(), sites["lon"].to_numpy(), **kwargs)
+
+    def __len__(self) -> int:
+        return len(self.noms)
+
+    def _cellules(self, points: np.ndarray) -> np.ndarray:
+        coordonnees = np.clip(np.floor((points + 1) / self._pas).astype(np.int64), 0, self._nb_cellules_axe - 1)
+        return (coordonnees[:, 0] * self._nb_cellules_axe + coordonnees[:, 1]) * self._nb_cellules_axe + coordonnees[:, 2]
+
+    def _centres(self, cellules: np.ndarray) -> np.ndarray:
+        n = self._nb_cellules_axe
+        coordonnees = np.column_stack([cellules // (n * n), (cellules // n) % n, cellules % n])
+        return (coordonnees + 0.5) * self._pas - 1
+
+    def _candidats(self, cellules: np.ndarray) -> np.ndarray:
+        """Sites candidats de chaque cellule (tableau cellules × candidats, complété par -1)."""
+        lignes = []
+        taille_lot = max(1, _VALEURS_PAR_LOT // len(self._points))
+        normes_sites = np.einsum("ij,ij->i", self._points, self._points)
+        for debut in range(0, len(cellules), taille_lot):
+            centres = self._centres(cellules[debut:debut + taille_lot])
+            carres = np.einsum("ij,ij->i", centres, centres)[:, None] + normes_sites - 2 * centres @ self._points.T
+            distances = np.sqrt(np.maximum(carres, 0.0))
+            # Tout point de la cellule est à ± demi-diagonale du centre : un site plus loin que
+            # (distance minimale + 2 demi-diagonales) ne peut être le plus proche d'aucun point
+            lignes.append(distances <= distances.min(axis=1, keepdims=True) + 2 * self._demi_diagonale)
+        masque = np.concatenate(lignes)
+        nb_candidats = masque.sum(axis=1)
+        ordre = np.argsort(~masque, axis=1, kind="stable")[:, :nb_candidats.max()]
+        return np.where(np.arange(ordre.shape[1]) < nb_candidats[:, None], ordre, -1)
+
+    def plus_proche(self, lat, lon) -> np.ndarray:
+        """Indice du site le plus proche de chaque point (degrés)."""
+        points = _vecteurs_unitaires(lat, lon)
+        resultat = np.empty(len(points), dtype=np.int64)
+        for debut in range(0, len(points), _TAILLE_LOT_REQUETES):
+            lot = points[debut:debut + _TAILLE_LOT_REQUETES]
+            cellules, inverse = np.unique(self._cellules(lot), return_inverse=True)
+            candidats = self._candidats(cellules)[inverse]
+            ecarts = lot[:, None, :] - self._points[np.maximum(candidats, 0)]
+            distances = np.einsum("ijk,ijk->ij", ecarts, ecarts)
+            distances[candidats < 0] = np.inf
+            resultat[debut:debut + len(lot)] = candidats[np.arange(len(lot)), distances.argmin(axis=1)]
+        return resultat
+
+
+def distances_trajets(colonnes: Mapping[str, object], index: IndexSites,
+                      detour: Optional[TableDetour] = None) -> Dict[str, np.ndarray]:
+    """
+    Site de rattachement et distance d'un aller simple pour chaque salarié.
+
+    Renvoie les colonnes `site`, `distance_directe_km` (vol d'oiseau),
+    `facteur_detour` et `km_jour` (distance routière estimée, arrondie à
+    `AppConfig.DISTANCES_DECIMALES_KM` décimales).
+    """
+    detour = detour if detour is not None else TableDetour()
+    lat_domicile = np.asarray(colonnes["lat_domicile"], dtype=np.float64)
+    lon_domicile = np.asarray(colonnes["lon_domicile"], dtype=np.float64)
+    if "lat_travail" in colonnes and "lon_travail" in colonnes:
+        lat_travail = np.asarray(colonnes["lat_travail"], dtype=np.float64)
+        lon_travail = np.asarray(colonnes["lon_travail"], dtype=np.float64)
+    else:
+        lat_travail = np.full_like(lat_domicile, np.nan)
+        lon_travail = np.full_like(lon_domicile, np.nan)
+
+    # Rattachement au site le plus proche du lieu de travail, ou du domicile s'il est inconnu
+    travail_connu = ~(np.isnan(lat_travail) | np.isnan(lon_travail))
+    # (un domicile sans coordonnées est rattaché arbitrairement ; sa distance reste NaN)
+    sites = index.plus_proche(np.nan_to_num(np.where(travail_connu, lat_travail, lat_domicile)),
+                             np.nan_to_num(np.where(travail_connu, lon_travail, lon_domicile)))
+    lat_arrivee = np.where(travail_connu, lat_travail, index.lat[sites])
+    lon_arrivee = np.where(travail_connu, lon_travail, index.lon[sites])
+
+    noms_sites = index.noms[sites]
+    directe = haversine_km(lat_domicile, lon_domicile, lat_arrivee, lon_arrivee)
+    facteurs = detour.facteurs(directe, noms_sites)
+    return {
+        "site": noms_sites,
+        "distance_directe_km": directe,
+        "facteur_detour": facteurs,
+        "km_jour": np.round(directe * facteurs, AppConfig.DISTANCES_DECIMALES_KM),
+    }
+
+
+def completer_km_jour(bloc, index: IndexSites, detour: Optional[TableDetour] = None, remplacer: bool = False):
+    """
+    Renvoie une copie du bloc (DataFrame) avec `site` et `km_jour` remplis.
+
+    Sans `remplacer`, les `km_jour` et `site` déjà renseignés sont gardés.
+    Les salariés sans coordonnées de domicile gardent leurs valeurs.
+    """
+    bloc = bloc.copy()
+    calcul = distances_trajets(bloc, index, detour)
+    coordonnees_connues = bloc["lat_domicile"].notna().to_numpy() & bloc["lon_domicile"].notna().to_numpy()
+    for colonne in ("site", "km_jour"):
+        valeurs = calcul[colonne]
+        if colonne in bloc.columns:
+            a_remplir = coordonnees_connues if remplacer else coordonnees_connues & bloc[colonne].isna().to_numpy()
+            bloc[colonne] = bloc[colonne].astype(valeurs.dtype if colonne == "km_jour" else object)
+            bloc.loc[a_remplir, colonne] = valeurs[a_remplir]
+        else:
+            bloc[colonne] = np.where(coordonnees_connues, valeurs, np.nan if colonne == "km_jour" else None)
+    return bloc
+
+
+def main(argv=None) -> int:
+    from cli import FORMATS, _deviner_format, ecrire_blocs, lire_blocs
+
+    parser = argparse.ArgumentParser(description="Remplit km_jour à partir des coordonnées domicile/travail, sans réseau.")
+    parser.add_argument("entree", help="Fichier CSV ou JSONL de salariés ('-' pour l'entrée standard).")
+    parser.add_argument("--sites", required=True, help="Fichier CSV des sites (site, lat, lon).")
+    parser.add_argument("--detour", help="Table CSV des facteurs de détour (distance_max_km, facteur[, site]).")
+    parser.add_argument("-o", "--sortie", default="-", help="Fichier de sortie ('-' pour la sortie standard).")
+    parser.add_argument("--remplacer", action="store_true", help="Recalcule aussi les km_jour déjà renseignés.")
+    parser.add_argument("--taille-bloc", type=int, default=100_000, help="Nombre de salariés traités par bloc.")
+    args = parser.parse_args(argv)
+
+    index = IndexSites.charger(args.sites)
+    detour = TableDetour.charger(args.detour) if args.detour else TableDetour()
+    format_entree = _deviner_format(args.entree)
+    format_sortie = _deviner_format(args.sortie, defaut=format_entree)
+    if format_sortie not in FORMATS:
+        parser.error(f"Format de sortie non pris en charge : {format_sortie}")
+
+    source = sys.stdin if args.entree == "-" else args.entree
+    blocs = (completer_km_jour(bloc, index, detour, args.remplacer)
+             for bloc in lire_blocs(source, format_entree, args.taille_bloc))
+    if args.sortie == "-":
+        nb_lignes = ecrire_blocs(blocs, sys.stdout, format_sortie)
+    else:
+        with open(args.sortie, "w", encoding="utf-8", newline="") as f:
+            nb_lignes = ecrire_blocs(blocs, f, format_sortie)
+    print(f"{nb_lignes} salariés traités ({len(index)} sites).", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,19 +1,71 @@
-import pandas as pd
-from fpdf import FPDF
+import hashlib
+import itertools
+import os
+import tempfile
+import uuid
+import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
 from datetime import datetime
-from io import BytesIO
+from typing import TYPE_CHECKING, Iterable, Optional, Tuple
 
-def export_excel(df: pd.DataFrame, filename: str):
+import figures
+from cache import LRUCache
+from config import AppConfig
+
+# pandas et fpdf ne sont importés qu'au moment d'un export (démarrage plus rapide)
+if TYPE_CHECKING:
+    import pandas as pd
+
+# Images des graphiques déjà rendues (clé : empreinte des données du graphique)
+cache_images = LRUCache(AppConfig.TAILLE_CACHE_IMAGES)
+# Images déjà décodées par fpdf (clé : empreinte des octets de l'image), propres à chaque processus
+_cache_infos_images = LRUCache(AppConfig.TAILLE_CACHE_IMAGES)
+
+def export_excel(df: "pd.DataFrame", filename: str):
     df.to_excel(filename, index=False)
 
-def export_pdf(resultats, chart_image_bytes=None):
+def _texte_pdf(texte: str) -> str:
+    """Adapte un texte aux polices standard de fpdf (encodage Windows-1252, qui contient €)."""
+    return texte.replace("₂", "2").encode("cp1252", "replace").decode("latin-1")
+
+def _infos_image(image_bytes: bytes) -> dict:
+    """
+    Décode une image PNG/JPEG pour fpdf, une seule fois par image distincte.
+
+    fpdf 1.7 ne lit les images que depuis un fichier : l'image est écrite dans un
+    dossier temporaire supprimé aussitôt, puis ses informations décodées sont
+    réutilisées pour tous les rapports suivants.
+    """
+    def decoder():
+        from fpdf import FPDF
+
+        with tempfile.TemporaryDirectory() as dossier:
+            extension = "jpg" if image_bytes[:2] == b"\xff\xd8" else "png"
+            chemin = os.path.join(dossier, f"graphique.{extension}")
+            with open(chemin, "wb") as f:
+                f.write(image_bytes)
+            pdf = FPDF()
+            pdf.add_page()
+            pdf.image(chemin, x=0, y=0, w=10)
+            return pdf.images[chemin]
+
+    return _cache_infos_images.get_or_compute(hashlib.sha256(image_bytes).hexdigest(), decoder)
+
+def generer_pdf(resultats, chart_image_bytes=None) -> bytes:
     """
-    Génère un rapport PDF avec les résultats et un graphique optionnel.
-    
+    Génère un rapport PDF en mémoire avec les résultats et un graphique optionnel.
+
     Args:
         resultats (dict): Un dictionnaire contenant les données textuelles à afficher.
-        chart_image_bytes (bytes, optional): Les octets de l'image du graphique.
+        chart_image_bytes (bytes, optional): Les octets de l'image du graphique (PNG ou JPEG).
+
+    Returns:
+        bytes: Le contenu du fichier PDF.
     """
+    from fpdf import FPDF
+
     pdf = FPDF()
     pdf.add_page()
     pdf.set_font("Arial", 'B', 16)
@@ -29,26 +81,310 @@ def export_pdf(resultats, chart_image_bytes=None):
             formatted_key = key.replace('_', ' ').replace('fmd', '(FMD)').capitalize()
             unit = " €" if "cout" in key or "economie" in key else " km" if "km" in key else ""
             if "co2" in key: unit = " kg CO₂"
-            
-            pdf.cell(0, 8, f"{formatted_key} : {val:.2f}{unit}", ln=True)
+
+            pdf.cell(0, 8, _texte_pdf(f"{formatted_key} : {val:.2f}{unit}"), ln=True)
 
     pdf.ln(10)
 
     # Intègre l'image si elle est fournie
     if chart_image_bytes:
         try:
-            # Crée un "fichier" en mémoire à partir des octets de l'image
-            image_file = BytesIO(chart_image_bytes)
-            pdf.image(image_file, x=30, w=150)
+            # fpdf réutilise une image déjà enregistrée sous ce nom sans relire de fichier ;
+            # la copie est nécessaire car fpdf vide les données de l'image à la génération.
+            nom_image = "graphique"
+            pdf.images[nom_image] = dict(_infos_image(chart_image_bytes), i=len(pdf.images) + 1)
+            pdf.image(nom_image, x=30, w=150)
         except Exception as e:
             pdf.set_text_color(255, 0, 0) # Rouge pour l'erreur
-            pdf.cell(0, 10, f"(Erreur lors de l'intégration du graphique: {e})", ln=True)
+            pdf.cell(0, 10, _texte_pdf(f"(Erreur lors de l'intégration du graphique: {e})"), ln=True)
             pdf.set_text_color(0, 0, 0)
     else:
         pdf.cell(0, 10, "(Graphique de comparaison non disponible)", ln=True)
 
-    filename = f"RideCostCompare_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
-    pdf.output(filename)
-    
+    return pdf.output(dest='S').encode('latin-1')
+
+def export_pdf(resultats, chart_image_bytes=None):
+    """
+    Génère un rapport PDF dans le dossier courant et retourne le nom du fichier.
+
+    Le nom contient les microsecondes et un suffixe aléatoire : deux rapports
+    générés dans la même seconde ne s'écrasent pas.
+    """
+    horodatage = datetime.now().strftime('%Y%m%d_%H%M%S_%f')
+    filename = f"RideCostCompare_{horodatage}_{uuid.uuid4().hex[:8]}.pdf"
+    with open(filename, 'xb') as f:
+        f.write(generer_pdf(resultats, chart_image_bytes))
+
     # Retourne le nom du fichier pour le téléchargement
-    return filename
\ No newline at end of file
+    return filename
+
+
+@dataclass(frozen=True)
+class RapportPDF:
+    """
+    Un rapport à générer en lot.
+
+    `graphique` décrit le graphique à intégrer : le nom d'une fonction de
+    `figures.py` et ses arguments, par exemple
+    `("figure_camembert_repartition", (details, "Répartition"))`.
+    """
+    nom: str
+    resultats: dict
+    graphique: Optional[Tuple[str, tuple]] = None
+
+
+def _rendre_image(graphique: Tuple[str, tuple]) -> Optional[bytes]:
+    """Rend un graphique en PNG via kaleido, une seule fois par jeu de données distinct."""
+    nom_figure, args = graphique
+    cle = (nom_figure, figures.digest_donnees(*args))
+
+    def rendre():
+        fig = getattr(figures, nom_figure)(*args)
+        return fig.to_image(format="png", width=1000, height=600) if fig is not None else None
+
+    return cache_images.get_or_compute(cle, rendre)
+
+
+def _generer_lot(lot, images: dict):
+    """Génère les PDF d'un lot de (nom, résultats, clé d'image) avec les images du lot."""
+    return [(nom, generer_pdf(resultats, images.get(cle))) for nom, resultats, cle in lot]
+
+def _lots_rapports(rapports: Iterable[RapportPDF], taille_lot: int):
+    """
+    Découpe les rapports en lots au fil de l'itération, chacun avec les seules images qu'il utilise.
+
+    Les images sont rendues à la première apparition de leur jeu de données (puis
+    reprises de `cache_images`) : rien n'est conservé d'un lot à l'autre.
+    """
+    lot, images = [], {}
+    for rapport in rapports:
+        cle = None
+        if rapport.graphique is not None:
+            cle = (rapport.graphique[0], figures.digest_donnees(*rapport.graphique[1]))
+            if cle not in images:
+                images[cle] = _rendre_image(rapport.graphique)
+        lot.append((rapport.nom, rapport.resultats, cle))
+        if len(lot) >= taille_lot:
+            yield lot, images
+            lot, images = [], {}
+    if lot:
+        yield lot, images
+
+
+def exporter_rapports_zip(rapports: Iterable[RapportPDF], destination, nb_processus: Optional[int] = None,
+                          taille_lot: int = 64) -> int:
+    """
+    Génère un PDF par rapport et les écrit au fil de l'eau dans une archive zip.
+
+    Args:
+        rapports: Les rapports à générer (itérés une seule fois, au fil de l'eau).
+        destination: Chemin ou fichier binaire ouvert en écriture (ex. BytesIO) recevant l'archive.
+        nb_processus: Nombre de processus de génération (1 pour tout faire dans le processus courant).
+        taille_lot: Nombre de rapports envoyés à la fois à chaque processus.
+
+    Returns:
+        int: Le nombre de rapports écrits.
+
+    Les graphiques sont rendus une seule fois par jeu de données distinct, puis
+    transmis avec chaque lot qui les utilise. Seuls quelques lots sont en mémoire
+    à la fois. Aucun fichier n'est écrit en dehors de l'archive ; deux rapports
+    de même nom reçoivent un suffixe.
+    """
+    lots = _lots_rapports(rapports, max(1, taille_lot))
+    noms_utilises = set()
+    nb_rapports = 0
+
+    with zipfile.ZipFile(destination, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        def ecrire(pdfs):
+            nonlocal nb_rapports
+            for nom, contenu in pdfs:
+                nom_fichier, suffixe = f"{nom}.pdf", 1
+                while nom_fichier in noms_utilises:
+                    suffixe += 1
+                    nom_fichier = f"{nom}_{suffixe}.pdf"
+                noms_utilises.add(nom_fichier)
+                archive.writestr(nom_fichier, contenu)
+                nb_rapports += 1
+
+        premier = next(lots, None)
+        second = next(lots, None) if premier is not None and nb_processus != 1 else None
+        if second is None:
+            # Un seul lot (ou un seul processus) : pas de pool
+            for lot, images in itertools.chain(filter(None, (premier,)), lots):
+                ecrire(_generer_lot(lot, images))
+        else:
+            nb_workers = nb_processus or os.cpu_count() or 1
+            with ProcessPoolExecutor(max_workers=nb_workers) as pool:
+                en_cours = deque()
+                for lot, images in itertools.chain((premier, second), lots):
+                    en_cours.append(pool.submit(_generer_lot, lot, images))
+                    # Au plus deux lots par processus en attente : la mémoire reste bornée
+                    if len(en_cours) >= 2 * nb_workers:
+                        ecrire(en_cours.popleft().result())
+                while en_cours:
+                    ecrire(en_cours.popleft().result())
+
+    return nb_rapports
+
+
+# --- Exports en colonnes, bloc par bloc ---
+# Un « bloc » est un DataFrame ou un dictionnaire de colonnes (tableaux NumPy), comme
+# ceux renvoyés par batch.py. Un schéma est une liste ordonnée (nom de colonne, dtype).
+
+# Nombre maximal de lignes de données d'une feuille Excel (hors en-tête)
+LIGNES_MAX_FEUILLE_XLSX = 1_048_575
+
+_DTYPES_ANNOTATIONS = {int: "int64", float: "float64", bool: "bool", "int": "int64", "float": "float64", "bool": "bool"}
+
+def schema_velo(prefixe: str = ""):
+    """Schéma des colonnes de `CoutResultats` (résultats de `calculer_couts_batch`)."""
+    from dataclasses import fields
+    from utils import CoutResultats
+
+    return [(prefixe + f.name, _DTYPES_ANNOTATIONS.get(f.type, "float64")) for f in fields(CoutResultats)]
+
+def schema_voiture(prefixe: str = ""):
+    """Schéma de `CoutVoitureResultats`, postes de `details` compris (résultats de `calculer_couts_voiture_batch`)."""
+    from batch import COLONNES_DETAILS_VOITURE
+
+    colonnes = ["cout_annuel", "cout_km", *COLONNES_DETAILS_VOITURE.values()]
+    return [(prefixe + nom, "float64") for nom in colonnes]
+
+def schema_profils():
+    """Schéma des résultats de `calculer_profils_batch`."""
+    schema = []
+    for scenario in ("min", "max"):
+        schema += schema_velo(f"velo_{scenario}_")
+        schema.append((f"cout_voiture_{scenario}", "float64"))
+    return schema + [("economie_min", "float64"), ("economie_max", "float64")]
+
+def schema_depuis_bloc(bloc, entiers_en_flottants: bool = False):
+    """
+    Déduit un schéma des colonnes d'un bloc : nombres, booléens, sinon texte.
+
+    Avec `entiers_en_flottants`, les colonnes entières deviennent flottantes, pour
+    accepter des valeurs manquantes dans les blocs suivants.
+    """
+    import numpy as np
+
+    schema = []
+    for nom in bloc:
+        genre = np.asarray(bloc[nom]).dtype.kind
+        if genre == "b":
+            dtype = "bool"
+        elif genre in "iu":
+            dtype = "float64" if entiers_en_flottants else "int64"
+        elif genre == "f":
+            dtype = "float64"
+        else:
+            dtype = "str"
+        schema.append((nom, dtype))
+    return schema
+
+def _normaliser_bloc(bloc, schema) -> dict:
+    """Renvoie les colonnes du bloc dans l'ordre du schéma, converties à son type."""
+    import numpy as np
+
+    colonnes = {}
+    for nom, dtype in schema:
+        if nom not in bloc:
+            raise ValueError(f"Colonne '{nom}' absente d'un bloc à exporter.")
+        valeurs = np.asarray(bloc[nom])
+        if dtype == "str":
+            colonnes[nom] = np.array(["" if v is None or v != v else str(v) for v in valeurs.tolist()], dtype=object)
+            continue
+        if dtype == "int64" and valeurs.dtype.kind == "f" and np.isnan(valeurs).any():
+            raise ValueError(f"Colonne '{nom}' : valeurs manquantes dans une colonne entière.")
+        colonnes[nom] = valeurs.astype(dtype, copy=False)
+    return colonnes
+
+def _blocs_normalises(blocs, schema):
+    """Itère sur les blocs normalisés ; le schéma est déduit du premier bloc s'il n'est pas fourni."""
+    for bloc in blocs:
+        if schema is None:
+            schema = schema_depuis_bloc(bloc)
+        yield schema, _normaliser_bloc(bloc, schema)
+
+def exporter_csv(blocs, destination, schema=None) -> int:
+    """
+    Écrit les blocs dans un CSV, un bloc à la fois, et renvoie le nombre de lignes.
+
+    `destination` est un chemin ou un fichier texte ouvert en écriture.
+    """
+    import pandas as pd
+
+    nb_lignes, entete_ecrite = 0, False
+    fichier = open(destination, "w", encoding="utf-8", newline="") if isinstance(destination, str) else destination
+    try:
+        for schema_bloc, colonnes in _blocs_normalises(blocs, schema):
+            # L'en-tête est écrit avec le premier bloc, même vide (ex. bloc filtré)
+            pd.DataFrame(colonnes, copy=False).to_csv(fichier, index=False, header=not entete_ecrite)
+            entete_ecrite = True
+            nb_lignes += len(next(iter(colonnes.values()), ()))
+    finally:
+        if fichier is not destination:
+            fichier.close()
+    return nb_lignes
+
+def exporter_xlsx(blocs, destination, schema=None, feuille: str = "Résultats") -> int:
+    """
+    Écrit les blocs dans un classeur Excel en mode streaming (openpyxl `write_only`).
+
+    Les lignes sont écrites au fur et à mesure sans garder le classeur en mémoire.
+    Au-delà de la limite d'Excel, une nouvelle feuille est ouverte.
+    `destination` est un chemin ou un fichier binaire (ex. BytesIO).
+    """
+    from openpyxl import Workbook
+
+    classeur = Workbook(write_only=True)
+    nb_lignes, feuille_courante, lignes_feuille, nb_feuilles = 0, None, 0, 0
+    for schema_bloc, colonnes in _blocs_normalises(blocs, schema):
+        en_tete = [nom for nom, _ in schema_bloc]
+        for ligne in zip(*(valeurs.tolist() for valeurs in colonnes.values())):
+            if feuille_courante is None or lignes_feuille >= LIGNES_MAX_FEUILLE_XLSX:
+                nb_feuilles += 1
+                feuille_courante = classeur.create_sheet(feuille if nb_feuilles == 1 else f"{feuille} {nb_feuilles}")
+                feuille_courante.append(en_tete)
+                lignes_feuille = 0
+            feuille_courante.append(ligne)
+            lignes_feuille += 1
+            nb_lignes += 1
+    if feuille_courante is None:
+        feuille_courante = classeur.create_sheet(feuille)
+        if schema is not None:
+            feuille_courante.append([nom for nom, _ in schema])
+    classeur.save(destination)
+    return nb_lignes
+
+def exporter_parquet(blocs, destination, schema=None) -> int:
+    """
+    Écrit les blocs dans un fichier Parquet, un groupe de lignes par bloc.
+
+    Nécessite `pyarrow` (dépendance optionnelle). `destination` est un chemin ou
+    un fichier binaire.
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise ImportError("L'export Parquet nécessite pyarrow : pip install pyarrow") from e
+
+    types_arrow = {"int64": pa.int64(), "float64": pa.float64(), "bool": pa.bool_(), "str": pa.string()}
+    nb_lignes, writer = 0, None
+    try:
+        for schema_bloc, colonnes in _blocs_normalises(blocs, schema):
+            if writer is None:
+                schema_arrow = pa.schema([(nom, types_arrow[dtype]) for nom, dtype in schema_bloc])
+                writer = pq.ParquetWriter(destination, schema_arrow)
+            table = pa.Table.from_arrays(
+                [pa.array(colonnes[nom], type=schema_arrow.field(nom).type) for nom in schema_arrow.names],
+                schema=schema_arrow,
+            )
+            writer.write_table(table)
+            nb_lignes += table.num_rows
+    finally:
+        if writer is not None:
+            writer.close()
+    return nb_lignes
+
+EXPORTEURS = {"csv": exporter_csv, "xlsx": exporter_xlsx, "parquet": exporter_parquet}
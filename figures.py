@@ -0,0 +1,128 @@
+# figures.py
+"""
+Construction des figures Plotly, sans Streamlit.
+
+Chaque fonction `figure_*` est pure : elle ne dépend que de ses arguments et
+renvoie une figure (ou None s'il n'y a rien à tracer). Les figures sont gardées
+dans un cache LRU borné, indexé par une empreinte des données d'entrée : un
+rerun avec les mêmes données ne reconstruit rien. Les figures renvoyées sont
+partagées ; les copier (`go.Figure(fig)`) avant de les modifier.
+
+Ces fonctions servent à l'affichage (`charts.py`) comme aux exports.
+"""
+import hashlib
+import json
+from functools import wraps
+from typing import Optional
+
+from cache import LRUCache
+from config import AppConfig
+from instrumentation import span
+
+cache_figures = LRUCache(AppConfig.TAILLE_CACHE_FIGURES)
+
+
+def digest_donnees(*args, **kwargs) -> str:
+    """Empreinte stable (SHA-256) des données d'entrée d'une figure."""
+    donnees = json.dumps([args, kwargs], sort_keys=True, default=repr, ensure_ascii=False)
+    return hashlib.sha256(donnees.encode("utf-8")).hexdigest()
+
+
+def figure_en_cache(construire):
+    """Décorateur : met en cache le résultat de `construire` selon l'empreinte de ses arguments."""
+    @wraps(construire)
+    def enveloppe(*args, **kwargs):
+        cle = (construire.__name__, digest_donnees(*args, **kwargs))
+        def construire_mesure():
+            with span(f"figure.{construire.__name__}"):
+                return construire(*args, **kwargs)
+        return cache_figures.get_or_compute(cle, construire_mesure)
+    return enveloppe
+
+
+@figure_en_cache
+def figure_barres_cout_annuel(cout_annuel: float, cout_annuel_fmd: float) -> "go.Figure":
+    """Barres du coût annuel du vélo avec et sans FMD."""
+    import plotly.graph_objects as go
+
+    labels = ['Coût annuel sans FMD', 'Coût annuel avec FMD']
+    values = [cout_annuel, cout_annuel_fmd]
+    fig = go.Figure(data=[go.Bar(x=labels, y=values, marker_color=['#636EFA', '#00CC96'])])
+    fig.update_layout(title="Comparaison du coût annuel du vélo (avec/sans Forfait Mobilités Durables)", yaxis_title="€ / an")
+    return fig
+
+
+@figure_en_cache
+def figure_camembert_comparatif(cout_annuel_fmd: float, km_an: float, cout_voiture_km: float,
+                                mode_comparaison: str) -> Optional["go.Figure"]:
+    """Camembert des coûts annuels vélo / autre mode, ou None si aucun mode de comparaison."""
+    if "Voiture" not in mode_comparaison:
+        return None
+
+    import plotly.express as px
+    import pandas as pd
+
+    labels = ["Vélo (après FMD)", "Voiture"]
+    values = [cout_annuel_fmd, km_an * cout_voiture_km]
+    data = pd.DataFrame({"Mode": labels, "Coût Annuel": values})
+    fig = px.pie(data, values='Coût Annuel', names='Mode', title="Répartition des coûts annuels par mode",
+                 color_discrete_map={"Vélo (après FMD)": "#00CC96", "Transports": "#AB63FA", "Voiture": "#FFA15A"})
+    fig.update_traces(textinfo='percent+value+label', hole=0.4)
+    return fig
+
+
+@figure_en_cache
+def figure_camembert_repartition(details: dict, title: str) -> Optional["go.Figure"]:
+    """Camembert de la répartition des coûts (postes strictement positifs), ou None."""
+    valid_details = {k: v for k, v in (details or {}).items() if v > 0}
+    if not valid_details:
+        return None
+
+    import plotly.express as px
+    import pandas as pd
+
+    data = pd.DataFrame(list(valid_details.items()), columns=['Poste', 'Coût'])
+    fig = px.pie(data, values='Coût', names='Poste', title=title, hole=0.4)
+    fig.update_traces(textinfo='percent+label', textposition='inside')
+    return fig
+
+
+@figure_en_cache
+def figure_heatmap_economies(jours: list, distances: list, economies: list,
+                             distances_rentabilite: list = None) -> "go.Figure":
+    """Carte de chaleur de l'économie annuelle selon les jours par semaine et la distance, avec le seuil de rentabilité."""
+    import plotly.graph_objects as go
+
+    fig = go.Figure(go.Heatmap(
+        x=distances, y=jours, z=economies, colorscale="RdYlGn", zmid=0,
+        colorbar=dict(title="€ / an"),
+        hovertemplate="%{y} j/sem · %{x} km : %{z:.0f} €<extra></extra>",
+    ))
+    if distances_rentabilite:
+        points = [(d, j) for d, j in zip(distances_rentabilite, jours) if d is not None and d <= max(distances)]
+        if points:
+            fig.add_trace(go.Scatter(
+                x=[d for d, _ in points], y=[j for _, j in points], mode="lines+markers",
+                line=dict(color="black", dash="dash"), name="Seuil de rentabilité",
+            ))
+    fig.update_layout(title="Économie annuelle selon l'usage du vélo",
+                      xaxis_title="Distance d'un aller simple (km)", yaxis_title="Jours de vélotaf par semaine")
+    return fig
+
+
+@figure_en_cache
+def figure_projection_economies(annees: list, series: dict) -> Optional["go.Figure"]:
+    """Courbes d'économies cumulées année par année (une courbe par série), ou None si aucune série."""
+    if not series:
+        return None
+
+    import plotly.graph_objects as go
+
+    fig = go.Figure()
+    for nom, valeurs in series.items():
+        fig.add_trace(go.Scatter(x=annees, y=valeurs, mode="lines+markers", name=nom,
+                                 line=dict(dash="dot") if "actualis" in nom else None))
+    fig.add_hline(y=0, line_color="grey", line_width=1)
+    fig.update_layout(title=f"Projection des économies sur {len(annees)} ans (flux annuels)",
+                      xaxis_title="Année", yaxis_title="Économies cumulées (€)")
+    return fig
@@ -0,0 +1,234 @@
+# flotte.py
+"""
+Agrégation à l'échelle de l'entreprise (flotte de salariés).
+
+Chaque salarié a un profil vélo (champs de `profils.json`), éventuellement des
+paramètres voiture préfixés `voiture_`, un site et un département. Ses
+contributions annuelles sont gardées en colonnes (tableaux NumPy) :
+- `fmd` : Forfait Mobilités Durables versé ;
+- `economie_min` / `economie_max` : fourchette d'économie, comme dans l'onglet de comparaison ;
+- `km_velo` : kilométrage vélo du scénario moyen ;
+- `co2_evite_kg` : CO₂ évité sur ce kilométrage (`AppConfig.CO2_VOITURE_G_PAR_KM`).
+
+Les totaux par (site, département) sont tenus à jour de façon incrémentale :
+modifier un salarié retire son ancienne contribution et ajoute la nouvelle, sans
+recalculer la flotte.
+"""
+import threading
+from typing import Dict, Hashable, Mapping
+
+import numpy as np
+
+from batch import Colonnes, _colonne, calculer_profils_batch
+from config import AppConfig
+
+# Contributions par salarié, dans l'ordre des colonnes du tableau d'agrégats
+CONTRIBUTIONS = ("fmd", "economie_min", "economie_max", "km_velo", "co2_evite_kg")
+_CAPACITE_INITIALE = 1024
+
+
+def calculer_contributions(colonnes: Colonnes) -> Dict[str, np.ndarray]:
+    """Contributions annuelles de chaque ligne de profil (calcul vectorisé)."""
+    resultats = calculer_profils_batch(colonnes)
+    km_velo = (np.asarray(resultats["velo_min_km_an"]) + np.asarray(resultats["velo_max_km_an"])) / 2
+    fmd = np.broadcast_to(_colonne(colonnes, "fmd"), km_velo.shape).astype(np.float64)
+    return {
+        "fmd": fmd,
+        "economie_min": np.asarray(resultats["economie_min"], dtype=np.float64),
+        "economie_max": np.asarray(resultats["economie_max"], dtype=np.float64),
+        "km_velo": km_velo,
+        "co2_evite_kg": km_velo * AppConfig.CO2_VOITURE_G_PAR_KM / 1000,
+    }
+
+
+class Flotte:
+    """Contributions par salarié en colonnes, et totaux par (site, département) tenus à jour."""
+
+    def __init__(self):
+        self._index: Dict[Hashable, int] = {}        # identifiant -> ligne
+        self._identifiants = []                       # ligne -> identifiant
+        self._contributions = np.zeros((_CAPACITE_INITIALE, len(CONTRIBUTIONS)))
+        self._groupes_lignes = np.zeros(_CAPACITE_INITIALE, dtype=np.int64)
+        self._groupes: Dict[tuple, int] = {}          # (site, département) -> code
+        self._libelles_groupes = []                   # code -> (site, département)
+        self._agregats = np.zeros((0, len(CONTRIBUTIONS)))
+        self._effectifs = np.zeros(0, dtype=np.int64)
+        self._verrou = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._identifiants)
+
+    def __contains__(self, identifiant) -> bool:
+        return identifiant in self._index
+
+    # --- Stockage en colonnes ---
+    def _code_groupe(self, site, departement) -> int:
+        cle = (site, departement)
+        code = self._groupes.get(cle)
+        if code is None:
+            code = len(self._libelles_groupes)
+            self._groupes[cle] = code
+            self._libelles_groupes.append(cle)
+            self._agregats = np.vstack([self._agregats, np.zeros((1, len(CONTRIBUTIONS)))])
+            self._effectifs = np.append(self._effectifs, 0)
+        return code
+
+    def _reserver(self, nb_lignes: int):
+        capacite = len(self._groupes_lignes)
+        if nb_lignes <= capacite:
+            return
+        nouvelle = max(nb_lignes, capacite * 2)
+        contributions = np.zeros((nouvelle, len(CONTRIBUTIONS)))
+        contributions[:capacite] = self._contributions
+        groupes = np.zeros(nouvelle, dtype=np.int64)
+        groupes[:capacite] = self._groupes_lignes
+        self._contributions, self._groupes_lignes = contributions, groupes
+
+    # --- Mises à jour ---
+    def charger(self, identifiants, colonnes: Colonnes, sites, departements):
+        """Ajoute ou remplace un lot de salariés (un calcul vectorisé pour tout le lot)."""
+        identifiants = list(identifiants)
+        contributions = calculer_contributions(colonnes)
+        matrice = np.column_stack([np.broadcast_to(contributions[nom], (len(identifiants),)) for nom in CONTRIBUTIONS])
+        sites = np.broadcast_to(np.asarray(sites, dtype=object), (len(identifiants),))
+        departements = np.broadcast_to(np.asarray(departements, dtype=object), (len(identifiants),))
+        with self._verrou:
+            if len(set(identifiants)) != len(identifiants):
+                raise ValueError("Identifiants de salariés en double dans le lot.")
+            for identifiant in identifiants:
+                if identifiant in self._index:
+                    self.supprimer(identifiant)
+            codes = np.fromiter((self._code_groupe(s, d) for s, d in zip(sites, departements)),
+                                dtype=np.int64, count=len(identifiants))
+            debut = len(self._identifiants)
+            self._reserver(debut + len(identifiants))
+            self._contributions[debut:debut + len(identifiants)] = matrice
+            self._groupes_lignes[debut:debut + len(identifiants)] = codes
+            for decalage, identifiant in enumerate(identifiants):
+                self._index[identifiant] = debut + decalage
+            self._identifiants.extend(identifiants)
+            np.add.at(self._agregats, codes, matrice)
+            np.add.at(self._effectifs, codes, 1)
+
+    def mettre_a_jour(self, identifiant, profil: Mapping[str, object], site=None, departement=None):
+        """
+        Ajoute ou modifie un salarié : seule sa contribution est recalculée.
+
+        Sans `site` ni `departement`, le salarié reste dans son groupe actuel.
+        """
+        contributions = calculer_contributions({nom: np.asarray([valeur]) for nom, valeur in profil.items()})
+        ligne_contributions = np.array([contributions[nom][0] for nom in CONTRIBUTIONS])
+        with self._verrou:
+            ligne = self._index.get(identifiant)
+            if ligne is None:
+                if site is None or departement is None:
+                    raise ValueError(f"Site et département requis pour le nouveau salarié {identifiant!r}.")
+                ligne = len(self._identifiants)
+                self._reserver(ligne + 1)
+                self._index[identifiant] = ligne
+                self._identifiants.append(identifiant)
+            else:
+                ancien_code = self._groupes_lignes[ligne]
+                self._agregats[ancien_code] -= self._contributions[ligne]
+                self._effectifs[ancien_code] -= 1
+                if site is None or departement is None:
+                    site_actuel, departement_actuel = self._libelles_groupes[ancien_code]
+                    site = site_actuel if site is None else site
+                    departement = departement_actuel if departement is None else departement
+            code = self._code_groupe(site, departement)
+            self._contributions[ligne] = ligne_contributions
+            self._groupes_lignes[ligne] = code
+            self._agregats[code] += ligne_contributions
+            self._effectifs[code] += 1
+
+    def supprimer(self, identifiant):
+        """Retire un salarié ; la dernière ligne prend sa place pour garder les colonnes compactes."""
+        with self._verrou:
+            ligne = self._index.pop(identifiant)
+            code = self._groupes_lignes[ligne]
+            self._agregats[code] -= self._contributions[ligne]
+            self._effectifs[code] -= 1
+            derniere = len(self._identifiants) - 1
+            if ligne != derniere:
+                identifiant_deplace = self._identifiants[derniere]
+                self._contributions[ligne] = self._contributions[derniere]
+                self._groupes_lignes[ligne] = self._groupes_lignes[derniere]
+                self._identifiants[ligne] = identifiant_deplace
+                self._index[identifiant_deplace] = ligne
+            self._identifiants.pop()
+
+    def recalculer_agregats(self):
+        """Reconstruit les totaux depuis les colonnes (élimine la dérive d'arrondi des mises à jour)."""
+        with self._verrou:
+            n = len(self._identifiants)
+            self._agregats = np.zeros_like(self._agregats)
+            self._effectifs = np.zeros_like(self._effectifs)
+            np.add.at(self._agregats, self._groupes_lignes[:n], self._contributions[:n])
+            np.add.at(self._effectifs, self._groupes_lignes[:n], 1)
+
+    # --- Lecture ---
+    def contributions(self) -> Dict[str, np.ndarray]:
+        """Colonnes de contributions par salarié (vues en lecture seule, dans l'ordre de `identifiants`)."""
+        n = len(self._identifiants)
+        colonnes = {}
+        for i, nom in enumerate(CONTRIBUTIONS):
+            vue = self._contributions[:n, i]
+            vue.setflags(write=False)
+            colonnes[nom] = vue
+        return colonnes
+
+    @property
+    def identifiants(self) -> list:
+        return list(self._identifiants)
+
+    def totaux(self, par=("site", "departement")):
+        """
+        Totaux annuels par groupe : "site", "departement", les deux (défaut) ou `None` pour l'entreprise.
+
+        Renvoie un DataFrame avec les effectifs, le FMD versé, la fourchette
+        d'économie, le CO₂ évité (kg) et l'équivalent en arbres.
+        """
+        import pandas as pd
+
+        with self._verrou:
+            libelles = pd.DataFrame(self._libelles_groupes, columns=["site", "departement"])
+            tableau = pd.concat([
+                libelles,
+                pd.DataFrame(self._agregats.copy(), columns=list(CONTRIBUTIONS)),
+                pd.DataFrame({"effectif": self._effectifs.copy()}),
+            ], axis=1)
+        tableau = tableau[tableau["effectif"] > 0]
+        colonnes = ["effectif", *CONTRIBUTIONS]
+        if par is None:
+            totaux = tableau[colonnes].sum().to_frame().T
+        else:
+            cles = [par] if isinstance(par, str) else list(par)
+            totaux = tableau.groupby(cles, sort=True)[colonnes].sum().reset_index()
+        totaux["effectif"] = totaux["effectif"].astype(np.int64)
+        totaux["arbres_equivalents"] = totaux["co2_evite_kg"] / AppConfig.CO2_ABSORPTION_ARBRE_KG_PAR_AN
+        return totaux
+
+
+def charger_fichier(chemin: str, taille_bloc: int = 50_000, flotte: Flotte = None) -> Flotte:
+    """
+    Charge un fichier CSV/JSONL de salariés par blocs (colonnes `identifiant`, `site`,
+    `departement` et champs de profil, comme pour `cli.py`).
+    """
+    from cli import _deviner_format, lire_blocs
+
+    flotte = flotte if flotte is not None else Flotte()
+    for bloc in lire_blocs(chemin, _deviner_format(chemin), taille_bloc):
+        flotte.charger(bloc["identifiant"].tolist(), bloc, bloc["site"].to_numpy(), bloc["departement"].to_numpy())
+    return flotte
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Totaux FMD, économies et CO₂ d'une flotte de salariés.")
+    parser.add_argument("entree", help="Fichier CSV ou JSONL de salariés.")
+    parser.add_argument("--par", choices=("site", "departement", "site,departement", "entreprise"),
+                        default="site,departement")
+    args = parser.parse_args()
+    par = None if args.par == "entreprise" else tuple(args.par.split(","))
+    print(charger_fichier(args.entree).totaux(par).to_string(index=False))
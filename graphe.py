@@ -0,0 +1,172 @@
+# graphe.py
+"""
+Graphe de calcul réactif : seuls les nœuds en aval d'une entrée modifiée sont recalculés.
+
+Les entrées sont fixées par `definir` ; une entrée égale à sa valeur précédente
+n'invalide rien. Les nœuds calculés sont évalués à la demande (`valeur`) et
+recalculés seulement si la version d'une de leurs dépendances a changé. Un nœud
+recalculé qui redonne le même résultat garde sa version : ses descendants ne
+sont pas recalculés.
+
+Le compteur `recalculs` indique combien de fois chaque nœud a été calculé.
+Sans dépendance à Streamlit.
+"""
+import threading
+from collections import Counter
+from dataclasses import dataclass, replace
+from typing import Callable, Optional, Sequence
+
+from utils import (CoutResultats, TRAJETS_PERSO_DEFAUT, VeloParams, VoitureParams, calculer_cout_voiture_pour_trajet,
+                   calculer_couts_velo_cache, calculer_couts_voiture_cache, estimer_km_autres)
+
+_ABSENT = object()
+
+
+def _egal(a, b) -> bool:
+    if a is b:
+        return True
+    try:
+        return type(a) is type(b) and bool(a == b)
+    except Exception:
+        return False
+
+
+class _Noeud:
+    __slots__ = ("nom", "fonction", "dependances", "valeur", "version", "versions_dependances")
+
+    def __init__(self, nom: str, fonction: Optional[Callable], dependances: tuple, valeur=_ABSENT):
+        self.nom = nom
+        self.fonction = fonction
+        self.dependances = dependances
+        self.valeur = valeur
+        self.version = 0 if valeur is _ABSENT else 1
+        self.versions_dependances = None
+
+
+class GrapheReactif:
+    """Graphe de nœuds d'entrée et de nœuds calculés à partir de nœuds déjà déclarés (donc sans cycle)."""
+
+    def __init__(self):
+        self._noeuds = {}
+        self.recalculs = Counter()
+        self._verrou = threading.RLock()
+
+    def entree(self, nom: str, valeur=_ABSENT):
+        """Déclare un nœud d'entrée, éventuellement avec une valeur initiale."""
+        if nom in self._noeuds:
+            raise ValueError(f"Nœud déjà déclaré : {nom}")
+        self._noeuds[nom] = _Noeud(nom, None, (), valeur)
+
+    def calcul(self, nom: str, fonction: Callable, dependances: Sequence[str]):
+        """Déclare un nœud calculé par `fonction(*valeurs des dépendances)`."""
+        if nom in self._noeuds:
+            raise ValueError(f"Nœud déjà déclaré : {nom}")
+        inconnues = [d for d in dependances if d not in self._noeuds]
+        if inconnues:
+            raise KeyError(f"Dépendances inconnues pour {nom} : {', '.join(inconnues)}")
+        self._noeuds[nom] = _Noeud(nom, fonction, tuple(dependances))
+
+    def definir(self, **valeurs) -> set:
+        """Fixe des entrées ; renvoie le nom de celles dont la valeur a réellement changé."""
+        modifiees = set()
+        with self._verrou:
+            for nom, valeur in valeurs.items():
+                noeud = self._noeuds[nom]
+                if noeud.fonction is not None:
+                    raise ValueError(f"{nom} est un nœud calculé, pas une entrée.")
+                if noeud.version and _egal(noeud.valeur, valeur):
+                    continue
+                noeud.valeur = valeur
+                noeud.version += 1
+                modifiees.add(nom)
+        return modifiees
+
+    def valeur(self, nom: str):
+        """Valeur à jour d'un nœud (recalculé seulement si une dépendance a changé)."""
+        with self._verrou:
+            return self._actualiser(self._noeuds[nom]).valeur
+
+    def _actualiser(self, noeud: _Noeud) -> _Noeud:
+        if noeud.fonction is None:
+            if noeud.valeur is _ABSENT:
+                raise LookupError(f"Entrée non définie : {noeud.nom}")
+            return noeud
+        dependances = [self._actualiser(self._noeuds[d]) for d in noeud.dependances]
+        versions = tuple(d.version for d in dependances)
+        if versions != noeud.versions_dependances:
+            nouvelle_valeur = noeud.fonction(*(d.valeur for d in dependances))
+            self.recalculs[noeud.nom] += 1
+            noeud.versions_dependances = versions
+            if not noeud.version or not _egal(noeud.valeur, nouvelle_valeur):
+                noeud.valeur = nouvelle_valeur
+                noeud.version += 1
+        return noeud
+
+    def reinitialiser_compteurs(self):
+        self.recalculs.clear()
+
+
+@dataclass(frozen=True)
+class ResultatsComparaison:
+    """Fourchette de la comparaison vélo/voiture (mêmes conventions que l'onglet de comparaison)."""
+    cout_velo_min: float
+    cout_velo_max: float
+    cout_voiture_min: float
+    cout_voiture_max: float
+    economie_min: float  # cas le plus défavorable : voiture peu utilisée, vélo le plus cher
+    economie_max: float  # cas le plus favorable
+
+
+def _params_velo(jours_cle: str):
+    def calculer(profil_data):
+        if not profil_data:
+            return None
+        return VeloParams.depuis_profil(profil_data, profil_data.get(jours_cle, 0))
+    return calculer
+
+
+def _resultats_velo(params: Optional[VeloParams]) -> Optional[CoutResultats]:
+    return calculer_couts_velo_cache(params) if params is not None else None
+
+
+def _comparer(velo_min: Optional[CoutResultats], velo_max: Optional[CoutResultats],
+              params_voiture: VoitureParams) -> Optional[ResultatsComparaison]:
+    if velo_min is None or velo_max is None:
+        return None
+    cout_voiture_min = calculer_cout_voiture_pour_trajet(velo_min.km_an, params_voiture)
+    cout_voiture_max = calculer_cout_voiture_pour_trajet(velo_max.km_an, params_voiture)
+    return ResultatsComparaison(
+        cout_velo_min=velo_min.cout_annuel_fmd, cout_velo_max=velo_max.cout_annuel_fmd,
+        cout_voiture_min=cout_voiture_min, cout_voiture_max=cout_voiture_max,
+        economie_min=cout_voiture_min - velo_max.cout_annuel_fmd,
+        economie_max=cout_voiture_max - velo_min.cout_annuel_fmd,
+    )
+
+
+def creer_graphe_simulation() -> GrapheReactif:
+    """
+    Graphe de la simulation d'une session.
+
+    Entrées : `profil_velo` (dict de `profils.json` ou None), `voiture_saisie`
+    (`VoitureParams` saisis dans le formulaire), `trajets_perso` (estimation hebdomadaire).
+    Nœuds calculés : `km_autres`, `params_voiture`, `params_velo_min/max`,
+    `velo_min/max` (`CoutResultats`), `resultats_voiture` et `comparaison`.
+    """
+    graphe = GrapheReactif()
+    graphe.entree("profil_velo", None)
+    graphe.entree("voiture_saisie", VoitureParams())
+    graphe.entree("trajets_perso", dict(TRAJETS_PERSO_DEFAUT))
+
+    graphe.calcul("km_autres", estimer_km_autres, ["trajets_perso"])
+    graphe.calcul("params_voiture", lambda saisie, km_autres: replace(saisie, km_autres=km_autres),
+                  ["voiture_saisie", "km_autres"])
+    graphe.calcul("resultats_voiture", calculer_couts_voiture_cache, ["params_voiture"])
+
+    # Paramètres intermédiaires : modifier jours_semaine_max ne recalcule pas le scénario min
+    graphe.calcul("params_velo_min", _params_velo("jours_semaine_min"), ["profil_velo"])
+    graphe.calcul("params_velo_max", _params_velo("jours_semaine_max"), ["profil_velo"])
+    graphe.calcul("velo_min", _resultats_velo, ["params_velo_min"])
+    graphe.calcul("velo_max", _resultats_velo, ["params_velo_max"])
+
+    graphe.calcul("comparaison", _comparer, ["velo_min", "velo_max", "params_voiture"])
+    return graphe
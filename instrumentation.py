@@ -0,0 +1,219 @@
+# instrumentation.py
+"""
+Mesure des temps d'exécution par étape (chargement, calculs, affichage, graphiques).
+
+Chaque étape est entourée d'un « span » :
+
+    with span("calcul.velo"):
+        ...
+
+Les durées sont agrégées dans des histogrammes partagés par tout le processus
+(donc par toutes les sessions Streamlit) et peuvent être exportées en JSON ou au
+format texte Prometheus, dans un fichier ou via un petit serveur HTTP local.
+
+Désactivée (par défaut), l'instrumentation ne coûte qu'un test de booléen par
+span : `span()` renvoie alors un contexte vide partagé. Activation :
+`AppConfig.INSTRUMENTATION_ACTIVE`, la variable d'environnement
+`RIDECOST_INSTRUMENTATION=1` ou `activer()`.
+
+Sans dépendance à Streamlit.
+"""
+import bisect
+import json
+import os
+import threading
+import time
+from contextlib import nullcontext
+from functools import wraps
+
+from config import AppConfig
+
+# Bornes supérieures des intervalles des histogrammes, en secondes (comme Prometheus)
+BORNES_S = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_CONTEXTE_VIDE = nullcontext()
+_actif = AppConfig.INSTRUMENTATION_ACTIVE or os.environ.get("RIDECOST_INSTRUMENTATION", "") not in ("", "0")
+
+
+def activer(actif: bool = True):
+    """Active ou désactive l'instrumentation pour tout le processus."""
+    global _actif
+    _actif = actif
+
+
+def est_active() -> bool:
+    return _actif
+
+
+class Histogramme:
+    """Histogramme cumulatif des durées d'une étape, sûr entre threads."""
+
+    def __init__(self, bornes=BORNES_S):
+        self.bornes = tuple(bornes)
+        self._comptes = [0] * (len(self.bornes) + 1)  # dernier intervalle : au-delà de la dernière borne
+        self.nombre = 0
+        self.somme = 0.0
+        self.maximum = 0.0
+        self._verrou = threading.Lock()
+
+    def observer(self, duree: float):
+        index = bisect.bisect_left(self.bornes, duree)
+        with self._verrou:
+            self._comptes[index] += 1
+            self.nombre += 1
+            self.somme += duree
+            if duree > self.maximum:
+                self.maximum = duree
+
+    def quantile(self, q: float) -> float:
+        """Estimation du quantile `q` (0-1) : borne supérieure de l'intervalle qui le contient."""
+        with self._verrou:
+            comptes, nombre, maximum = list(self._comptes), self.nombre, self.maximum
+        if not nombre:
+            return 0.0
+        rang, cumul = q * nombre, 0
+        for index, compte in enumerate(comptes):
+            cumul += compte
+            if cumul >= rang:
+                return min(self.bornes[index], maximum) if index < len(self.bornes) else maximum
+        return maximum
+
+    def instantane(self) -> dict:
+        with self._verrou:
+            cumul, seaux = 0, []
+            for borne, compte in zip(self.bornes, self._comptes):
+                cumul += compte
+                seaux.append([borne, cumul])
+            return {"nombre": self.nombre, "somme_s": self.somme, "max_s": self.maximum, "seaux": seaux}
+
+
+class Registre:
+    """Ensemble des histogrammes du processus, indexés par nom d'étape."""
+
+    def __init__(self):
+        self._histogrammes = {}
+        self._verrou = threading.Lock()
+
+    def histogramme(self, nom: str) -> Histogramme:
+        histogramme = self._histogrammes.get(nom)
+        if histogramme is None:
+            with self._verrou:
+                histogramme = self._histogrammes.setdefault(nom, Histogramme())
+        return histogramme
+
+    def observer(self, nom: str, duree: float):
+        self.histogramme(nom).observer(duree)
+
+    def vider(self):
+        with self._verrou:
+            self._histogrammes.clear()
+
+    def _elements(self) -> list:
+        """Copie triée des (nom, histogramme), prise sous le verrou (d'autres sessions en ajoutent)."""
+        with self._verrou:
+            return sorted(self._histogrammes.items())
+
+    def resume(self) -> list:
+        """Une ligne par étape : nombre d'appels, durées totale, moyenne, p50, p95 et max."""
+        lignes = []
+        for nom, h in self._elements():
+            if h.nombre:
+                lignes.append({
+                    "etape": nom, "appels": h.nombre, "total_ms": h.somme * 1e3,
+                    "moyenne_ms": h.somme / h.nombre * 1e3, "p50_ms": h.quantile(0.5) * 1e3,
+                    "p95_ms": h.quantile(0.95) * 1e3, "max_ms": h.maximum * 1e3,
+                })
+        return lignes
+
+    def vers_json(self) -> str:
+        return json.dumps({nom: h.instantane() for nom, h in self._elements()}, indent=2)
+
+    def vers_prometheus(self, metrique: str = "ridecost_etape_duree_secondes") -> str:
+        """Format texte d'exposition Prometheus (un histogramme étiqueté par étape)."""
+        lignes = [f"# HELP {metrique} Durée des étapes de RideCostCompare.", f"# TYPE {metrique} histogram"]
+        for nom, h in self._elements():
+            instantane = h.instantane()
+            etiquette = nom.replace("\\", "\\\\").replace('"', '\\"')
+            for borne, cumul in instantane["seaux"]:
+                lignes.append(f'{metrique}_bucket{{etape="{etiquette}",le="{borne}"}} {cumul}')
+            lignes.append(f'{metrique}_bucket{{etape="{etiquette}",le="+Inf"}} {instantane["nombre"]}')
+            lignes.append(f'{metrique}_sum{{etape="{etiquette}"}} {instantane["somme_s"]}')
+            lignes.append(f'{metrique}_count{{etape="{etiquette}"}} {instantane["nombre"]}')
+        return "\n".join(lignes) + "\n"
+
+    def ecrire(self, chemin: str, format_export: str = "json"):
+        """Écrit les métriques dans un fichier ("json" ou "prometheus"), de façon atomique."""
+        contenu = self.vers_prometheus() if format_export == "prometheus" else self.vers_json()
+        temporaire = f"{chemin}.tmp"
+        with open(temporaire, "w", encoding="utf-8") as f:
+            f.write(contenu)
+        os.replace(temporaire, chemin)
+
+
+REGISTRE = Registre()
+
+
+class _Span:
+    __slots__ = ("nom", "debut")
+
+    def __init__(self, nom: str):
+        self.nom = nom
+
+    def __enter__(self):
+        self.debut = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        REGISTRE.observer(self.nom, time.perf_counter() - self.debut)
+        return False
+
+
+def span(nom: str):
+    """Contexte qui mesure la durée du bloc sous le nom `nom` (sans effet si désactivé)."""
+    return _Span(nom) if _actif else _CONTEXTE_VIDE
+
+
+def chronometre(nom: str = None):
+    """Décorateur : mesure chaque appel de la fonction (nom par défaut : `module.fonction`)."""
+    def decorer(fonction):
+        nom_span = nom or f"{fonction.__module__}.{fonction.__name__}"
+
+        @wraps(fonction)
+        def enveloppe(*args, **kwargs):
+            if not _actif:
+                return fonction(*args, **kwargs)
+            with _Span(nom_span):
+                return fonction(*args, **kwargs)
+        return enveloppe
+    return decorer
+
+
+def servir_metriques(port: int = 9108, hote: str = "127.0.0.1"):
+    """
+    Expose les métriques au format Prometheus sur http://hote:port/metrics
+    (et en JSON sur /metrics.json), dans un thread d'arrière-plan.
+    """
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Gestionnaire(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path == "/metrics":
+                corps, type_contenu = REGISTRE.vers_prometheus(), "text/plain; version=0.0.4"
+            elif self.path == "/metrics.json":
+                corps, type_contenu = REGISTRE.vers_json(), "application/json"
+            else:
+                self.send_error(404)
+                return
+            donnees = corps.encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", type_contenu)
+            self.send_header("Content-Length", str(len(donnees)))
+            self.end_headers()
+            self.wfile.write(donnees)
+
+        def log_message(self, *args):
+            pass
+
+    serveur = ThreadingHTTPServer((hote, port), Gestionnaire)
+    threading.Thread(target=serveur.serve_forever, daemon=True, name="metriques").start()
+    return serveur
@@ -0,0 +1,176 @@
+# montecarlo.py
+"""
+Simulation Monte-Carlo de l'économie annuelle vélo/voiture.
+
+Au lieu des deux scénarios fixes (jours min / jours max), les entrées incertaines
+(jours de vélotaf, prix du carburant, consommation, valeur de revente) sont tirées
+selon des lois configurables. Les tirages sont calculés par blocs vectorisés ;
+chaque bloc a sa propre graine dérivée de la graine principale, si bien que le
+résultat ne dépend pas du nombre de processus utilisés.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field, asdict
+from typing import Dict, Optional
+
+import numpy as np
+
+from batch import calculer_cout_voiture_pour_trajet_batch, calculer_couts_batch, km_an_velo_batch
+from utils import VoitureParams
+
+LOIS = ("fixe", "uniforme", "normale", "triangulaire")
+PERCENTILES = (5, 50, 95)
+
+# Nombre de tirages par bloc (et donc par tâche envoyée au pool de processus)
+TAILLE_BLOC = 50_000
+# En dessous de ce nombre de tirages, le coût de démarrage des processus n'est pas rentable
+SEUIL_PARALLELE = 2_000_000
+
+
+@dataclass(frozen=True)
+class Distribution:
+    """
+    Loi d'échantillonnage d'un paramètre.
+
+    - fixe : toujours `valeur`
+    - uniforme : entre `minimum` et `maximum`
+    - normale : moyenne `valeur`, écart-type `ecart_type`, bornée à [`minimum`, `maximum`] si fournis
+    - triangulaire : entre `minimum` et `maximum`, mode `valeur`
+    """
+    loi: str = "fixe"
+    valeur: float = 0.0
+    ecart_type: float = 0.0
+    minimum: Optional[float] = None
+    maximum: Optional[float] = None
+
+    def __post_init__(self):
+        if self.loi not in LOIS:
+            raise ValueError(f"Loi inconnue : '{self.loi}' (attendu : {', '.join(LOIS)})")
+
+    def echantillonner(self, rng: np.random.Generator, n: int) -> np.ndarray:
+        if self.loi == "uniforme":
+            return rng.uniform(self.minimum, self.maximum, n)
+        if self.loi == "triangulaire":
+            if self.minimum == self.maximum:
+                return np.full(n, float(self.minimum))
+            return rng.triangular(self.minimum, self.valeur, self.maximum, n)
+        if self.loi == "normale":
+            tirages = rng.normal(self.valeur, self.ecart_type, n)
+            if self.minimum is not None or self.maximum is not None:
+                tirages = np.clip(tirages, self.minimum, self.maximum)
+            return tirages
+        return np.full(n, float(self.valeur))
+
+
+@dataclass
+class ResultatsMonteCarlo:
+    """Percentiles de l'économie annuelle et de l'année de rentabilité du vélo."""
+    nb_tirages: int = 0
+    economie_annuelle: Dict[int, float] = field(default_factory=dict)
+    annee_rentabilite: Dict[int, float] = field(default_factory=dict)
+    proba_economie: float = 0.0
+    proba_jamais_rentable: float = 0.0
+
+
+def distributions_par_defaut(profil_data: dict, voiture_params: VoitureParams) -> Dict[str, Distribution]:
+    """Lois par défaut : jours uniformes entre min et max, autres paramètres à ±10 % autour de la saisie."""
+    return {
+        "jours_semaine": Distribution(
+            "uniforme",
+            minimum=profil_data.get("jours_semaine_min", 0),
+            maximum=profil_data.get("jours_semaine_max", 0),
+        ),
+        "prix_carburant": Distribution(
+            "normale", valeur=voiture_params.prix_carburant,
+            ecart_type=voiture_params.prix_carburant * 0.10, minimum=0.0,
+        ),
+        "consommation": Distribution(
+            "normale", valeur=voiture_params.consommation,
+            ecart_type=voiture_params.consommation * 0.10, minimum=0.0,
+        ),
+        "valeur_revente": Distribution(
+            "triangulaire", valeur=voiture_params.valeur_revente,
+            minimum=voiture_params.valeur_revente * 0.9, maximum=voiture_params.valeur_revente * 1.1,
+        ),
+    }
+
+
+def _simuler_bloc(profil_data: dict, voiture: dict, distributions: Dict[str, Distribution], graine, n: int):
+    """Simule `n` tirages et renvoie (économie annuelle, année de rentabilité)."""
+    rng = np.random.default_rng(graine)
+    tirages = {nom: loi.echantillonner(rng, n) for nom, loi in distributions.items()}
+
+    km_an = km_an_velo_batch(profil_data, tirages.get("jours_semaine", 0))
+    duree = profil_data["duree"]
+    resultats_velo = calculer_couts_batch({
+        "prix_achat": profil_data["prix_achat"], "aide": profil_data["aide"],
+        "entretien_total": profil_data["entretien_annuel"] * duree, "duree": duree,
+        "fmd": profil_data["fmd"], "km_an": km_an,
+    })
+
+    colonnes_voiture = {**voiture, **{nom: valeurs for nom, valeurs in tirages.items() if nom in voiture}}
+    cout_voiture = calculer_cout_voiture_pour_trajet_batch(km_an, colonnes_voiture)
+
+    economie = cout_voiture - resultats_velo["cout_annuel_fmd"]
+
+    # Le prix net du vélo est remboursé par l'écart annuel de frais d'usage (voiture évitée + FMD - entretien)
+    investissement = profil_data["prix_achat"] - profil_data["aide"]
+    gain_annuel = cout_voiture + profil_data["fmd"] - profil_data["entretien_annuel"]
+    annee_rentabilite = np.full(n, np.inf)
+    np.divide(investissement, gain_annuel, out=annee_rentabilite, where=gain_annuel > 0)
+    np.maximum(annee_rentabilite, 0, out=annee_rentabilite)
+
+    return economie, annee_rentabilite
+
+
+def simuler(profil_data: dict, voiture_params: VoitureParams,
+            distributions: Optional[Dict[str, Distribution]] = None,
+            nb_tirages: int = 100_000, graine: Optional[int] = None,
+            nb_processus: Optional[int] = None) -> ResultatsMonteCarlo:
+    """
+    Lance `nb_tirages` tirages et renvoie les percentiles P5/P50/P95.
+
+    Les clés de `distributions` sont `jours_semaine` ou des champs de `VoitureParams`.
+    À graine égale, le résultat est identique quel que soit `nb_processus`. Le pool
+    de processus n'est utilisé qu'au-delà de `SEUIL_PARALLELE` tirages, sauf si
+    `nb_processus` est fourni explicitement.
+    """
+    if distributions is None:
+        distributions = distributions_par_defaut(profil_data, voiture_params)
+    voiture = asdict(voiture_params)
+    inconnues = set(distributions) - set(voiture) - {"jours_semaine"}
+    if inconnues:
+        raise ValueError(f"Paramètres non simulables : {', '.join(sorted(inconnues))}")
+
+    tailles = [TAILLE_BLOC] * (nb_tirages // TAILLE_BLOC)
+    if nb_tirages % TAILLE_BLOC:
+        tailles.append(nb_tirages % TAILLE_BLOC)
+    graines = np.random.SeedSequence(graine).spawn(len(tailles))
+    # Copie en dict : les profils du catalogue (mappings en lecture seule) ne sont pas sérialisables
+    profil_data = dict(profil_data)
+    taches = [(profil_data, voiture, distributions, g, n) for g, n in zip(graines, tailles)]
+
+    if nb_processus is None:
+        parallele = nb_tirages >= SEUIL_PARALLELE and (os.cpu_count() or 1) > 1
+    else:
+        parallele = nb_processus > 1
+    if parallele and len(taches) > 1:
+        with ProcessPoolExecutor(max_workers=nb_processus) as pool:
+            blocs = list(pool.map(_simuler_bloc, *zip(*taches)))
+    else:
+        blocs = [_simuler_bloc(*tache) for tache in taches]
+
+    if not blocs:
+        return ResultatsMonteCarlo()
+
+    economie = np.concatenate([b[0] for b in blocs])
+    annee_rentabilite = np.concatenate([b[1] for b in blocs])
+
+    return ResultatsMonteCarlo(
+        nb_tirages=nb_tirages,
+        economie_annuelle=dict(zip(PERCENTILES, np.percentile(economie, PERCENTILES).tolist())),
+        # 'nearest' évite les interpolations entre valeurs infinies (jamais rentable)
+        annee_rentabilite=dict(zip(PERCENTILES, np.percentile(annee_rentabilite, PERCENTILES, method="nearest").tolist())),
+        proba_economie=float(np.mean(economie > 0)),
+        proba_jamais_rentable=float(np.mean(np.isinf(annee_rentabilite))),
+    )
@@ -0,0 +1,290 @@
+# prix_carburants.py
+"""
+Historique des prix à la pompe : agrégats journaliers par région et carburant.
+
+Les relevés bruts (un CSV par période, plusieurs Go, une ligne par station,
+jour et carburant) sont lus par blocs et réduits à deux tableaux par série
+(région, carburant) : somme des prix et nombre de relevés de chaque jour. Ces
+agrégats sont enregistrés dans un fichier `.npz` compact, avec pour chaque CSV
+source la position jusqu'où il a été lu : une nouvelle ingestion ne lit que les
+lignes ajoutées depuis.
+
+Colonnes attendues : `date` (AAAA-MM-JJ, éventuellement suivie de l'heure),
+`carburant`, `prix` (€/L) et `region` (à défaut, le département est déduit des
+deux premiers caractères de `cp`).
+
+À la lecture, des sommes cumulées par série donnent la moyenne de n'importe
+quelle fenêtre de jours en temps constant ; la moyenne des 30 derniers jours
+(`AppConfig.PRIX_CARBURANTS_FENETRE_JOURS`) est en plus gardée par série après
+le premier accès.
+
+Exemple :
+    python prix_carburants.py prix_2024.csv prix_2025.csv
+    python prix_carburants.py --moyenne 69 gazole
+"""
+import argparse
+import io
+import json
+import os
+import sys
+import tempfile
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from config import AppConfig
+
+
+class PrixCarburantsError(Exception):
+    """Fichier d'agrégats illisible ou source incompatible avec l'ingestion précédente."""
+
+
+class _LecteurBorne(io.RawIOBase):
+    """Lecture d'un fichier binaire entre deux positions (lignes complètes seulement)."""
+
+    def __init__(self, fichier, fin: int):
+        self._fichier = fichier
+        self._fin = fin
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, tampon) -> int:
+        reste = self._fin - self._fichier.tell()
+        if reste <= 0:
+            return 0
+        donnees = self._fichier.read(min(len(tampon), reste))
+        tampon[:len(donnees)] = donnees
+        return len(donnees)
+
+
+def _fin_derniere_ligne(fichier, taille: int) -> int:
+    """Position qui suit le dernier saut de ligne : une ligne en cours d'écriture n'est pas lue."""
+    position = taille
+    while position > 0:
+        debut = max(0, position - 65_536)
+        fichier.seek(debut)
+        bloc = fichier.read(position - debut)
+        indice = bloc.rfind(b"\n")
+        if indice >= 0:
+            return debut + indice + 1
+        position = debut
+    return 0
+
+
+def _jours(dates) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Numéros de jour (depuis le 1970-01-01) et masque des dates valides.
+
+    Chaque date distincte du bloc n'est convertie qu'une fois ; une date absente
+    ou mal formée invalide sa ligne sans interrompre l'ingestion.
+    """
+    import pandas as pd
+
+    codes, valeurs = pd.factorize(dates.astype(str).str.slice(0, 10))
+    converties = pd.to_datetime(valeurs, format="%Y-%m-%d", errors="coerce")
+    valides = np.append(~np.asarray(converties.isna()), False)  # code -1 : valeur manquante
+    jours = np.append(converties.values.astype("datetime64[D]").astype(np.int64), 0)
+    jours[~valides] = 0
+    return jours[codes], valides[codes]
+
+
+class AgregatsPrix:
+    """Sommes et nombres de relevés par série (région, carburant) et par jour."""
+
+    def __init__(self, series: Iterable[Tuple[str, str]] = (), jour0: int = 0,
+                 somme: Optional[np.ndarray] = None, nb: Optional[np.ndarray] = None,
+                 sources: Optional[Dict[str, dict]] = None):
+        self.series: List[Tuple[str, str]] = [tuple(s) for s in series]
+        self._index = {serie: i for i, serie in enumerate(self.series)}
+        self.jour0 = int(jour0)
+        self.somme = somme if somme is not None else np.zeros((len(self.series), 0))
+        self.nb = nb if nb is not None else np.zeros((len(self.series), 0), dtype=np.int64)
+        self.sources = dict(sources or {})
+        self._cumuls = None
+        self._moyennes: Dict[tuple, Optional[float]] = {}
+
+    # --- Persistance ---
+    @classmethod
+    def charger(cls, chemin: str = AppConfig.PRIX_CARBURANTS_AGREGATS) -> "AgregatsPrix":
+        try:
+            with np.load(chemin, allow_pickle=False) as donnees:
+                return cls(zip(donnees["regions"].tolist(), donnees["carburants"].tolist()), int(donnees["jour0"]),
+                           donnees["somme"], donnees["nb"], json.loads(str(donnees["sources"])))
+        except (OSError, KeyError, ValueError) as e:
+            raise PrixCarburantsError(f"Agrégats de prix illisibles ({chemin}) : {e}") from e
+
+    def enregistrer(self, chemin: str = AppConfig.PRIX_CARBURANTS_AGREGATS) -> None:
+        # Fichier temporaire puis renommage, comme pour les profils : jamais d'agrégats à moitié écrits
+        dossier = os.path.dirname(os.path.abspath(chemin))
+        fd, chemin_tmp = tempfile.mkstemp(dir=dossier, suffix=".npz")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                np.savez(f, regions=np.array([r for r, _ in self.series], dtype=str),
+                         carburants=np.array([c for _, c in self.series], dtype=str),
+                         jour0=self.jour0, somme=self.somme, nb=self.nb, sources=json.dumps(self.sources))
+            os.replace(chemin_tmp, chemin)
+        except BaseException:
+            if os.path.exists(chemin_tmp):
+                os.unlink(chemin_tmp)
+            raise
+
+    # --- Ingestion ---
+    def _etendre(self, nb_series: int, jour_min: int, jour_max: int) -> None:
+        nb_jours = self.somme.shape[1]
+        debut = min(self.jour0, jour_min) if nb_jours else jour_min
+        fin = max(self.jour0 + nb_jours - 1, jour_max) if nb_jours else jour_max
+        if debut == self.jour0 and fin - debut + 1 == nb_jours and nb_series == self.somme.shape[0]:
+            return
+        somme = np.zeros((nb_series, fin - debut + 1))
+        nb = np.zeros((nb_series, fin - debut + 1), dtype=np.int64)
+        decalage = self.jour0 - debut
+        somme[:self.somme.shape[0], decalage:decalage + nb_jours] = self.somme
+        nb[:self.nb.shape[0], decalage:decalage + nb_jours] = self.nb
+        self.somme, self.nb, self.jour0 = somme, nb, debut
+
+    def ajouter_bloc(self, bloc) -> int:
+        """Ajoute un bloc de relevés bruts (DataFrame) ; renvoie le nombre de relevés retenus."""
+        import pandas as pd
+
+        if "region" not in bloc.columns and "cp" not in bloc.columns:
+            raise PrixCarburantsError("Colonne `region` ou `cp` requise dans les relevés de prix.")
+        prix = pd.to_numeric(bloc["prix"], errors="coerce").to_numpy(dtype=np.float64)
+        jours, dates_valides = _jours(bloc["date"])
+        valides = np.isfinite(prix) & (prix > 0) & dates_valides
+        if not valides.any():
+            return 0
+        prix = prix[valides]
+        jours = jours[valides]
+
+        # Les textes ne sont nettoyés qu'une fois par valeur distincte du bloc, pas par ligne
+        if "region" in bloc.columns:
+            codes_regions, regions = pd.factorize(bloc["region"][valides].astype(str))
+            regions = [r.strip() for r in regions]
+        else:
+            codes_regions, regions = pd.factorize(bloc["cp"][valides].astype(str))
+            regions = [cp.strip().zfill(5)[:2] for cp in regions]
+        codes_carburants, carburants = pd.factorize(bloc["carburant"][valides].astype(str))
+        carburants = [c.strip().lower() for c in carburants]
+        paires, codes_paires = np.unique(codes_regions * len(carburants) + codes_carburants, return_inverse=True)
+        numeros = []
+        for paire in paires.tolist():
+            serie = (regions[paire // len(carburants)], carburants[paire % len(carburants)])
+            if serie not in self._index:
+                self._index[serie] = len(self.series)
+                self.series.append(serie)
+            numeros.append(self._index[serie])
+        series = np.array(numeros, dtype=np.int64)[codes_paires]
+
+        self._etendre(len(self.series), int(jours.min()), int(jours.max()))
+        nb_jours = self.somme.shape[1]
+        cellules = series * nb_jours + (jours - self.jour0)
+        taille = len(self.series) * nb_jours
+        self.somme += np.bincount(cellules, weights=prix, minlength=taille).reshape(self.somme.shape)
+        self.nb += np.bincount(cellules, minlength=taille).reshape(self.nb.shape)
+        self._cumuls = None
+        self._moyennes.clear()
+        return len(prix)
+
+    def ingerer(self, chemin: str, taille_bloc: int = AppConfig.PRIX_CARBURANTS_TAILLE_BLOC) -> int:
+        """
+        Lit les lignes de `chemin` ajoutées depuis la dernière ingestion ; renvoie le nombre de relevés retenus.
+
+        Seules les lignes complètes sont lues ; la position atteinte est gardée
+        dans `sources` (enregistrée avec les agrégats).
+        """
+        import pandas as pd
+
+        cle = os.path.abspath(chemin)
+        deja_lu = self.sources.get(cle, {}).get("octets", 0)
+        nb_releves = 0
+        with open(chemin, "rb") as f:
+            entete = f.readline()
+            taille = os.fstat(f.fileno()).st_size
+            if deja_lu and (taille < deja_lu or entete.decode("utf-8").strip() != self.sources[cle]["entete"]):
+                raise PrixCarburantsError(f"{chemin} a été remplacé ou tronqué depuis la dernière ingestion : "
+                                          "reconstruisez les agrégats (--reconstruire).")
+            fin = _fin_derniere_ligne(f, taille)
+            debut = max(deja_lu, len(entete))
+            if fin > debut:
+                f.seek(debut)
+                noms = pd.read_csv(io.BytesIO(entete), nrows=0).columns.to_list()
+                lecteur = io.BufferedReader(_LecteurBorne(f, fin), buffer_size=1 << 20)
+                for bloc in pd.read_csv(lecteur, names=noms, header=None, chunksize=taille_bloc,
+                                        usecols=lambda c: c in ("date", "region", "cp", "carburant", "prix"),
+                                        dtype={"region": str, "cp": str, "carburant": str}):
+                    nb_releves += self.ajouter_bloc(bloc)
+        self.sources[cle] = {"octets": max(fin, deja_lu), "entete": entete.decode("utf-8").strip()}
+        return nb_releves
+
+    # --- Lecture ---
+    @property
+    def dernier_jour(self) -> Optional[int]:
+        """Dernier jour (numéro depuis le 1970-01-01) ayant au moins un relevé."""
+        jours = np.flatnonzero(self.nb.sum(axis=0))
+        return self.jour0 + int(jours[-1]) if len(jours) else None
+
+    def regions(self) -> List[str]:
+        return sorted({r for r, _ in self.series})
+
+    def carburants(self, region: Optional[str] = None) -> List[str]:
+        return sorted({c for r, c in self.series if region is None or r == region})
+
+    def _cumuler(self):
+        if self._cumuls is None:
+            zeros = np.zeros((len(self.series), 1))
+            self._cumuls = (np.hstack([zeros, np.cumsum(self.somme, axis=1)]),
+                            np.hstack([zeros.astype(np.int64), np.cumsum(self.nb, axis=1)]),
+                            self.dernier_jour)
+        return self._cumuls
+
+    def moyenne(self, region: str, carburant: str, jours: int = AppConfig.PRIX_CARBURANTS_FENETRE_JOURS,
+                fin: Optional[int] = None) -> Optional[float]:
+        """
+        Prix moyen (€/L) des relevés des `jours` jours qui finissent à `fin` inclus
+        (par défaut le dernier jour des données), ou None sans relevé.
+        """
+        cle = (region, carburant.lower(), jours, fin)
+        if cle in self._moyennes:
+            return self._moyennes[cle]
+        serie = self._index.get((region, carburant.lower()))
+        resultat = None
+        if serie is not None:
+            sommes, nombres, dernier = self._cumuler()
+            fin_relative = min((dernier if fin is None else fin) - self.jour0 + 1, sommes.shape[1] - 1)
+            debut_relatif = max(fin_relative - jours, 0)
+            if fin_relative > 0:
+                nb = nombres[serie, fin_relative] - nombres[serie, debut_relatif]
+                if nb:
+                    resultat = float((sommes[serie, fin_relative] - sommes[serie, debut_relatif]) / nb)
+        self._moyennes[cle] = resultat
+        return resultat
+
+
+def ingerer_fichiers(chemins: Iterable[str], destination: str = AppConfig.PRIX_CARBURANTS_AGREGATS,
+                     reconstruire: bool = False, taille_bloc: int = AppConfig.PRIX_CARBURANTS_TAILLE_BLOC) -> AgregatsPrix:
+    """Met à jour (ou reconstruit) le fichier d'agrégats avec les lignes nouvelles des CSV."""
+    agregats = AgregatsPrix() if reconstruire or not os.path.exists(destination) else AgregatsPrix.charger(destination)
+    for chemin in chemins:
+        nb = agregats.ingerer(chemin, taille_bloc)
+        print(f"{chemin} : {nb} relevés ajoutés.", file=sys.stderr)
+    agregats.enregistrer(destination)
+    return agregats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Agrégats journaliers des prix à la pompe par région et carburant.")
+    parser.add_argument("sources", nargs="*", help="CSV de relevés (seules les lignes nouvelles sont lues).")
+    parser.add_argument("--agregats", default=AppConfig.PRIX_CARBURANTS_AGREGATS, help="Fichier d'agrégats (.npz).")
+    parser.add_argument("--reconstruire", action="store_true", help="Repart de zéro au lieu de compléter les agrégats.")
+    parser.add_argument("--taille-bloc", type=int, default=AppConfig.PRIX_CARBURANTS_TAILLE_BLOC)
+    parser.add_argument("--moyenne", nargs=2, metavar=("REGION", "CARBURANT"),
+                        help="Affiche la moyenne des derniers jours pour une région et un carburant.")
+    args = parser.parse_args()
+    if not args.sources and not args.moyenne:
+        parser.error("Indiquez des fichiers à ingérer ou --moyenne.")
+    agregats = (ingerer_fichiers(args.sources, args.agregats, args.reconstruire, args.taille_bloc)
+                if args.sources else AgregatsPrix.charger(args.agregats))
+    if args.moyenne:
+        moyenne = agregats.moyenne(*args.moyenne)
+        print("Aucun relevé." if moyenne is None else f"{moyenne:.3f} €/L")
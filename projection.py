@@ -0,0 +1,187 @@
+# projection.py
+"""
+Projection pluriannuelle des flux de trésorerie du vélo et de la voiture.
+
+Contrairement au coût annuel lissé de `utils.py`, chaque année porte ses propres
+flux :
+- vélo : achat net (prix − aide) au début de chaque cycle de `duree` ans,
+  entretien annuel, moins le FMD (non indexé) ;
+- voiture : achat au début de chaque cycle de `duree_possession` ans, revente
+  en fin de cycle, frais fixes annuels, carburant selon une trajectoire de prix ;
+  seule la part imputable au trajet (km vélotaf / km totaux) est comptée, comme
+  dans l'onglet de comparaison.
+
+Les montants sont indexés sur l'inflation, les flux de l'année t (t = 0 pour la
+première année) sont actualisés de t années. Sans inflation ni évolution du
+carburant, sur un nombre entier de cycles, la somme des flux redonne les coûts
+annuels de `calculer_couts` et `calculer_couts_voiture` multipliés par l'horizon,
+tant que le FMD ne dépasse pas le coût annuel du vélo : au-delà, `calculer_couts`
+ramène le coût à 0 alors que la projection compte l'excédent de FMD comme un gain
+(c'est un flux réellement perçu).
+
+Tous les scénarios (lignes) et toutes les années (colonnes) sont calculés en une
+opération sur des tableaux NumPy. Une `ProjectionFlux` garde les années déjà
+calculées : allonger l'horizon ne calcule que les années manquantes.
+"""
+import threading
+from dataclasses import asdict, dataclass
+from typing import Mapping
+
+import numpy as np
+
+from batch import PREFIXE_VOITURE, _DEFAUTS_VOITURE, _colonne, _diviser
+from cache import memoize
+from config import AppConfig
+from utils import VoitureParams
+
+# Colonnes vélo attendues (mêmes noms que dans `profils.json`, plus le kilométrage annuel)
+COLONNES_VELO_PROJECTION = ("prix_achat", "aide", "entretien_annuel", "duree", "fmd", "km_an")
+
+
+@dataclass(frozen=True)
+class ResultatsProjection:
+    """Flux annuels par scénario (lignes) et par année (colonnes), en lecture seule."""
+    annees: np.ndarray                           # (H,) : 1, 2, ..., H
+    flux_velo: np.ndarray                        # (S, H)
+    flux_voiture: np.ndarray                     # (S, H), part imputable au trajet
+    economies: np.ndarray                        # (S, H) : voiture − vélo
+    economies_cumulees: np.ndarray               # (S, H)
+    economies_actualisees_cumulees: np.ndarray   # (S, H)
+
+    @property
+    def van(self) -> np.ndarray:
+        """Valeur actuelle nette de l'économie sur l'horizon, par scénario."""
+        return self.economies_actualisees_cumulees[:, -1]
+
+
+class ProjectionFlux:
+    """
+    Projection incrémentale des flux pour un ensemble de scénarios.
+
+    `colonnes` contient les colonnes de `COLONNES_VELO_PROJECTION`, les champs de
+    `VoitureParams` préfixés par `voiture_` (valeurs par défaut si absents) et,
+    facultativement, `inflation`, `taux_actualisation` et `evolution_carburant`
+    (taux annuels). Une trajectoire explicite de prix du carburant (€/L, forme (K,)
+    ou (S, K)) peut être fournie : au-delà de ses K années, le dernier prix évolue
+    au taux `evolution_carburant`.
+    """
+
+    def __init__(self, colonnes: Mapping[str, object], trajectoire_carburant=None):
+        valeurs = {nom: _colonne(colonnes, nom) for nom in COLONNES_VELO_PROJECTION}
+        valeurs.update({
+            PREFIXE_VOITURE + nom: _colonne(colonnes, PREFIXE_VOITURE + nom, defaut)
+            for nom, defaut in _DEFAUTS_VOITURE.items()
+        })
+        valeurs["inflation"] = _colonne(colonnes, "inflation", AppConfig.PROJECTION_INFLATION)
+        valeurs["taux_actualisation"] = _colonne(colonnes, "taux_actualisation", AppConfig.PROJECTION_TAUX_ACTUALISATION)
+        valeurs["evolution_carburant"] = _colonne(colonnes, "evolution_carburant", AppConfig.PROJECTION_EVOLUTION_CARBURANT)
+
+        nb_scenarios = int(np.prod(np.broadcast_shapes(*(np.shape(v) for v in valeurs.values()))))
+        # Une ligne par scénario, une colonne par année
+        self._p = {nom: np.broadcast_to(np.asarray(v, dtype=np.float64).reshape(-1), (nb_scenarios,))[:, np.newaxis]
+                   for nom, v in valeurs.items()}
+        self.nb_scenarios = nb_scenarios
+
+        self._trajectoire = None
+        if trajectoire_carburant is not None:
+            trajectoire = np.asarray(trajectoire_carburant, dtype=np.float64)
+            self._trajectoire = np.broadcast_to(np.atleast_2d(trajectoire), (nb_scenarios, trajectoire.shape[-1]))
+
+        self._blocs = {cle: np.empty((nb_scenarios, 0)) for cle in ("velo", "voiture", "economies", "actualisees")}
+        self._verrou = threading.Lock()
+
+    @property
+    def horizon_calcule(self) -> int:
+        return self._blocs["velo"].shape[1]
+
+    def _prix_carburant(self, t: np.ndarray) -> np.ndarray:
+        p = self._p
+        if self._trajectoire is None:
+            return p["voiture_prix_carburant"] * (1 + p["evolution_carburant"]) ** t
+        k = self._trajectoire.shape[1]
+        connus = np.take(self._trajectoire, np.minimum(t[0], k - 1).astype(np.int64), axis=1)
+        return np.where(t < k, connus, connus * (1 + p["evolution_carburant"]) ** (t - k + 1))
+
+    def _calculer_annees(self, debut: int, fin: int):
+        """Flux des années `debut` à `fin` − 1 (t = 0 pour la première année)."""
+        p = self._p
+        t = np.arange(debut, fin, dtype=np.float64)[np.newaxis, :]
+        indice = (1 + p["inflation"]) ** t
+
+        # Vélo : rachat au début de chaque cycle (un seul achat si la durée n'est pas > 0)
+        duree = p["duree"]
+        debut_cycle_velo = np.where(duree > 0, np.mod(t, np.where(duree > 0, duree, 1)) == 0, t == 0)
+        flux_velo = (debut_cycle_velo * (p["prix_achat"] - p["aide"]) * indice
+                     + p["entretien_annuel"] * indice - p["fmd"])
+
+        # Voiture : achat en début de cycle, revente en fin de cycle
+        v = {nom: p[PREFIXE_VOITURE + nom] for nom in _DEFAUTS_VOITURE}
+        possession = np.where(v["duree_possession"] > 0, v["duree_possession"], 1)
+        achat = (np.mod(t, possession) == 0) * v["prix_achat"] * indice
+        revente = (np.mod(t + 1, possession) == 0) * v["valeur_revente"] * indice
+        if not np.all(v["duree_possession"] > 0):
+            # Sans durée de possession, `calculer_couts_voiture` ne compte aucun amortissement
+            achat = np.where(v["duree_possession"] > 0, achat, 0.0)
+            revente = np.where(v["duree_possession"] > 0, revente, 0.0)
+        frais_fixes = (v["assurance"] + v["entretien"] + v["autres_frais"]) * indice
+        km_velotaf = p["km_an"]
+        km_total = km_velotaf + v["km_autres"]
+        carburant = (km_total / 100) * v["consommation"] * self._prix_carburant(t)
+        proportion = _diviser(km_velotaf, km_total)
+        flux_voiture = (achat - revente + frais_fixes + carburant) * proportion
+
+        economies = flux_voiture - flux_velo
+        actualisees = economies / (1 + p["taux_actualisation"]) ** t
+        return {"velo": flux_velo, "voiture": flux_voiture, "economies": economies, "actualisees": actualisees}
+
+    def etendre(self, horizon: int):
+        """Calcule les années manquantes jusqu'à `horizon` (aucun calcul si elles le sont déjà)."""
+        with self._verrou:
+            debut = self.horizon_calcule
+            if horizon <= debut:
+                return
+            nouveaux = self._calculer_annees(debut, horizon)
+            self._blocs = {cle: np.concatenate([self._blocs[cle], nouveaux[cle]], axis=1) for cle in self._blocs}
+
+    def resultats(self, horizon: int) -> ResultatsProjection:
+        """Résultats sur les `horizon` premières années, en étendant la projection si besoin."""
+        if horizon < 1:
+            raise ValueError("L'horizon doit être d'au moins un an.")
+        self.etendre(horizon)
+        blocs = {cle: valeurs[:, :horizon] for cle, valeurs in self._blocs.items()}
+        tableaux = {
+            "annees": np.arange(1, horizon + 1),
+            "flux_velo": blocs["velo"],
+            "flux_voiture": blocs["voiture"],
+            "economies": blocs["economies"],
+            "economies_cumulees": np.cumsum(blocs["economies"], axis=1),
+            "economies_actualisees_cumulees": np.cumsum(blocs["actualisees"], axis=1),
+        }
+        for tableau in tableaux.values():
+            tableau.setflags(write=False)
+        return ResultatsProjection(**tableaux)
+
+
+@memoize(AppConfig.TAILLE_CACHE_RESULTATS)
+def _projection_profil(profil: tuple, voiture_params: VoitureParams, km_an: tuple,
+                       inflation: float, taux_actualisation: float, evolution_carburant: float) -> ProjectionFlux:
+    profil_data = dict(profil)
+    colonnes = {nom: profil_data[nom] for nom in COLONNES_VELO_PROJECTION if nom != "km_an"}
+    colonnes["km_an"] = np.asarray(km_an)
+    colonnes.update({PREFIXE_VOITURE + nom: valeur for nom, valeur in asdict(voiture_params).items()})
+    colonnes.update(inflation=inflation, taux_actualisation=taux_actualisation, evolution_carburant=evolution_carburant)
+    return ProjectionFlux(colonnes)
+
+
+def projection_profil(profil_data: dict, voiture_params: VoitureParams, km_an,
+                      inflation: float = AppConfig.PROJECTION_INFLATION,
+                      taux_actualisation: float = AppConfig.PROJECTION_TAUX_ACTUALISATION,
+                      evolution_carburant: float = AppConfig.PROJECTION_EVOLUTION_CARBURANT) -> ProjectionFlux:
+    """
+    Projection d'un profil vélo pour un ou plusieurs kilométrages annuels (un scénario chacun).
+
+    La projection est partagée par jeu de paramètres : allonger l'horizon ne
+    calcule que les années qui manquent.
+    """
+    return _projection_profil(tuple(sorted(profil_data.items())), voiture_params, tuple(int(k) for k in km_an),
+                              float(inflation), float(taux_actualisation), float(evolution_carburant))
@@ -0,0 +1,151 @@
+# rentabilite.py
+"""
+Point de rentabilité du vélo face à la voiture.
+
+- `km_an_rentabilite` / `distance_rentabilite` : kilométrage (ou distance d'un
+  aller simple) à partir duquel l'économie annuelle devient positive, résolu
+  analytiquement ;
+- `annees_amortissement` : nombre d'années pour rembourser le prix net du vélo ;
+- `grille_economies` : économie annuelle pour toute une grille jours × distance,
+  calculée en une passe vectorisée et gardée en cache par jeu de paramètres.
+
+Mêmes conventions que l'onglet de comparaison : la voiture n'est comptée que pour
+la part de son coût imputable au trajet, le vélo pour son coût annuel après FMD.
+"""
+import math
+from dataclasses import asdict, dataclass
+
+from cache import memoize
+from config import AppConfig
+from utils import VeloParams, VoitureParams, calculer_cout_voiture_pour_trajet, calculer_couts_velo_cache
+
+
+def _cout_velo_annuel(profil_data: dict) -> float:
+    # Le coût annuel après FMD ne dépend pas du kilométrage
+    return calculer_couts_velo_cache(VeloParams.depuis_profil(profil_data, 0)).cout_annuel_fmd
+
+
+def km_an_rentabilite(cout_velo_annuel: float, voiture_params: VoitureParams) -> float:
+    """
+    Kilométrage annuel de vélotaf à partir duquel l'économie est positive.
+
+    Pour k km/an de vélotaf, la part de la voiture vaut
+    F·k / (k + km_autres) + c·k (F : coûts fixes annuels, c : carburant par km) ;
+    l'égaler au coût annuel du vélo V donne une équation du second degré en k :
+    c·k² + (F + c·km_autres − V)·k − V·km_autres = 0.
+    Renvoie 0 si le vélo est rentable dès le premier kilomètre, `inf` s'il ne l'est jamais.
+    """
+    p = voiture_params
+    amortissement = (p.prix_achat - p.valeur_revente) / p.duree_possession if p.duree_possession > 0 else 0
+    fixe = amortissement + p.assurance + p.entretien + p.autres_frais
+    carburant_km = p.consommation * p.prix_carburant / 100
+    km_autres = p.km_autres
+    v = cout_velo_annuel
+
+    if v <= 0:
+        return 0.0
+    if km_autres <= 0:
+        # Tout le coût de la voiture est imputé au trajet : F + c·k = V
+        if fixe >= v:
+            return 0.0
+        return (v - fixe) / carburant_km if carburant_km > 0 else math.inf
+    if carburant_km <= 0:
+        return v * km_autres / (fixe - v) if fixe > v else math.inf
+
+    b = fixe + carburant_km * km_autres - v
+    racine = math.sqrt(b * b + 4 * carburant_km * v * km_autres)
+    # Forme numériquement stable de la racine positive
+    return 2 * v * km_autres / (b + racine) if b >= 0 else (racine - b) / (2 * carburant_km)
+
+
+def distance_rentabilite(profil_data: dict, voiture_params: VoitureParams, jours_semaine: float) -> float:
+    """Distance d'un aller simple (km) à partir de laquelle le vélo est rentable, pour `jours_semaine` jours."""
+    km_an = km_an_rentabilite(_cout_velo_annuel(profil_data), voiture_params)
+    if km_an == 0:
+        return 0.0
+    trajets_an = profil_data.get('nb_trajets_jour', 2) * jours_semaine * AppConfig.SEMAINES_TRAVAILLEES_PAR_AN
+    return km_an / trajets_an if trajets_an > 0 else math.inf
+
+
+def annees_amortissement(profil_data: dict, voiture_params: VoitureParams, km_an: int) -> float:
+    """
+    Nombre d'années pour rembourser le prix net du vélo (achat − aide).
+
+    Chaque année, le vélo rapporte la part de voiture évitée et le FMD, moins son
+    entretien. Renvoie `inf` si ce gain n'est pas positif.
+    """
+    investissement = profil_data['prix_achat'] - profil_data['aide']
+    gain_annuel = (calculer_cout_voiture_pour_trajet(km_an, voiture_params)
+                   + profil_data['fmd'] - profil_data['entretien_annuel'])
+    if gain_annuel <= 0:
+        return math.inf
+    return max(investissement / gain_annuel, 0.0)
+
+
+@dataclass(frozen=True)
+class GrilleEconomies:
+    """Économie annuelle (€) pour chaque couple (jours par semaine, distance d'un aller simple)."""
+    jours: "np.ndarray"        # forme (J,)
+    distances: "np.ndarray"    # forme (D,), en km
+    economies: "np.ndarray"    # forme (J, D), en lecture seule (partagée entre sessions)
+
+    def economie(self, jours_semaine: float, km_jour: float) -> float:
+        """Économie du point de la grille le plus proche : une simple lecture, sans calcul."""
+        import numpy as np
+
+        i = int(np.abs(self.jours - jours_semaine).argmin())
+        j = int(np.abs(self.distances - km_jour).argmin())
+        return float(self.economies[i, j])
+
+
+def distances_grille(distance_max: float = AppConfig.GRILLE_DISTANCE_MAX_KM,
+                     pas: float = AppConfig.GRILLE_PAS_KM) -> tuple:
+    """Distances d'un aller simple de la grille par défaut (`pas`, 2·`pas`, ..., `distance_max`)."""
+    nb = int(round(distance_max / pas))
+    return tuple(round(pas * i, 6) for i in range(1, nb + 1))
+
+
+# Champs du profil utilisés par la grille (le trajet est balayé par la grille elle-même)
+CHAMPS_GRILLE = ("prix_achat", "aide", "entretien_annuel", "duree", "fmd", "nb_trajets_jour")
+
+
+@memoize(AppConfig.TAILLE_CACHE_GRILLES)
+def _grille_economies(profil: tuple, voiture_params: VoitureParams, jours: tuple, distances: tuple) -> GrilleEconomies:
+    import numpy as np
+
+    from batch import calculer_cout_voiture_pour_trajet_batch, calculer_couts_batch, km_an_velo_batch
+
+    profil_data = dict(profil)
+    tab_jours = np.asarray(jours, dtype=np.float64)
+    tab_distances = np.asarray(distances, dtype=np.float64)
+    km_an = km_an_velo_batch(
+        {"km_jour": tab_distances[np.newaxis, :], "nb_trajets_jour": profil_data.get('nb_trajets_jour', 2)},
+        tab_jours[:, np.newaxis],
+    )
+    duree = profil_data['duree']
+    cout_velo = calculer_couts_batch({
+        "prix_achat": profil_data['prix_achat'], "aide": profil_data['aide'],
+        "entretien_total": profil_data['entretien_annuel'] * duree, "duree": duree,
+        "fmd": profil_data['fmd'], "km_an": km_an,
+    })["cout_annuel_fmd"]
+    economies = calculer_cout_voiture_pour_trajet_batch(km_an, asdict(voiture_params)) - cout_velo
+
+    for tableau in (tab_jours, tab_distances, economies):
+        tableau.setflags(write=False)
+    return GrilleEconomies(jours=tab_jours, distances=tab_distances, economies=economies)
+
+
+def grille_economies(profil_data: dict, voiture_params: VoitureParams,
+                     jours: tuple = tuple(range(8)), distances: tuple = None) -> GrilleEconomies:
+    """
+    Économie annuelle sur toute la grille jours × distance, en une passe vectorisée.
+
+    Mêmes arrondis que l'application (kilométrage annuel tronqué à l'entier). La
+    grille est mise en cache par jeu de paramètres : changer de point dans la grille
+    ne coûte qu'une lecture.
+    """
+    if distances is None:
+        distances = distances_grille()
+    # Clé réduite aux champs utiles : modifier le trajet du profil ne refait pas la grille
+    profil = tuple((champ, profil_data[champ]) for champ in CHAMPS_GRILLE if champ in profil_data)
+    return _grille_economies(profil, voiture_params, tuple(jours), tuple(distances))
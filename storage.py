@@ -0,0 +1,452 @@
+# storage.py
+"""
+Stockage des profils vélo.
+
+`ProfilStore` définit l'interface commune ; deux implémentations sont fournies :
+- `JsonProfilStore` : le fichier `profils.json` historique (réécrit en entier à chaque modification) ;
+- `SqliteProfilStore` : une base SQLite indexée par nom de profil, avec mise à jour
+  ligne par ligne, listing paginé et transactions atomiques.
+
+`CatalogueProfils` garde une copie en lecture seule de tous les profils, partagée
+par tout le processus et rechargée quand le stockage change ; `VueProfils` y
+ajoute, pour une session, une couche de ses propres modifications (copie à l'écriture).
+
+Import ponctuel d'un fichier JSON existant :
+    python storage.py profils.json profils.db
+"""
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from types import MappingProxyType
+from typing import Dict, Hashable, Iterable, Iterator, List, Mapping, Optional, Tuple
+
+from config import AppConfig
+
+
+class ProfilStoreError(Exception):
+    """Erreur de lecture ou d'écriture du stockage des profils."""
+
+
+class ProfilStore(ABC):
+    """Interface d'un stockage de profils vélo indexé par nom."""
+
+    @abstractmethod
+    def get(self, nom: str) -> Optional[dict]:
+        """Renvoie les données du profil `nom`, ou None s'il n'existe pas."""
+
+    @abstractmethod
+    def upsert(self, nom: str, data: dict) -> None:
+        """Crée ou remplace le profil `nom`."""
+
+    @abstractmethod
+    def delete(self, nom: str) -> None:
+        """Supprime le profil `nom` s'il existe."""
+
+    @abstractmethod
+    def list_noms(self, offset: int = 0, limit: Optional[int] = None) -> List[str]:
+        """Liste les noms de profils dans leur ordre de création, page par page."""
+
+    @abstractmethod
+    def count(self) -> int:
+        """Nombre total de profils."""
+
+    @abstractmethod
+    @contextmanager
+    def transaction(self) -> Iterator["ProfilStore"]:
+        """Regroupe plusieurs modifications : toutes sont appliquées, ou aucune."""
+
+    def signature(self) -> Optional[Hashable]:
+        """Valeur qui change quand le contenu du stockage change (None : inconnue)."""
+        return None
+
+    def recharger(self) -> None:
+        """Relit le support si le stockage garde une copie en mémoire."""
+
+    def items(self, taille_page: int = 1000) -> Iterator[Tuple[str, dict]]:
+        """Parcourt tous les profils page par page, sans tout charger en mémoire."""
+        offset = 0
+        while True:
+            noms = self.list_noms(offset, taille_page)
+            for nom in noms:
+                yield nom, self.get(nom)
+            if len(noms) < taille_page:
+                return
+            offset += taille_page
+
+    def upsert_many(self, profils: Iterable[Tuple[str, dict]]) -> int:
+        """Crée ou remplace plusieurs profils (paires nom, données) en une seule transaction."""
+        nb = 0
+        with self.transaction():
+            for nom, data in profils:
+                self.upsert(nom, data)
+                nb += 1
+        return nb
+
+
+class JsonProfilStore(ProfilStore):
+    """Stockage dans un fichier JSON unique, gardé en mémoire et réécrit atomiquement."""
+
+    def __init__(self, filepath: str = AppConfig.DEFAULT_PROFIL_VELO_FILE):
+        self.filepath = filepath
+        self._verrou = threading.RLock()
+        self._profondeur_transaction = 0
+        self._profils = self._charger()
+
+    def _charger(self) -> Dict[str, dict]:
+        try:
+            with open(self.filepath, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except json.JSONDecodeError as e:
+            raise ProfilStoreError(f"Fichier de profils illisible ({self.filepath}) : {e}") from e
+
+    def _sauvegarder(self) -> None:
+        # Écriture dans un fichier temporaire puis renommage : le fichier n'est jamais à moitié écrit
+        dossier = os.path.dirname(os.path.abspath(self.filepath))
+        fd, chemin_tmp = tempfile.mkstemp(dir=dossier, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(self._profils, f, indent=2, ensure_ascii=False)
+            os.replace(chemin_tmp, self.filepath)
+        except BaseException as e:
+            # Quelle que soit l'erreur (disque, données non sérialisables...), pas de fichier temporaire orphelin
+            if os.path.exists(chemin_tmp):
+                os.unlink(chemin_tmp)
+            if isinstance(e, (OSError, TypeError, ValueError)):
+                raise ProfilStoreError(f"Erreur lors de la sauvegarde : {e}") from e
+            raise
+
+    def get(self, nom: str) -> Optional[dict]:
+        return self._profils.get(nom)
+
+    def signature(self) -> Optional[Hashable]:
+        try:
+            stat = os.stat(self.filepath)
+        except FileNotFoundError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def recharger(self) -> None:
+        with self._verrou:
+            if not self._profondeur_transaction:
+                self._profils = self._charger()
+
+    def upsert(self, nom: str, data: dict) -> None:
+        with self._verrou:
+            self._profils[nom] = data
+            if not self._profondeur_transaction:
+                self._sauvegarder()
+
+    def delete(self, nom: str) -> None:
+        with self._verrou:
+            if self._profils.pop(nom, None) is not None and not self._profondeur_transaction:
+                self._sauvegarder()
+
+    def list_noms(self, offset: int = 0, limit: Optional[int] = None) -> List[str]:
+        noms = list(self._profils)
+        return noms[offset:] if limit is None else noms[offset:offset + limit]
+
+    def count(self) -> int:
+        return len(self._profils)
+
+    @contextmanager
+    def transaction(self):
+        with self._verrou:
+            sauvegarde = dict(self._profils)
+            self._profondeur_transaction += 1
+            try:
+                yield self
+            except BaseException:
+                self._profils = sauvegarde
+                raise
+            finally:
+                self._profondeur_transaction -= 1
+            if not self._profondeur_transaction:
+                self._sauvegarder()
+
+
+class SqliteProfilStore(ProfilStore):
+    """
+    Stockage SQLite : une ligne par profil, clé primaire sur le nom.
+
+    Une seule connexion est partagée entre les threads (sessions Streamlit) et
+    protégée par un verrou ; le mode WAL permet à d'autres processus de lire
+    pendant une écriture.
+    """
+
+    def __init__(self, filepath: str = AppConfig.DEFAULT_PROFIL_DB_FILE):
+        self.filepath = filepath
+        self._verrou = threading.RLock()
+        self._profondeur_transaction = 0
+        self._ecritures = 0  # écritures validées par cette connexion (data_version ne les voit pas)
+        try:
+            self._conn = sqlite3.connect(filepath, check_same_thread=False, isolation_level=None, timeout=10)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS profils ("
+                " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+                " nom TEXT NOT NULL UNIQUE,"
+                " donnees TEXT NOT NULL)"
+            )
+        except sqlite3.Error as e:
+            raise ProfilStoreError(f"Base de profils inaccessible ({filepath}) : {e}") from e
+
+    def _executer(self, requete: str, parametres=()):
+        try:
+            with self._verrou:
+                return self._conn.execute(requete, parametres).fetchall()
+        except sqlite3.Error as e:
+            raise ProfilStoreError(str(e)) from e
+
+    def get(self, nom: str) -> Optional[dict]:
+        lignes = self._executer("SELECT donnees FROM profils WHERE nom = ?", (nom,))
+        return json.loads(lignes[0][0]) if lignes else None
+
+    def _compter_ecriture(self) -> None:
+        if not self._profondeur_transaction:
+            self._ecritures += 1
+
+    def upsert(self, nom: str, data: dict) -> None:
+        with self._verrou:
+            self._executer(
+                "INSERT INTO profils (nom, donnees) VALUES (?, ?)"
+                " ON CONFLICT(nom) DO UPDATE SET donnees = excluded.donnees",
+                (nom, json.dumps(data, ensure_ascii=False)),
+            )
+            self._compter_ecriture()
+
+    def delete(self, nom: str) -> None:
+        with self._verrou:
+            self._executer("DELETE FROM profils WHERE nom = ?", (nom,))
+            self._compter_ecriture()
+
+    def signature(self) -> Optional[Hashable]:
+        # data_version change quand une autre connexion (ou un autre processus) valide une écriture
+        with self._verrou:
+            return (self._executer("PRAGMA data_version")[0][0], self._ecritures)
+
+    def list_noms(self, offset: int = 0, limit: Optional[int] = None) -> List[str]:
+        lignes = self._executer(
+            "SELECT nom FROM profils ORDER BY id LIMIT ? OFFSET ?",
+            (-1 if limit is None else limit, offset),
+        )
+        return [nom for (nom,) in lignes]
+
+    def count(self) -> int:
+        return self._executer("SELECT COUNT(*) FROM profils")[0][0]
+
+    def items(self, taille_page: int = 1000) -> Iterator[Tuple[str, dict]]:
+        dernier_id = 0
+        while True:
+            lignes = self._executer(
+                "SELECT id, nom, donnees FROM profils WHERE id > ? ORDER BY id LIMIT ?",
+                (dernier_id, taille_page),
+            )
+            for dernier_id, nom, donnees in lignes:
+                yield nom, json.loads(donnees)
+            if len(lignes) < taille_page:
+                return
+
+    @contextmanager
+    def transaction(self):
+        with self._verrou:
+            if self._profondeur_transaction:
+                # Transaction imbriquée : elle fait partie de la transaction englobante
+                self._profondeur_transaction += 1
+                try:
+                    yield self
+                finally:
+                    self._profondeur_transaction -= 1
+                return
+            self._executer("BEGIN IMMEDIATE")
+            self._profondeur_transaction = 1
+            try:
+                yield self
+            except BaseException:
+                self._executer("ROLLBACK")
+                raise
+            else:
+                self._executer("COMMIT")
+                self._ecritures += 1
+            finally:
+                self._profondeur_transaction = 0
+
+    # Import initial de profils.json : marqué dans l'en-tête de la base (PRAGMA user_version)
+    def import_initial_fait(self) -> bool:
+        return self._executer("PRAGMA user_version")[0][0] >= 1
+
+    def marquer_import_initial(self) -> None:
+        self._executer("PRAGMA user_version = 1")
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+class CatalogueProfils:
+    """
+    Copie en lecture seule de tous les profils, partagée par toutes les sessions.
+
+    Le catalogue est chargé une fois ; `actualiser()` (au plus une vérification
+    toutes les `intervalle_s` secondes) le recharge seulement si la signature du
+    stockage a changé. Les profils sont des `MappingProxyType` : personne ne peut
+    modifier la copie partagée.
+    """
+
+    def __init__(self, store: ProfilStore, intervalle_s: float = AppConfig.CATALOGUE_INTERVALLE_VERIFICATION_S):
+        self.store = store
+        self.intervalle_s = intervalle_s
+        self.version = 0
+        self._verrou = threading.Lock()
+        self._derniere_verification = 0.0
+        self._signature = None
+        self._profils: Mapping[str, Mapping] = MappingProxyType({})
+        self._noms: List[str] = []
+        self._charger()
+
+    def _charger(self) -> None:
+        signature = self.store.signature()
+        self.store.recharger()
+        profils = {nom: MappingProxyType(dict(data)) for nom, data in self.store.items()}
+        # Remplacement en bloc : les lecteurs voient l'ancien ou le nouveau catalogue, jamais un mélange
+        self._profils, self._noms = MappingProxyType(profils), list(profils)
+        self._signature = signature
+        self._derniere_verification = time.monotonic()
+        self.version += 1
+
+    def actualiser(self, forcer: bool = False) -> bool:
+        """Recharge le catalogue si le stockage a changé ; renvoie True en cas de rechargement."""
+        if not forcer and time.monotonic() - self._derniere_verification < self.intervalle_s:
+            return False
+        with self._verrou:
+            self._derniere_verification = time.monotonic()
+            if not forcer and self.store.signature() == self._signature:
+                return False
+            self._charger()
+            return True
+
+    def get(self, nom: str) -> Optional[Mapping]:
+        return self._profils.get(nom)
+
+    def __contains__(self, nom: str) -> bool:
+        return nom in self._profils
+
+    def list_noms(self, offset: int = 0, limit: Optional[int] = None) -> List[str]:
+        return self._noms[offset:] if limit is None else self._noms[offset:offset + limit]
+
+    def count(self) -> int:
+        return len(self._noms)
+
+    def items(self) -> Iterator[Tuple[str, Mapping]]:
+        return iter(self._profils.items())
+
+
+class VueProfils:
+    """
+    Vue d'une session sur le catalogue partagé, avec ses propres modifications.
+
+    Seuls les profils modifiés ou supprimés par la session sont gardés ; une
+    modification déjà présente dans le catalogue (après son rechargement) est
+    oubliée, si bien que la mémoire par session ne croît pas avec le catalogue.
+    """
+
+    def __init__(self, catalogue: CatalogueProfils):
+        self.catalogue = catalogue
+        self._modifies: Dict[str, Mapping] = {}
+        self._supprimes = set()
+        self._version_catalogue = catalogue.version
+
+    def _compacter(self) -> None:
+        if self._version_catalogue == self.catalogue.version:
+            return
+        self._version_catalogue = self.catalogue.version
+        self._modifies = {nom: data for nom, data in self._modifies.items() if self.catalogue.get(nom) != data}
+        self._supprimes = {nom for nom in self._supprimes if nom in self.catalogue}
+
+    @property
+    def nb_modifications(self) -> int:
+        self._compacter()
+        return len(self._modifies) + len(self._supprimes)
+
+    def modifications(self) -> Tuple[Dict[str, Mapping], set]:
+        """Profils modifiés ou ajoutés, et noms supprimés, propres à la session."""
+        self._compacter()
+        return dict(self._modifies), set(self._supprimes)
+
+    def get(self, nom: str) -> Optional[Mapping]:
+        if nom in self._modifies:
+            return self._modifies[nom]
+        if nom in self._supprimes:
+            return None
+        return self.catalogue.get(nom)
+
+    def modifier(self, nom: str, data: dict) -> None:
+        self._supprimes.discard(nom)
+        self._modifies[nom] = MappingProxyType(dict(data))
+
+    def supprimer(self, nom: str) -> None:
+        self._modifies.pop(nom, None)
+        if nom in self.catalogue:
+            self._supprimes.add(nom)
+
+    def _noms(self) -> List[str]:
+        self._compacter()
+        if not self._modifies and not self._supprimes:
+            return self.catalogue.list_noms()
+        noms = [nom for nom in self.catalogue.list_noms() if nom not in self._supprimes]
+        return noms + [nom for nom in self._modifies if nom not in self.catalogue]
+
+    def list_noms(self, offset: int = 0, limit: Optional[int] = None) -> List[str]:
+        if not self._modifies and not self._supprimes:
+            return self.catalogue.list_noms(offset, limit)
+        noms = self._noms()
+        return noms[offset:] if limit is None else noms[offset:offset + limit]
+
+    def count(self) -> int:
+        if not self._modifies and not self._supprimes:
+            return self.catalogue.count()
+        return len(self._noms())
+
+
+def importer_json(json_filepath: str, store: ProfilStore) -> int:
+    """Importe tous les profils d'un fichier JSON dans `store` et renvoie leur nombre."""
+    return store.upsert_many(JsonProfilStore(json_filepath).items())
+
+
+def ouvrir_store(backend: str = AppConfig.PROFIL_BACKEND) -> ProfilStore:
+    """
+    Ouvre le stockage configuré.
+
+    Au premier lancement, les profils de `profils.json` sont importés dans la base
+    SQLite vide. L'import est marqué dans la même transaction : s'il échoue
+    (fichier illisible), l'erreur remonte et l'import est retenté à l'ouverture suivante.
+    """
+    if backend == "json":
+        return JsonProfilStore(AppConfig.DEFAULT_PROFIL_VELO_FILE)
+    if backend == "sqlite":
+        store = SqliteProfilStore(AppConfig.DEFAULT_PROFIL_DB_FILE)
+        try:
+            if not store.import_initial_fait():
+                with store.transaction():
+                    if store.count() == 0 and os.path.exists(AppConfig.DEFAULT_PROFIL_VELO_FILE):
+                        importer_json(AppConfig.DEFAULT_PROFIL_VELO_FILE, store)
+                    store.marquer_import_initial()
+        except BaseException:
+            store.close()
+            raise
+        return store
+    raise ValueError(f"Stockage de profils inconnu : '{backend}'")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        print("Usage : python storage.py <profils.json> <profils.db>", file=sys.stderr)
+        sys.exit(2)
+    nb = importer_json(sys.argv[1], SqliteProfilStore(sys.argv[2]))
+    print(f"{nb} profils importés.")
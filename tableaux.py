@@ -0,0 +1,126 @@
+# tableaux.py
+"""
+Collections compactes de résultats : une colonne NumPy typée par champ.
+
+Un million de `CoutResultats` (même à slots) coûte un objet Python par résultat
+et un objet par valeur flottante ; un `TableauResultats` ne garde que les
+tableaux (8 octets par valeur). L'accès par attribut est le même que pour un
+enregistrement, mais renvoie la colonne entière :
+
+    tableau = TableauResultats.velo(calculer_couts_batch(colonnes))
+    tableau.cout_annuel          # ndarray (vue, sans copie)
+    tableau[0].cout_annuel       # float, via un CoutResultats
+    tableau.vers_pandas()        # DataFrame qui partage les tableaux
+
+Les colonnes ne sont jamais copiées à la construction (si elles ont déjà le bon
+type) ni à la conversion vers NumPy ou pandas ; elles sont en lecture seule.
+"""
+from dataclasses import fields
+from typing import Dict, Mapping
+
+import numpy as np
+
+from utils import CoutResultats, CoutVoitureResultats
+
+_DTYPES = {int: np.int64, float: np.float64, "int": np.int64, "float": np.float64}
+
+
+class TableauResultats:
+    """Résultats en colonnes, pour un type d'enregistrement (`CoutResultats`, `CoutVoitureResultats`...)."""
+
+    __slots__ = ("type_enregistrement", "_colonnes", "_taille")
+
+    def __init__(self, type_enregistrement, colonnes: Mapping[str, object]):
+        noms = [f.name for f in fields(type_enregistrement)]
+        manquantes = [nom for nom in noms if nom not in colonnes]
+        if manquantes:
+            raise KeyError(f"Colonnes manquantes pour {type_enregistrement.__name__} : {', '.join(manquantes)}")
+        tailles = {np.shape(colonnes[nom])[0] if np.ndim(colonnes[nom]) else 1 for nom in noms}
+        if len(tailles) > 1:
+            raise ValueError("Toutes les colonnes doivent avoir la même longueur.")
+        taille = tailles.pop() if tailles else 0
+
+        types = {f.name: _DTYPES.get(f.type, np.float64) for f in fields(type_enregistrement)}
+        tableaux = {}
+        for nom in noms:
+            valeurs = np.asarray(colonnes[nom])
+            if valeurs.ndim == 0:
+                valeurs = np.broadcast_to(valeurs, (taille,))
+            # Pas de copie si la colonne a déjà le bon type (cas des sorties de batch.py)
+            valeurs = valeurs.astype(types[nom], copy=False)
+            if valeurs.flags.writeable and valeurs.base is None:
+                valeurs.setflags(write=False)
+            elif valeurs.flags.writeable:
+                valeurs = valeurs.view()
+                valeurs.setflags(write=False)
+            tableaux[nom] = valeurs
+        self.type_enregistrement = type_enregistrement
+        self._colonnes: Dict[str, np.ndarray] = tableaux
+        self._taille = taille
+
+    @classmethod
+    def velo(cls, colonnes: Mapping[str, object]) -> "TableauResultats":
+        """Tableau de `CoutResultats` (ex. sortie de `calculer_couts_batch`)."""
+        return cls(CoutResultats, colonnes)
+
+    @classmethod
+    def voiture(cls, colonnes: Mapping[str, object]) -> "TableauResultats":
+        """Tableau de `CoutVoitureResultats` (ex. sortie de `calculer_couts_voiture_batch`)."""
+        return cls(CoutVoitureResultats, colonnes)
+
+    @classmethod
+    def depuis_enregistrements(cls, enregistrements, type_enregistrement=None) -> "TableauResultats":
+        """Construit un tableau à partir d'une séquence d'enregistrements (une copie par colonne)."""
+        enregistrements = list(enregistrements)
+        if type_enregistrement is None:
+            if not enregistrements:
+                raise ValueError("Type d'enregistrement requis pour une séquence vide.")
+            type_enregistrement = type(enregistrements[0])
+        colonnes = {f.name: np.fromiter((getattr(e, f.name) for e in enregistrements),
+                                        dtype=_DTYPES.get(f.type, np.float64), count=len(enregistrements))
+                    for f in fields(type_enregistrement)}
+        return cls(type_enregistrement, colonnes)
+
+    def __len__(self) -> int:
+        return self._taille
+
+    def __getattr__(self, nom: str) -> np.ndarray:
+        # Appelé seulement si l'attribut n'existe pas : noms des champs -> colonnes
+        try:
+            return self._colonnes[nom]
+        except KeyError:
+            raise AttributeError(nom) from None
+
+    def __getitem__(self, index):
+        """Un entier renvoie un enregistrement ; une tranche ou un masque, un tableau (vues si possible)."""
+        if isinstance(index, (int, np.integer)):
+            if not -self._taille <= index < self._taille:
+                raise IndexError(index)
+            return self.type_enregistrement(**{nom: valeurs[index].item() for nom, valeurs in self._colonnes.items()})
+        return TableauResultats(self.type_enregistrement, {nom: valeurs[index] for nom, valeurs in self._colonnes.items()})
+
+    def __iter__(self):
+        for i in range(self._taille):
+            yield self[i]
+
+    def __repr__(self) -> str:
+        return f"TableauResultats({self.type_enregistrement.__name__}, {self._taille} lignes)"
+
+    @property
+    def colonnes(self) -> tuple:
+        return tuple(self._colonnes)
+
+    @property
+    def nbytes(self) -> int:
+        """Mémoire occupée par les colonnes (octets)."""
+        return sum(valeurs.nbytes for valeurs in self._colonnes.values())
+
+    def vers_numpy(self) -> Dict[str, np.ndarray]:
+        """Colonnes NumPy, sans copie."""
+        return dict(self._colonnes)
+
+    def vers_pandas(self) -> "pd.DataFrame":
+        """DataFrame construit sans copier les colonnes (une colonne pandas par tableau)."""
+        import pandas as pd
+
+        return pd.DataFrame(self._colonnes, copy=False)
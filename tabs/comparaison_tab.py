@@ -1,14 +1,19 @@
 # tabs/comparaison_tab.py
 import streamlit as st
-import pandas as pd
-import plotly.express as px
-from dataclasses import asdict
 from config import AppConfig
-from charts import afficher_graphique_economies_cumulees
-from utils import calculer_couts_voiture
+from charts import afficher_heatmap_economies, afficher_projection_economies
+from instrumentation import span
 
+@st.fragment
 def display_comparaison_tab(resultats_velo_min, resultats_velo_max, profil_data):
-    """Affiche le contenu de l'onglet de comparaison avec une allocation des coûts par fourchette."""
+    """
+    Affiche le contenu de l'onglet de comparaison avec une allocation des coûts par fourchette.
+
+    Fragment Streamlit : la simulation Monte-Carlo ne réexécute que cet onglet.
+    Entrées : le graphe de calcul de la session (`graphe`), dont les entrées sont
+    fixées par `app.py` et l'onglet voiture ; la comparaison n'est recalculée que si
+    le profil vélo ou les paramètres voiture ont changé.
+    """
     st.header("Analyse comparative du trajet domicile-travail")
     st.info("""
     La simulation est présentée sous forme de fourchette (min/max) basée sur votre usage du vélo.
@@ -17,27 +22,18 @@ def display_comparaison_tab(resultats_velo_min, resultats_velo_max, profil_data)
     """)
 
     if resultats_velo_min and resultats_velo_max and profil_data:
-        # --- Fonction de calcul pour un scénario ---
-        def calculer_cout_voiture_pour_trajet(km_velotaf, params_voiture):
-            params_voiture.km_domicile_travail = km_velotaf
-            resultats_voiture_scenario = calculer_couts_voiture(params_voiture)
-            
-            km_total = params_voiture.km_domicile_travail + params_voiture.km_autres
-            proportion = km_velotaf / km_total if km_total > 0 else 0
-            
-            return resultats_voiture_scenario.cout_annuel * proportion
-
         # --- Calculs pour la fourchette ---
-        params_voiture_base = st.session_state.voiture_params
-        
-        cout_voiture_min = calculer_cout_voiture_pour_trajet(resultats_velo_min.km_an, params_voiture_base)
-        cout_voiture_max = calculer_cout_voiture_pour_trajet(resultats_velo_max.km_an, params_voiture_base)
+        graphe = st.session_state.graphe
+        params_voiture_base = graphe.valeur("params_voiture")
 
-        cout_velo_min = resultats_velo_min.cout_annuel_fmd
-        cout_velo_max = resultats_velo_max.cout_annuel_fmd
-        
-        economie_min = cout_voiture_min - cout_velo_max  # Cas le plus défavorable
-        economie_max = cout_voiture_max - cout_velo_min  # Cas le plus favorable
+        with span("calcul.voiture_pour_trajet"):
+            comparaison = graphe.valeur("comparaison")
+
+        cout_voiture_min, cout_voiture_max = comparaison.cout_voiture_min, comparaison.cout_voiture_max
+        cout_velo_min, cout_velo_max = comparaison.cout_velo_min, comparaison.cout_velo_max
+
+        economie_min = comparaison.economie_min  # Cas le plus défavorable
+        economie_max = comparaison.economie_max  # Cas le plus favorable
         
         # --- Affichage de la comparaison ---
         st.markdown("---")
@@ -66,8 +62,8 @@ def display_comparaison_tab(resultats_velo_min, resultats_velo_max, profil_data)
             
             eco_moyenne = (economie_min + economie_max) / 2
             if eco_moyenne > 0:
-                afficher_graphique_economies_cumulees(eco_moyenne)
-            
+                afficher_projection(profil_data, params_voiture_base, resultats_velo_min.km_an, resultats_velo_max.km_an)
+
             co2_economise_moyen = ((resultats_velo_min.km_an + resultats_velo_max.km_an) / 2 * AppConfig.CO2_VOITURE_G_PAR_KM) / 1000
             arbres_equivalents = co2_economise_moyen / AppConfig.CO2_ABSORPTION_ARBRE_KG_PAR_AN
             cafes_par_mois = (eco_moyenne / AppConfig.PRIX_MOYEN_CAFE) / 12
@@ -79,5 +75,129 @@ def display_comparaison_tab(resultats_velo_min, resultats_velo_max, profil_data)
 
         else:
             st.warning("Selon cette simulation, le vélo coûterait plus cher que la voiture, même dans le scénario le plus optimiste.")
+
+        afficher_rentabilite(profil_data, params_voiture_base, resultats_velo_min, resultats_velo_max)
+        afficher_simulation_monte_carlo(profil_data, params_voiture_base)
     else:
-        st.warning("Veuillez configurer un profil de vélo pour accéder à la comparaison.")
\ No newline at end of file
+        st.warning("Veuillez configurer un profil de vélo pour accéder à la comparaison.")
+
+
+def afficher_projection(profil_data, params_voiture, km_an_min, km_an_max):
+    """Affiche la projection pluriannuelle des flux (renouvellements, inflation, actualisation, carburant)."""
+    # NumPy n'est chargé que si l'onglet de comparaison est affiché
+    from projection import projection_profil
+
+    p_col1, p_col2, p_col3, p_col4 = st.columns(4)
+    horizon = p_col1.slider("Horizon (ans)", 1, 30, AppConfig.PROJECTION_HORIZON, key="projection_horizon")
+    inflation = p_col2.number_input("Inflation (%/an)", value=AppConfig.PROJECTION_INFLATION * 100,
+                                    step=0.5, format="%.1f", key="projection_inflation")
+    taux = p_col3.number_input("Taux d'actualisation (%/an)", value=AppConfig.PROJECTION_TAUX_ACTUALISATION * 100,
+                               step=0.5, format="%.1f", key="projection_taux")
+    evolution = p_col4.number_input("Évolution du carburant (%/an)", value=AppConfig.PROJECTION_EVOLUTION_CARBURANT * 100,
+                                    step=0.5, format="%.1f", key="projection_carburant")
+
+    # Projection partagée par jeu de paramètres : allonger l'horizon ne calcule que les années manquantes
+    projection = projection_profil(profil_data, params_voiture, (km_an_min, km_an_max),
+                                   inflation / 100, taux / 100, evolution / 100)
+    resultats = projection.resultats(horizon)
+    afficher_projection_economies(resultats, ("Usage faible", "Usage élevé"))
+
+    v_col1, v_col2 = st.columns(2)
+    v_col1.metric(f"VAN sur {horizon} ans (usage faible)", f"{resultats.van[0]:.0f}€")
+    v_col2.metric(f"VAN sur {horizon} ans (usage élevé)", f"{resultats.van[1]:.0f}€")
+    st.caption("Flux réels année par année : rachat du vélo tous les "
+               f"{profil_data.get('duree', 0)} ans, voiture achetée puis revendue tous les "
+               f"{params_voiture.duree_possession} ans (part imputable au trajet).")
+
+def _formater_km(distance):
+    return "jamais" if distance == float("inf") else f"{distance:.1f} km"
+
+def _formater_annees(annees):
+    return "jamais" if annees == float("inf") else f"{annees:.1f} ans"
+
+def afficher_rentabilite(profil_data, params_voiture, resultats_velo_min, resultats_velo_max):
+    """Affiche le point de rentabilité (distance, années) et la carte jours × distance de l'économie."""
+    # NumPy n'est chargé que si l'onglet de comparaison est affiché
+    from rentabilite import annees_amortissement, distance_rentabilite, grille_economies
+
+    st.markdown("---")
+    st.subheader("📍 Point de rentabilité")
+    jours_min = profil_data.get('jours_semaine_min', 0)
+    jours_max = profil_data.get('jours_semaine_max', 0)
+
+    d_col1, d_col2, a_col1, a_col2 = st.columns(4)
+    d_col1.metric(f"Distance de rentabilité ({jours_min} j/sem)",
+                  _formater_km(distance_rentabilite(profil_data, params_voiture, jours_min)))
+    d_col2.metric(f"Distance de rentabilité ({jours_max} j/sem)",
+                  _formater_km(distance_rentabilite(profil_data, params_voiture, jours_max)))
+    a_col1.metric("Vélo amorti en (min)",
+                  _formater_annees(annees_amortissement(profil_data, params_voiture, resultats_velo_min.km_an)))
+    a_col2.metric("Vélo amorti en (max)",
+                  _formater_annees(annees_amortissement(profil_data, params_voiture, resultats_velo_max.km_an)))
+    st.caption("Distance d'un aller simple à partir de laquelle le vélo coûte moins cher que la part de la voiture.")
+
+    # Grille calculée une fois par jeu de paramètres : déplacer les curseurs n'est qu'une lecture
+    grille = grille_economies(profil_data, params_voiture)
+    seuils = [distance_rentabilite(profil_data, params_voiture, j) for j in grille.jours.tolist()]
+    afficher_heatmap_economies(grille, [s if s != float("inf") else None for s in seuils])
+
+    e_col1, e_col2, e_col3 = st.columns([2, 2, 1])
+    jours = e_col1.slider("Jours par semaine", 0, 7, int(jours_max), key="rentabilite_jours")
+    distances = grille.distances.tolist()
+    km_jour = e_col2.select_slider("Distance d'un aller simple (km)", options=distances,
+                                   value=min(distances, key=lambda d: abs(d - profil_data.get('km_jour', 0))),
+                                   key="rentabilite_km_jour")
+    e_col3.metric("Économie annuelle", f"{grille.economie(jours, km_jour):.0f}€")
+
+def afficher_simulation_monte_carlo(profil_data, params_voiture):
+    """Affiche le mode simulation : percentiles de l'économie et de la rentabilité selon des lois incertaines."""
+    # NumPy n'est chargé que si l'onglet de comparaison est affiché
+    from montecarlo import Distribution, simuler
+
+    st.markdown("---")
+    with st.expander("🎲 Simulation de l'incertitude (Monte-Carlo)"):
+        st.caption("Les jours de vélotaf, le prix du carburant, la consommation et la valeur de revente sont tirés au hasard selon les lois ci-dessous.")
+        with st.form("monte_carlo_form"):
+            col1, col2 = st.columns(2)
+            with col1:
+                nb_tirages = st.number_input("Nombre de tirages", value=AppConfig.MONTE_CARLO_NB_TIRAGES, min_value=1000, step=10000)
+                graine = st.number_input("Graine (reproductibilité)", value=AppConfig.MONTE_CARLO_GRAINE, min_value=0)
+                jours = st.slider(
+                    "Jours de vélotaf par semaine (uniforme)", 0.0, 7.0,
+                    (float(profil_data.get('jours_semaine_min', 0)), float(profil_data.get('jours_semaine_max', 0)))
+                )
+            with col2:
+                ecart_carburant = st.number_input("Écart-type du prix du carburant (€/L)", value=round(params_voiture.prix_carburant * 0.10, 2), min_value=0.0, format="%.2f")
+                ecart_conso = st.number_input("Écart-type de la consommation (L/100km)", value=round(params_voiture.consommation * 0.10, 2), min_value=0.0, format="%.2f")
+                marge_revente = st.slider("Incertitude sur la valeur de revente (± %)", 0, 50, 10)
+            lancer = st.form_submit_button("Lancer la simulation")
+
+        if lancer:
+            distributions = {
+                "jours_semaine": Distribution("uniforme", minimum=jours[0], maximum=jours[1]),
+                "prix_carburant": Distribution("normale", valeur=params_voiture.prix_carburant, ecart_type=ecart_carburant, minimum=0.0),
+                "consommation": Distribution("normale", valeur=params_voiture.consommation, ecart_type=ecart_conso, minimum=0.0),
+                "valeur_revente": Distribution(
+                    "triangulaire", valeur=params_voiture.valeur_revente,
+                    minimum=params_voiture.valeur_revente * (1 - marge_revente / 100),
+                    maximum=params_voiture.valeur_revente * (1 + marge_revente / 100),
+                ),
+            }
+            resultats = simuler(profil_data, params_voiture, distributions, nb_tirages=int(nb_tirages), graine=int(graine))
+
+            st.markdown("##### Économie annuelle")
+            e_col1, e_col2, e_col3 = st.columns(3)
+            e_col1.metric("P5", f"{resultats.economie_annuelle[5]:.0f}€")
+            e_col2.metric("P50 (médiane)", f"{resultats.economie_annuelle[50]:.0f}€")
+            e_col3.metric("P95", f"{resultats.economie_annuelle[95]:.0f}€")
+
+            st.markdown("##### Année de rentabilité du vélo")
+            r_col1, r_col2, r_col3 = st.columns(3)
+            for col, p in zip((r_col1, r_col2, r_col3), (5, 50, 95)):
+                annee = resultats.annee_rentabilite[p]
+                col.metric(f"P{p}", "jamais" if annee == float("inf") else f"{annee:.1f} ans")
+
+            st.caption(
+                f"Probabilité d'économiser : {resultats.proba_economie:.0%} — "
+                f"probabilité que le vélo ne soit jamais rentable : {resultats.proba_jamais_rentable:.0%}"
+            )
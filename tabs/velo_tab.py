@@ -3,10 +3,48 @@ import streamlit as st
 from config import AppConfig
 from charts import afficher_tableau_details, afficher_camembert_repartition
 
-def display_velo_tab(resultats_velo_min, resultats_velo_max, profil_actif):
+def _bloc_resultats(resultats_min, resultats_max) -> dict:
+    """Résultats des deux scénarios sous forme de colonnes, pour les exports."""
+    from dataclasses import asdict
+
+    lignes = {"scenario": ["Pessimiste (Min)", "Optimiste (Max)"]}
+    for resultats in (resultats_min, resultats_max):
+        for nom, valeur in asdict(resultats).items():
+            lignes.setdefault(nom, []).append(valeur)
+    return lignes
+
+def _contenu_export(format_export: str, resultats_min, resultats_max):
+    """Construit le fichier exporté ; appelé seulement au clic sur le bouton de téléchargement."""
+    import io
+    from export import EXPORTEURS, schema_velo
+
+    schema = [("scenario", "str")] + schema_velo()
+    blocs = [_bloc_resultats(resultats_min, resultats_max)]
+    if format_export == "csv":
+        tampon = io.StringIO()
+        EXPORTEURS["csv"](blocs, tampon, schema=schema)
+        return tampon.getvalue()
+    tampon = io.BytesIO()
+    EXPORTEURS[format_export](blocs, tampon, schema=schema)
+    return tampon.getvalue()
+
+def afficher_boutons_export(profil_actif, resultats_min, resultats_max):
+    """Boutons de téléchargement des résultats ; le fichier n'est généré qu'au clic."""
+    col_xlsx, col_csv, _ = st.columns([1, 1, 3])
+    for col, format_export, libelle, mime in (
+        (col_xlsx, "xlsx", "📥 Excel", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+        (col_csv, "csv", "📥 CSV", "text/csv"),
+    ):
+        col.download_button(
+            libelle,
+            data=lambda f=format_export: _contenu_export(f, resultats_min, resultats_max),
+            file_name=f"resultats_velo_{profil_actif}.{format_export}",
+            mime=mime, key=f"export_velo_{format_export}", on_click="ignore",
+        )
+
+def display_velo_tab(resultats_velo_min, resultats_velo_max, profil_actif, profil_data):
     """Affiche le contenu de l'onglet du simulateur vélo."""
-    if resultats_velo_min and resultats_velo_max and profil_actif:
-        profil_data = st.session_state.profils_velo[profil_actif]
+    if resultats_velo_min and resultats_velo_max and profil_actif and profil_data:
         st.header(f"Analyse du coût pour : {profil_actif}")
 
         st.info(f"""
@@ -25,6 +63,8 @@ def display_velo_tab(resultats_velo_min, resultats_velo_max, profil_actif):
             st.metric("Coût Annuel", f"{resultats_velo_max.cout_annuel_fmd:.0f}€")
             st.metric("Kilométrage annuel", f"{resultats_velo_max.km_an} km")
         
+        afficher_boutons_export(profil_actif, resultats_velo_min, resultats_velo_max)
+
         st.markdown("---")
         st.subheader("Répartition des coûts du vélo")
         duree = profil_data.get('duree', 1)
@@ -1,64 +1,176 @@
 # tabs/voiture_tab.py
+import os
+
 import streamlit as st
-import pandas as pd
-from utils import calculer_couts_voiture, VoitureParams
+from dataclasses import replace
+from utils import VoitureParams, TRAJETS_PERSO_DEFAUT, estimer_km_autres
 from charts import afficher_camembert_repartition
 from config import AppConfig
+from instrumentation import span
+
+# Champs de `VoitureParams` saisis dans le formulaire (clé de widget : "voiture_<champ>")
+CHAMPS_FORMULAIRE = ("prix_achat", "valeur_revente", "duree_possession", "assurance", "entretien",
+                     "autres_frais", "consommation", "prix_carburant")
+
+def _reinitialiser_voiture():
+    """Callback exécuté avant le rerun : le formulaire s'affiche directement avec les valeurs par défaut."""
+    trajets = st.session_state.get('trajets_perso', TRAJETS_PERSO_DEFAUT)
+    st.session_state.voiture_params = VoitureParams(km_autres=estimer_km_autres(trajets))
+    for champ in CHAMPS_FORMULAIRE:
+        st.session_state[f"voiture_{champ}"] = getattr(st.session_state.voiture_params, champ)
+    st.session_state.voiture_reinitialisee = True
+
+@st.cache_resource
+def get_catalogue_voitures():
+    """Catalogue de modèles ouvert une fois pour tout le processus (None s'il n'a pas été construit)."""
+    from catalogue_voitures import CatalogueVoitures, CatalogueVoituresError
+
+    try:
+        return CatalogueVoitures()
+    except CatalogueVoituresError:
+        return None
+
+@st.cache_resource(max_entries=1)
+def _charger_prix_carburants(signature):
+    from prix_carburants import AgregatsPrix
+
+    return AgregatsPrix.charger(AppConfig.PRIX_CARBURANTS_AGREGATS)
+
+def get_prix_carburants():
+    """Agrégats de prix à la pompe, relus seulement si le fichier a changé (None s'il n'existe pas)."""
+    from prix_carburants import PrixCarburantsError
+
+    try:
+        stat = os.stat(AppConfig.PRIX_CARBURANTS_AGREGATS)
+        return _charger_prix_carburants((stat.st_mtime_ns, stat.st_size))
+    except (FileNotFoundError, PrixCarburantsError):
+        return None
+
+def _appliquer_prix_carburant(prix):
+    """Callback : remplace le prix du carburant par la moyenne régionale choisie."""
+    st.session_state.voiture_params = replace(st.session_state.voiture_params, prix_carburant=prix)
+    st.session_state.voiture_prix_carburant = prix
 
+def afficher_prix_region(agregats):
+    """Moyenne des derniers jours des relevés de la région (lecture dans les agrégats, sans relire les relevés)."""
+    fenetre = AppConfig.PRIX_CARBURANTS_FENETRE_JOURS
+    with st.expander(f"⛽ Prix moyen du carburant sur {fenetre} jours dans ma région"):
+        col_region, col_carburant = st.columns(2)
+        region = col_region.selectbox("Région / département", agregats.regions(), key="voiture_prix_region")
+        carburant = col_carburant.selectbox("Carburant", agregats.carburants(region), key="voiture_prix_type")
+        moyenne = agregats.moyenne(region, carburant) if region and carburant else None
+        if moyenne is None:
+            st.caption("Aucun relevé récent pour cette région et ce carburant.")
+            return
+        st.button(f"Utiliser {moyenne:.3f} €/L", on_click=_appliquer_prix_carburant, args=(round(moyenne, 3),))
+
+def _appliquer_modele(catalogue):
+    """Callback : préremplit le formulaire avec le modèle choisi (une ligne lue dans le catalogue)."""
+    ligne = st.session_state.get('voiture_modele')
+    if ligne is None:
+        return
+    st.session_state.voiture_params = catalogue.params(ligne, st.session_state.voiture_params)
+    for champ in CHAMPS_FORMULAIRE:
+        st.session_state[f"voiture_{champ}"] = getattr(st.session_state.voiture_params, champ)
+    st.session_state.voiture_modele_applique = catalogue.libelle(ligne)
+
+def afficher_recherche_modele(catalogue):
+    """Recherche d'un modèle par début de mot (marque, modèle, motorisation)."""
+    with st.expander(f"🔎 Partir d'un modèle du catalogue ({len(catalogue)} modèles)"):
+        texte = st.text_input("Rechercher un modèle", key="voiture_recherche", placeholder="ex. clio, model 3, e-tech")
+        lignes = catalogue.rechercher(texte, AppConfig.CATALOGUE_NB_SUGGESTIONS)
+        if not lignes:
+            if texte:
+                st.caption("Aucun modèle ne correspond à cette recherche.")
+            return
+        ligne = st.selectbox("Modèle", lignes, format_func=catalogue.libelle, key="voiture_modele")
+        modele = catalogue.modele(ligne)
+        st.caption(f"{modele['prix']} € · {modele['consommation']:.1f} /100 km · {modele['carburant']}")
+        st.button("Utiliser ce modèle", on_click=_appliquer_modele, args=(catalogue,))
+
+@st.fragment
 def display_voiture_tab():
-    """Affiche le contenu de l'onglet du simulateur voiture."""
+    """
+    Affiche le contenu de l'onglet du simulateur voiture.
+
+    Fragment Streamlit : une soumission du formulaire ne réexécute que cet onglet.
+    Entrées : `voiture_params` et `trajets_perso` (session) ; sortie : les entrées
+    `voiture_saisie` et `trajets_perso` du graphe de calcul de la session (`graphe`),
+    lues par l'onglet de comparaison à sa prochaine exécution.
+    """
     st.header("Simulation du coût global de la voiture")
     st.info("Saisissez ici les coûts fixes de votre voiture et estimez vos trajets personnels.")
 
-    vp = st.session_state.voiture_params 
+    catalogue = get_catalogue_voitures()
+    if catalogue is not None:
+        afficher_recherche_modele(catalogue)
+        modele_applique = st.session_state.pop('voiture_modele_applique', None)
+        if modele_applique:
+            st.info(f"Paramètres préremplis avec **{modele_applique}**.")
+    agregats_prix = get_prix_carburants()
+    if agregats_prix is not None and agregats_prix.series:
+        afficher_prix_region(agregats_prix)
+
+    vp = st.session_state.voiture_params
+    # Conservée en session : l'onglet n'est pas exécuté quand il n'est pas affiché
+    trajets = st.session_state.setdefault('trajets_perso', dict(TRAJETS_PERSO_DEFAUT))
+    for champ in CHAMPS_FORMULAIRE:
+        st.session_state.setdefault(f"voiture_{champ}", getattr(vp, champ))
     with st.form("car_form"):
         col1, col2 = st.columns(2)
         with col1:
             st.subheader("Coûts d'acquisition et fixes")
-            vp.prix_achat = st.number_input("Prix d'achat (€)", value=vp.prix_achat, min_value=0)
-            vp.valeur_revente = st.number_input("Valeur de revente (€)", value=vp.valeur_revente, min_value=0)
-            vp.duree_possession = st.number_input("Durée de possession (ans)", value=vp.duree_possession, min_value=1)
-            vp.assurance = st.number_input("Assurance annuelle (€)", value=vp.assurance, min_value=0)
-            vp.entretien = st.number_input("Entretien annuel (€)", value=vp.entretien, min_value=0)
-            vp.autres_frais = st.number_input("Autres frais annuels (€)", value=vp.autres_frais, min_value=0)
+            prix_achat = st.number_input("Prix d'achat (€)", key="voiture_prix_achat", min_value=0)
+            valeur_revente = st.number_input("Valeur de revente (€)", key="voiture_valeur_revente", min_value=0)
+            duree_possession = st.number_input("Durée de possession (ans)", key="voiture_duree_possession", min_value=1)
+            assurance = st.number_input("Assurance annuelle (€)", key="voiture_assurance", min_value=0)
+            entretien = st.number_input("Entretien annuel (€)", key="voiture_entretien", min_value=0)
+            autres_frais = st.number_input("Autres frais annuels (€)", key="voiture_autres_frais", min_value=0)
 
         with col2:
             st.subheader("Estimation des trajets personnels")
-            nb_trajets_courts = st.number_input("Nb. trajets courts / semaine (ex: courses)", value=4, min_value=0)
-            dist_trajet_court = st.number_input("Distance A/R d'un trajet court (km)", value=10, min_value=0)
-            nb_trajets_longs = st.number_input("Nb. trajets longs / semaine (ex: loisirs)", value=1, min_value=0)
-            dist_trajet_long = st.number_input("Distance A/R d'un trajet long (km)", value=50, min_value=0)
+            nb_trajets_courts = st.number_input("Nb. trajets courts / semaine (ex: courses)", value=trajets["nb_trajets_courts"], min_value=0)
+            dist_trajet_court = st.number_input("Distance A/R d'un trajet court (km)", value=trajets["dist_trajet_court"], min_value=0)
+            nb_trajets_longs = st.number_input("Nb. trajets longs / semaine (ex: loisirs)", value=trajets["nb_trajets_longs"], min_value=0)
+            dist_trajet_long = st.number_input("Distance A/R d'un trajet long (km)", value=trajets["dist_trajet_long"], min_value=0)
             
             st.subheader("Consommation")
-            vp.consommation = st.number_input("Consommation (L/100km)", value=vp.consommation, min_value=0.0, format="%.2f")
-            vp.prix_carburant = st.number_input("Prix du carburant (€/L)", value=vp.prix_carburant, min_value=0.0, format="%.2f")
+            consommation = st.number_input("Consommation (L/100km)", key="voiture_consommation", min_value=0.0, format="%.2f")
+            prix_carburant = st.number_input("Prix du carburant (€/L)", key="voiture_prix_carburant", min_value=0.0, format="%.2f")
         
         b_col1, b_col2, _ = st.columns([1, 1, 3])
         with b_col1:
             car_submitted = st.form_submit_button("🔄 Recalculer")
         with b_col2:
-            car_reset = st.form_submit_button("Réinitialiser")
+            st.form_submit_button("Réinitialiser", on_click=_reinitialiser_voiture)
 
-    semaines_perso = 52
-    km_autres_calcules = (nb_trajets_courts * dist_trajet_court + nb_trajets_longs * dist_trajet_long) * semaines_perso
-    
     if car_submitted:
-        vp.km_autres = km_autres_calcules
-        st.session_state.voiture_params = vp
+        trajets = {
+            "nb_trajets_courts": nb_trajets_courts, "dist_trajet_court": dist_trajet_court,
+            "nb_trajets_longs": nb_trajets_longs, "dist_trajet_long": dist_trajet_long
+        }
+        st.session_state.trajets_perso = trajets
+        # Les paramètres sont immuables : on remplace l'objet au lieu de le modifier
+        st.session_state.voiture_params = replace(
+            vp, prix_achat=prix_achat, valeur_revente=valeur_revente, duree_possession=duree_possession,
+            assurance=assurance, entretien=entretien, autres_frais=autres_frais,
+            consommation=consommation, prix_carburant=prix_carburant, km_autres=estimer_km_autres(trajets)
+        )
         st.success("Paramètres de la voiture mis à jour !")
-        st.rerun()
 
-    if car_reset:
-        st.session_state.voiture_params = VoitureParams()
+    graphe = st.session_state.graphe
+    graphe.definir(voiture_saisie=st.session_state.voiture_params, trajets_perso=st.session_state.trajets_perso)
+
+    if st.session_state.pop('voiture_reinitialisee', False):
         st.info("Les paramètres de la voiture ont été réinitialisés.")
-        st.rerun()
-    
-    voiture_params_actuels = st.session_state.voiture_params
-    voiture_params_actuels.km_autres = km_autres_calcules
-    resultats_voiture_globaux = calculer_couts_voiture(voiture_params_actuels)
+
+    # Recalculés seulement si une saisie voiture ou l'estimation des trajets a changé
+    voiture_params_actuels = graphe.valeur("params_voiture")
+    with span("calcul.voiture"):
+        resultats_voiture_globaux = graphe.valeur("resultats_voiture")
     
     st.header("Résultats globaux pour la voiture")
-    st.info(f"Le kilométrage des trajets personnels ('autres') est estimé à **{km_autres_calcules} km/an**.")
+    st.info(f"Le kilométrage des trajets personnels ('autres') est estimé à **{voiture_params_actuels.km_autres} km/an**.")
     
     r_col1, r_col2 = st.columns(2)
     r_col1.metric("Coût annuel total (hors vélotaf)", f"{resultats_voiture_globaux.cout_annuel:.2f} €")
@@ -0,0 +1,36 @@
+# tests/test_graphe.py
+from dataclasses import replace
+
+from graphe import creer_graphe_simulation
+from utils import VoitureParams
+
+PROFIL = {"prix_achat": 2500, "aide": 300, "entretien_annuel": 100, "duree": 5, "fmd": 600,
+          "km_jour": 10, "nb_trajets_jour": 2, "jours_semaine_min": 2, "jours_semaine_max": 4}
+NOEUDS_VELO = {"params_velo_min", "params_velo_max", "velo_min", "velo_max"}
+
+
+def _graphe_calcule():
+    graphe = creer_graphe_simulation()
+    graphe.definir(profil_velo=PROFIL)
+    graphe.valeur("comparaison")
+    graphe.reinitialiser_compteurs()
+    return graphe
+
+
+def test_changer_la_voiture_ne_recalcule_pas_le_velo():
+    graphe = _graphe_calcule()
+    graphe.definir(voiture_saisie=replace(VoitureParams(), consommation=8.0))
+    graphe.valeur("comparaison")
+    assert not NOEUDS_VELO & set(graphe.recalculs)
+    assert graphe.recalculs["resultats_voiture"] == 0  # nœud non demandé : pas calculé
+    assert graphe.recalculs["params_voiture"] == 1
+    assert graphe.recalculs["comparaison"] == 1
+
+
+def test_changer_jours_max_ne_recalcule_pas_le_scenario_min():
+    graphe = _graphe_calcule()
+    graphe.definir(profil_velo={**PROFIL, "jours_semaine_max": 5})
+    graphe.valeur("comparaison")
+    assert graphe.recalculs["velo_max"] == 1
+    assert graphe.recalculs["velo_min"] == 0
+    assert graphe.recalculs["comparaison"] == 1
@@ -0,0 +1,15 @@
+# tests/test_montecarlo.py
+from types import MappingProxyType
+
+from montecarlo import simuler
+from utils import VoitureParams
+
+PROFIL = {"prix_achat": 2500, "aide": 300, "entretien_annuel": 100, "duree": 5, "fmd": 600,
+          "km_jour": 10, "nb_trajets_jour": 2, "jours_semaine_min": 2, "jours_semaine_max": 4}
+
+
+def test_pool_de_processus_accepte_un_profil_du_catalogue():
+    """Les profils du catalogue partagé sont des mappings en lecture seule : le pool doit les accepter."""
+    parallele = simuler(MappingProxyType(PROFIL), VoitureParams(), nb_tirages=200_000, graine=1, nb_processus=2)
+    sequentiel = simuler(PROFIL, VoitureParams(), nb_tirages=200_000, graine=1, nb_processus=1)
+    assert parallele == sequentiel
@@ -1,8 +1,13 @@
 # utils.py
-from dataclasses import dataclass, field
+from dataclasses import dataclass, replace
 from typing import Dict
 
-@dataclass
+from cache import memoize
+from config import AppConfig
+
+# Les résultats sont des enregistrements à slots (sans __dict__ par instance) : pour de
+# grandes collections, voir `tableaux.TableauResultats` (une colonne typée par champ).
+@dataclass(frozen=True, slots=True)
 class CoutResultats:
     """Stocke les résultats des calculs de coût pour le vélo."""
     cout_total: float = 0.0
@@ -14,16 +19,55 @@ class CoutResultats:
     km_an: int = 0
     duree: int = 0
 
-@dataclass
+# Libellés des postes de coût de la voiture et champs correspondants de `CoutVoitureResultats`
+POSTES_VOITURE = {
+    "Amortissement": "amortissement",
+    "Carburant": "carburant",
+    "Assurance": "assurance",
+    "Entretien": "entretien",
+    "Autres frais": "autres_frais",
+}
+
+@dataclass(frozen=True, slots=True)
 class CoutVoitureResultats:
-    """Stocke les résultats du calcul de coût pour la voiture."""
+    """Stocke les résultats du calcul de coût pour la voiture (un champ par poste de coût)."""
     cout_annuel: float = 0.0
     cout_km: float = 0.0
-    details: Dict[str, float] = field(default_factory=dict)
+    amortissement: float = 0.0
+    carburant: float = 0.0
+    assurance: float = 0.0
+    entretien: float = 0.0
+    autres_frais: float = 0.0
+
+    @property
+    def details(self) -> Dict[str, float]:
+        """Répartition du coût annuel par poste (libellé -> montant), construite à la demande."""
+        return {libelle: getattr(self, champ) for libelle, champ in POSTES_VOITURE.items()}
+
+@dataclass(frozen=True)
+class VeloParams:
+    """Paramètres immuables (et hachables) d'un scénario vélo, dans l'ordre de `calculer_couts`."""
+    prix_achat: int = 0
+    aide: int = 0
+    entretien_total: float = 0.0
+    duree: int = 0
+    fmd: int = 0
+    km_an: int = 0
 
-@dataclass
+    @classmethod
+    def depuis_profil(cls, profil_data: dict, jours_semaine: int) -> "VeloParams":
+        """Construit le scénario d'un profil de `profils.json` pour un nombre de jours de vélotaf par semaine."""
+        distance_journaliere = profil_data.get('km_jour', 0) * profil_data.get('nb_trajets_jour', 2)
+        km_an = distance_journaliere * jours_semaine * AppConfig.SEMAINES_TRAVAILLEES_PAR_AN
+        return cls(
+            prix_achat=profil_data['prix_achat'], aide=profil_data['aide'],
+            entretien_total=profil_data['entretien_annuel'] * profil_data['duree'],
+            duree=profil_data['duree'], fmd=profil_data['fmd'], km_an=int(km_an)
+        )
+
+@dataclass(frozen=True)
 class VoitureParams:
-    """Stocke les paramètres de configuration pour la voiture."""
+    """Stocke les paramètres (immuables) de configuration pour la voiture."""
     prix_achat: int = 20000
     valeur_revente: int = 5000
     duree_possession: int = 5
@@ -36,6 +80,15 @@ class VoitureParams:
     consommation: float = 6.5
     prix_carburant: float = 1.90
 
+# Estimation par défaut des trajets personnels hebdomadaires (hors vélotaf)
+TRAJETS_PERSO_DEFAUT = {"nb_trajets_courts": 4, "dist_trajet_court": 10, "nb_trajets_longs": 1, "dist_trajet_long": 50}
+SEMAINES_PERSO = 52
+
+def estimer_km_autres(trajets: dict) -> int:
+    """Kilométrage annuel des trajets personnels à partir de l'estimation hebdomadaire."""
+    return (trajets["nb_trajets_courts"] * trajets["dist_trajet_court"]
+            + trajets["nb_trajets_longs"] * trajets["dist_trajet_long"]) * SEMAINES_PERSO
+
 def calculer_couts(prix_achat: int, aide: int, entretien_total: float, duree: int, fmd: int, km_an: int) -> CoutResultats:
     """
     Calcule les différents coûts liés à l'utilisation d'un vélo et retourne un objet CoutResultats.
@@ -74,12 +127,34 @@ def calculer_couts_voiture(params: VoitureParams) -> CoutVoitureResultats:
         
         cout_km = cout_total_annuel / km_annuels if km_annuels > 0 else 0
         
-        details = {
-            "Amortissement": amortissement, "Carburant": cout_carburant,
-            "Assurance": params.assurance, "Entretien": params.entretien,
-            "Autres frais": params.autres_frais
-        }
-        return CoutVoitureResultats(cout_annuel=cout_total_annuel, cout_km=cout_km, details=details)
+        return CoutVoitureResultats(
+            cout_annuel=cout_total_annuel, cout_km=cout_km, amortissement=amortissement,
+            carburant=cout_carburant, assurance=params.assurance, entretien=params.entretien,
+            autres_frais=params.autres_frais
+        )
         
     except ZeroDivisionError:
-        return CoutVoitureResultats()
\ No newline at end of file
+        return CoutVoitureResultats()
+
+@memoize(AppConfig.TAILLE_CACHE_RESULTATS)
+def calculer_couts_velo_cache(params: VeloParams) -> CoutResultats:
+    """Version mémoïsée de `calculer_couts` pour un scénario `VeloParams`."""
+    return calculer_couts(params.prix_achat, params.aide, params.entretien_total, params.duree, params.fmd, params.km_an)
+
+@memoize(AppConfig.TAILLE_CACHE_RESULTATS)
+def calculer_couts_voiture_cache(params: VoitureParams) -> CoutVoitureResultats:
+    """Version mémoïsée de `calculer_couts_voiture`."""
+    return calculer_couts_voiture(params)
+
+def calculer_cout_voiture_pour_trajet(km_velotaf: int, params: VoitureParams) -> float:
+    """
+    Calcule la part du coût annuel de la voiture imputable au trajet domicile-travail.
+    Les paramètres d'origine ne sont pas modifiés.
+    """
+    params_trajet = replace(params, km_domicile_travail=km_velotaf)
+    resultats_voiture_scenario = calculer_couts_voiture_cache(params_trajet)
+
+    km_total = params_trajet.km_domicile_travail + params_trajet.km_autres
+    proportion = km_velotaf / km_total if km_total > 0 else 0
+
+    return resultats_voiture_scenario.cout_annuel * proportion